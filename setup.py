@@ -10,7 +10,7 @@ def readme():
 
 setuptools.setup(
     name='spirentapi',
-    version='1.4.6',
+    version='1.14.3',
     author='Ding Yi',
     author_email='dvdface@hotmail.com',
     url='https://github.com/dvdface/spirentapi',
@@ -18,8 +18,10 @@ setuptools.setup(
     long_description=readme(),
     long_description_content_type='text/markdown',
     packages=['spirentapi'],
-    package_data={'spirentapi':['API.TXT']},
+    package_data={'spirentapi':['API.TXT', 'emulator/*.tcl']},
     install_requires=['python-dateutil'],
+    extras_require={'numpy': ['numpy']},
+    entry_points={'pytest11': ['spirentapi = spirentapi.pytest_plugin'], 'console_scripts': ['spirentapi = spirentapi.cli:main']},
     tests_require= ['pytest', 'pytest-html', 'pytest-cov'],
     license='MIT',
     classifiers=[
@@ -1,6 +1,20 @@
 from .tclwrapper import TCLWrapper, TCLWrapperError, TCLWrapperException, TCLWrapperInstanceError
 from .apiwrapper import SpirentAPI
+from .interp import InterpWrapper
 from .object import STCObject
+from .trace import TraceRecorder, TraceReplayer, read_trace
+from .results import ResultFile, ResultDatabase
+from .reconcile import ReconcilePlan
+from .configcache import ConfigCache
+from .keyedlist import KeyedListView
+from .stats import StatsTable, StatsPoller
+from .profiler import Profiler
+from .timeseries import TimeSeriesStore
+from .capture import Capture, PcapFile
+from .pool import SessionPool, PortLeaseScheduler
+from .scenario import Scenario
+from .resultview import ResultView
+from .jobs import Job
 
 __all__ = [
     
@@ -9,5 +23,25 @@ __all__ = [
     'TCLWrapperError',
     'TCLWrapperException',
     'TCLWrapperInstanceError',
-    'STCObject'
+    'InterpWrapper',
+    'STCObject',
+    'TraceRecorder',
+    'TraceReplayer',
+    'read_trace',
+    'ResultFile',
+    'ResultDatabase',
+    'ReconcilePlan',
+    'ConfigCache',
+    'KeyedListView',
+    'StatsTable',
+    'StatsPoller',
+    'Profiler',
+    'TimeSeriesStore',
+    'Capture',
+    'PcapFile',
+    'SessionPool',
+    'PortLeaseScheduler',
+    'Scenario',
+    'ResultView',
+    'Job'
 ]
\ No newline at end of file
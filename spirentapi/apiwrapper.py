@@ -5,83 +5,795 @@ import logging
 import os
 import re
 import shutil
+import threading
+import time
+import weakref
+from contextlib import nullcontext
 from typing import Optional, Union, Any, NoReturn
 from datetime import datetime
 
 from .tclwrapper import *
 from .utils import *
+from .trace import TraceRecorder
+from .reconcile import ReconcilePlan, plan_reconcile, apply_plan
+from .keyedlist import KeyedListView
+from .profiler import Profiler, profiled
+from .timeseries import TimeSeriesStore
+from .interp import InterpWrapper
+from .jobs import Job, _PROCS as _JOB_PROCS
 
 # logging
 logger = logging.getLogger(__name__)
 
-# Check Tcl/Tk Setting
+# Tcl/Tk Setting
 TCLSHDIR = shutil.which('tclsh')
-assert TCLSHDIR != None, 'Please install Tcl/Tk 8.5(https://www.activestate.com/products/tcl/downloads/) and add it in the PATH environment variable'
 
-# Check Spirent TestCenter Installation
+# Spirent TestCenter Installation
 SPIRENTTESTCENTERDIR = os.getenv('SpirentTestCenter', None)
-assert SPIRENTTESTCENTERDIR != None, 'Please setup the environment variable SpirentTestCenter, and point it to the SpirentTestCenter installation directory'
-assert os.path.exists(os.path.join(SPIRENTTESTCENTERDIR, 'TestCenter.exe')), 'Please setup the SpirentTestCenter environment variable to the parent directory of TestCenter.exe'
+
+# Spirent TestCenter emulator, tcl package providing SpirentTestCenter and SpirentHltApi in memory
+EMULATORDIR = os.path.join(os.path.dirname(__file__), 'emulator')
+
+def _check_environment() -> NoReturn:
+    """check Tcl/Tk and Spirent TestCenter installation, before starting tclsh
+    """
+    assert TCLSHDIR != None, 'Please install Tcl/Tk 8.5(https://www.activestate.com/products/tcl/downloads/) and add it in the PATH environment variable'
+    assert SPIRENTTESTCENTERDIR != None, 'Please setup the environment variable SpirentTestCenter, and point it to the SpirentTestCenter installation directory'
+    assert os.path.exists(os.path.join(SPIRENTTESTCENTERDIR, 'TestCenter.exe')), 'Please setup the SpirentTestCenter environment variable to the parent directory of TestCenter.exe'
+
+def resolve_pairs(data:Union[str, tuple, list]) -> dotdict:
+    """parse -name value pairs, like the reply of stc::get
+
+    Args:
+        data (str, tuple or list): string contains name-value, or the tcl list already split
+
+    Returns:
+        dotdict: dict that contains name-value, leading '-' is removed from names
+    """
+    if type(data) == str:
+        data = tclstring_to_list(data)
+
+    assert type(data) in [tuple, list], 'data should be str, tuple or list type'
+
+    ret = dotdict()
+
+    # pairs are -name value -name value ..., braces are removed by splitting
+    for i in range(0, len(data) - 1, 2):
+
+        key = data[i]
+
+        ret[key[1:] if key.startswith('-') else key] = data[i + 1].strip()
+
+    return ret
+
+# tcl regexp switches of python re flags used in stc_query
+_REGEXP_SWITCHES = { re.I: '-nocase', re.M: '-lineanchor', re.X: '-expanded' }
+_REGEXP_FLAGS = re.I | re.M | re.S | re.X | re.U
+
+# tcl procs used by SpirentAPI, registered in ::spirentapi namespace when first called
+_BUILTIN_PROCS = {
+
+    # create count objects, options are used by all objects, columns are name, values pairs, one value per object
+    'create_many': ('type count options columns', '''
+    set handles [ list ]
+    for { set i 0 } { $i < $count } { incr i } {
+        set opts $options
+        foreach { name values } $columns {
+            lappend opts -$name [ lindex $values $i ]
+        }
+        lappend handles [ stc::create $type {*}$opts ]
+    }
+    return $handles
+'''),
+
+    # poll attribute of handles until predicate on $value is met, or timeout in milliseconds
+    'wait_until': ('handles attribute predicate timeout interval', '''
+    set start [ clock milliseconds ]
+    set pending $handles
+    set ret [ list ]
+    while { 1 } {
+        set now [ clock milliseconds ]
+        set left [ list ]
+        foreach handle $pending {
+            set value [ stc::get $handle -$attribute ]
+            if { [ expr $predicate ] } {
+                lappend ret [ list $handle $value [ expr { ($now - $start) / 1000.0 } ] ]
+            } else {
+                lappend left $handle
+                set last($handle) $value
+            }
+        }
+        set pending $left
+        if { [ llength $pending ] == 0 || $now - $start >= $timeout } {
+            break
+        }
+        after $interval
+    }
+    foreach handle $pending {
+        lappend ret [ list $handle $last($handle) {} ]
+    }
+    return $ret
+'''),
+
+    # read children of the types in tree recursively, tree is type attributes subtree ...
+    # return list of handle type {attribute value ...} children
+    'read_tree': ('parent tree', '''
+    set ret [ list ]
+    foreach { object_type attributes subtree } $tree {
+        foreach child [ stc::get $parent -children-$object_type ] {
+            set values [ list ]
+            foreach attribute $attributes {
+                lappend values $attribute [ stc::get $child -$attribute ]
+            }
+            lappend ret [ list $child $object_type $values [ read_tree $child $subtree ] ]
+        }
+    }
+    return $ret
+'''),
+
+    # run operations, every operation is kind target type options, 
+    # target @n refers to the n-th object created by this call, return created handles
+    'apply_plan': ('ops', '''
+    set created [ list ]
+    foreach op $ops {
+        lassign $op kind target type options
+        if { [ string index $target 0 ] eq "@" } {
+            set target [ lindex $created [ string range $target 1 end ] ]
+        }
+        switch -- $kind {
+            create { lappend created [ stc::create $type -under $target {*}$options ] }
+            config { stc::config $target {*}$options }
+            delete { stc::delete $target }
+        }
+    }
+    return $created
+'''),
+
+    # walk descendants of roots breadth first, depth < 0 for no limit, object_type '' for all types,
+    # conditions are attribute op min max, op is eq, re or range, max of re is the regexp switches
+    # return list of handle {attribute value ...} of matched objects
+    'query': ('roots object_type conditions depth attributes', '''
+    set ret [ list ]
+    set level 0
+    set frontier $roots
+    while { [ llength $frontier ] > 0 && ( $depth < 0 || $level < $depth ) } {
+        incr level
+        set next [ list ]
+        foreach parent $frontier {
+            # children of the type are asked for from STC, handles are not always named by their type
+            if { $object_type ne "" } {
+                array unset typed
+                foreach handle [ stc::get $parent -children-$object_type ] {
+                    set typed($handle) 1
+                }
+            }
+            foreach child [ stc::get $parent -children ] {
+                lappend next $child
+                if { $object_type ne "" && ![ info exists typed($child) ] } {
+                    continue
+                }
+                set matched 1
+                foreach condition $conditions {
+                    lassign $condition attribute op min max
+                    if { [ catch { stc::get $child -$attribute } value ] } {
+                        set matched 0
+                    } else {
+                        switch -- $op {
+                            eq { set matched [ expr { $value eq $min } ] }
+                            re { set matched [ regexp {*}$max -- $min $value ] }
+                            range {
+                                set matched [ expr { [ string is double -strict $value ] && 
+                                                     ( $min eq "" || $value >= $min ) && 
+                                                     ( $max eq "" || $value <= $max ) } ]
+                            }
+                        }
+                    }
+                    if { !$matched } {
+                        break
+                    }
+                }
+                if { $matched } {
+                    set values [ list ]
+                    foreach attribute $attributes {
+                        lappend values $attribute [ stc::get $child -$attribute ]
+                    }
+                    lappend ret [ list $child $values ]
+                }
+            }
+        }
+        set frontier $next
+    }
+    return $ret
+'''),
+
+    # 1 and keys if key of keyed list in variable var is a keyed list, otherwise 0 and value
+    'keyl_node': ('var key', '''
+    upvar #0 $var keyset
+    if { $key eq "" } {
+        set failed [ catch { keylkeys keyset } keys ]
+    } else {
+        set failed [ catch { keylkeys keyset $key } keys ]
+    }
+    if { $failed } {
+        return [ list 0 [ keylget keyset $key ] ]
+    }
+    return [ list 1 $keys ]
+'''),
+
+    # flatten subtrees of paths of keyed list in variable var, return path value path value ... per path
+    'keyl_flatten': ('var paths', '''
+    upvar #0 $var keyset
+    set ret [ list ]
+    foreach path $paths {
+        set pairs [ list ]
+        set pending [ list $path ]
+        for { set i 0 } { $i < [ llength $pending ] } { incr i } {
+            set key [ lindex $pending $i ]
+            if { $key eq "" } {
+                set failed [ catch { keylkeys keyset } keys ]
+            } else {
+                set failed [ catch { keylkeys keyset $key } keys ]
+            }
+            if { $failed } {
+                lappend pairs $key [ keylget keyset $key ]
+            } else {
+                foreach sub_key $keys {
+                    lappend pending [ expr { $key eq "" ? $sub_key : "$key.$sub_key" } ]
+                }
+            }
+        }
+        lappend ret $pairs
+    }
+    return $ret
+'''),
+
+    # run sth:: statistics cmd, flatten its keyed list to rows of port stream direction counter value
+    # return timestamp in milliseconds, status, log and rows
+    'stats_rows': ('cmd', '''
+    set timestamp [ clock milliseconds ]
+    set keyset [ uplevel #0 $cmd ]
+    set status [ expr { [ catch { keylget keyset status } value ] ? "" : $value } ]
+    set log [ expr { [ catch { keylget keyset log } value ] ? "" : $value } ]
+    set rows [ list ]
+    set pending [ keylkeys keyset ]
+    for { set i 0 } { $i < [ llength $pending ] } { incr i } {
+        set key [ lindex $pending $i ]
+        if { ![ catch { keylkeys keyset $key } keys ] } {
+            foreach sub_key $keys {
+                lappend pending "$key.$sub_key"
+            }
+            continue
+        }
+        if { $key eq "status" || $key eq "log" } {
+            continue
+        }
+        set parts [ split $key . ]
+        set port [ expr { [ llength $parts ] > 1 ? [ lindex $parts 0 ] : "" } ]
+        set stream ""
+        set at [ lsearch -exact $parts stream ]
+        if { $at >= 0 && $at + 2 < [ llength $parts ] } {
+            set stream [ lindex $parts [ expr { $at + 1 } ] ]
+        }
+        set direction ""
+        foreach part [ lrange $parts 0 end-1 ] {
+            if { $part eq "rx" || $part eq "tx" } {
+                set direction $part
+                break
+            }
+        }
+        lappend rows $port $stream $direction [ lindex $parts end ] [ keylget keyset $key ]
+    }
+    return [ list $timestamp $status $log $rows ]
+'''),
+
+    # move query of subscribed DynamicResultView to rows offset .. offset + size - 1 and update view,
+    # return ResultData of rows
+    'result_page': ('view query offset size', '''
+    # paging doesn't change the configuration, it's not seen by ConfigCache
+    incr ::spirentapi::readonly
+    set failed [ catch { stc::config $query -LimitOffset $offset -LimitSize $size } error ]
+    incr ::spirentapi::readonly -1
+    if { $failed } {
+        error $error
+    }
+    stc::perform UpdateDynamicResultView -DynamicResultView $view
+    set rows [ list ]
+    foreach data [ stc::get $query -children-ResultViewData ] {
+        lappend rows [ stc::get $data -ResultData ]
+    }
+    return $rows
+'''),
+}
 
 
 class SpirentAPIMeta(type):
 
     def __init__(cls, *args, **kwargs) -> NoReturn:
         cls._instance = None
+        cls._instance_lock = threading.Lock()
     
     @property
     def instance(cls):
         if cls._instance == None:
-            cls._instance = SpirentAPI()
+            with cls._instance_lock:
+                # check again, another thread may have created it while waiting for the lock
+                if cls._instance == None:
+                    cls._instance = SpirentAPI()
         
         return cls._instance
 
+    @instance.setter
+    def instance(cls, api) -> NoReturn:
+        """replace the singleton, for example, with a threadsafe SpirentAPI
+        """
+        with cls._instance_lock:
+            cls._instance = api
+
 
 class SpirentAPI(metaclass=SpirentAPIMeta):
     """
     Spirent TestCenter API
     """
     
-    def __init__(self) -> NoReturn:
+    def __init__(self, threadsafe:bool=False, trace:Optional[str]=None, tclsh:Any=None, standby:bool=False, emulator:bool=False) -> NoReturn:
         """HLTAPI initialization function
 
+        Args:
+            threadsafe (bool, optional): if True, many threads can share this session, 
+                                         their commands are pipelined to tclsh by a dispatcher thread. Defaults to False
+            trace (str, optional): trace file path, if set, every command sent to tclsh is recorded to it. Defaults to None
+            tclsh (optional): backend to use instead of starting tclsh, for example, TraceReplayer.
+                              it's started here, but packages are not installed or loaded. Defaults to None
+            standby (bool, optional): if True, keep a spare initialized tclsh, when tclsh dies, 
+                                      swap to the spare and replay connections, reservations and loaded configuration. Defaults to False
+            emulator (bool, optional): if True, load the emulator instead of Spirent TestCenter, objects are kept in tclsh memory,
+                                       no chassis or Spirent TestCenter installation is needed, see emulator_config. Defaults to False
+
         Raises:
             TCLWrapperInstanceError: if start tclsh, raise this error
         """
+        self._tclsh = None
+
+        self._count = { }
+        self._count_lock = threading.Lock()
+
+        # identity map of STCObject, one wrapper per handle in this session
+        self._stc_objects = weakref.WeakValueDictionary()
+
+        # tcl procs registered in this session, name -> (args, body)
+        self._procs = { }
+        self._procs_lock = threading.Lock()
+
+        # commands to replay on the spare tclsh: connections, reservations, loaded configuration
+        self._journal = [ ]
+        self._standby = standby
+        self._spare = None
+        self._spare_thread = None
+        self._failover_lock = threading.Lock()
+        self._threadsafe = threadsafe
+        self._emulator = emulator
+
+        # latency profiler, see enable_profiler
+        self.profiler = None
+
+        # time series of polled counters, see enable_timeseries
+        self.timeseries = None
+
+        # record commands
+        self._recorder = TraceRecorder(trace) if trace != None else None
+
+        if tclsh != None:
+
+            assert not standby, "standby can't be used with given backend"
+
+            # use given backend
+            logger.info('start backend %s' % type(tclsh).__name__)
+            tclsh.trace = self._recorder
+            tclsh.start()
+            self._tclsh = tclsh
+
+            # dynamically make sth:: function
+            self._make_sth_func()
+            return
+
+        if emulator:
+            assert TCLSHDIR != None, 'Please install tclsh and add it in the PATH environment variable'
+        else:
+            _check_environment()
+
         # initializate tclsh
+        self._tclsh = self._start_tclsh()
+
+        # dynamically make sth:: function
+        self._make_sth_func()
+
+        if standby:
+            self._start_spare()
+
+    def _start_tclsh(self) -> TCLWrapper:
+        """start tclsh, install required packages and load Spirent TestCenter library
+
+        Returns:
+            TCLWrapper: tclsh ready to use
+        """
         logger.info('start tcl process')
-        self._tclsh = TCLWrapper(TCLSHDIR)
-        self._tclsh.start()
+        # bootstrap commands of the spare are recorded too
+        tclsh = TCLWrapper(TCLSHDIR, threadsafe=self._threadsafe, trace=self._recorder)
+        tclsh.start()
 
-        # install required Tclx, ip
-        self.install("Tclx")
-        self.install("ip")
+        if self._emulator:
+            # emulator uses Tclx if it's installed, otherwise its own keyed list commands
+            library = EMULATORDIR.replace('\\', '/')
+        else:
+            # install required Tclx, ip
+            self._install(tclsh, "Tclx")
+            self._install(tclsh, "ip")
+            library = SPIRENTTESTCENTERDIR
 
         # init Spirent TestCenter Library
-        logger.info('lappend auto_path {%s}' % SPIRENTTESTCENTERDIR)
-        self._tclsh.eval('lappend auto_path {%s}' % SPIRENTTESTCENTERDIR)
+        logger.info('lappend auto_path {%s}' % library)
+        tclsh.eval('lappend auto_path {%s}' % library)
 
         # load SpirentTestCenter, stc::
         logger.info('package require SpirentTestCenter')
-        self._tclsh.eval('package require SpirentTestCenter')
+        tclsh.eval('package require SpirentTestCenter')
             
         # load SpirentHltApi, sth::
         logger.info('package require SpirentHltApi')
-        self._tclsh.eval('package require SpirentHltApi')
+        tclsh.eval('package require SpirentHltApi')
 
-        # dynamically make sth:: function
-        self._make_sth_func()
+        return tclsh
     
-    def __del__(self) -> NoReturn:
-        """shut down tcl process
+    def _start_spare(self) -> NoReturn:
+        """start a spare tclsh in background
+        """
+        def prepare():
+            try:
+                self._spare = self._start_tclsh()
+                logger.info('spare tcl process is ready')
+            except Exception as e:
+                logger.error('fail to start spare tcl process: %s' % e)
+
+        self._spare = None
+        self._spare_thread = threading.Thread(target=prepare, name='SpirentAPISpare', daemon=True)
+        self._spare_thread.start()
+
+    def _journal_add(self, cmd:str) -> NoReturn:
+        """save command to replay on the spare tclsh
+
+        Args:
+            cmd (str): command
+        """
+        if self._standby:
+            self._journal.append(cmd)
+
+    def _journal_remove(self, cmd:str) -> NoReturn:
+        """forget command saved by _journal_add, for example, after disconnect
+
+        Args:
+            cmd (str): command
+        """
+        if cmd in self._journal:
+            self._journal.remove(cmd)
+
+    def failover(self, failed:Any=None) -> NoReturn:
+        """swap to the spare tclsh, replay connections, reservations and loaded configuration, and start a new spare
+
+        it's called automatically when tclsh dies in standby mode, 
+        call it by yourself if tclsh is wedged
+
+        only stc_connect, stc_reserve, sth_connect and the last LoadFromXml are replayed,
+        objects created or changed by stc_create, stc_config and other commands after them are not rebuilt on the spare,
+        save them by SaveAsXml and load them by stc_perform('LoadFromXml', ...) to keep them across failover
+
+        Args:
+            failed (optional): the tclsh which failed, if it's already swapped out, do nothing. Defaults to None, current tclsh
+        """
+        assert self._standby, 'failover needs standby mode'
+
+        with self._failover_lock:
+
+            if failed != None and failed is not self._tclsh:
+                # another thread already swapped it
+                return
+
+            logger.warning('tcl process failed, swap to the spare')
+
+            old = self._tclsh
+            
+            if self._spare_thread != None:
+                self._spare_thread.join()
+
+            spare = self._spare if self._spare != None else self._start_tclsh()
+            spare.trace = self._recorder
+            spare.tcl_timing = getattr(old, 'tcl_timing', False)
+            if getattr(old, 'bulk', None) != None:
+                spare.open_bulk(old.bulk.size, old.bulk_threshold)
+            if getattr(old, 'event_loop', False):
+                # jobs of the failed tclsh are lost
+                spare.start_event_loop()
+            self._tclsh = spare
+
+            try:
+                old.stop()
+            except Exception as e:
+                logger.debug('fail to stop failed tcl process: %s' % e)
+
+            # objects wrapped by STCObject belong to the failed tclsh, handles created again by replay are wrapped again
+            for obj in list(self._stc_objects.values()):
+                obj._handle = None
+            self._stc_objects.clear()
+
+            # registered procs are defined again
+            for name, (args, body) in list(self._procs.items()):
+                spare.eval('namespace eval ::spirentapi %s' % list_to_tclword(['proc', name, args, body]))
+
+            for cmd in self._journal:
+                logger.info('replay: %s' % cmd)
+                spare.eval(cmd)
+
+            self._start_spare()
+
+    def _tcl_eval(self, cmd:str, to_list:bool=False) -> Union[str, tuple]:
+        """run command in tclsh, in standby mode, if tclsh dies, swap to the spare and run it again
+
+        Args:
+            cmd (str): cmd to run
+            to_list (bool, optional): split result as tcl list. Defaults to False
+        """
+        if self.profiler != None:
+            return self._tcl_eval_profiled(cmd, to_list)
+
+        return self._tcl_run(cmd, to_list)
+
+    def _tcl_run(self, cmd:str, to_list:bool) -> Union[str, tuple]:
+        """run command in tclsh, fail over in standby mode"""
+        tclsh = self._tclsh
+        try:
+            return tclsh.eval(cmd, to_list=to_list)
+        except TCLWrapperInstanceError as e:
+            if not self._standby:
+                raise e
+
+            logger.error(e)
+            self.failover(tclsh)
+            return self._tclsh.eval(cmd, to_list=to_list)
+
+    def _tcl_eval_profiled(self, cmd:str, to_list:bool) -> Union[str, tuple]:
+        """_tcl_eval, timing io and tcl phases"""
+        profiler = self.profiler
+
+        # command run out of any API is profiled as its first word
+        root = profiler.phase(cmd.split(' ', 1)[0].strip()) if not profiler.active else nullcontext()
+
+        with root:
+            with profiler.phase('io'):
+                ret = self._tcl_run(cmd, to_list)
+
+                tcl_time = getattr(self._tclsh, 'last_tcl_time', None)
+                if tcl_time != None:
+                    profiler.add('tcl', tcl_time)
+
+        return ret
+
+    def enable_profiler(self, profiler:Optional[Profiler]=None) -> Profiler:
+        """time encode, io, tcl and parse phases of API calls
+
+        Args:
+            profiler (Profiler, optional): profiler to add timings to. Defaults to None, create a new one
 
+        Returns:
+            Profiler: profiler
+        """
+        self.profiler = profiler if profiler != None else Profiler()
+        # tcl phase is timed only by tclsh backends, replayed traces have no tcl time
+        if hasattr(self._tclsh, 'tcl_timing'):
+            self._tclsh.tcl_timing = True
+        return self.profiler
+
+    def disable_profiler(self) -> Optional[Profiler]:
+        """stop profiling
+
+        Returns:
+            Profiler: profiler used, None if it's not enabled
+        """
+        profiler, self.profiler = self.profiler, None
+        if hasattr(self._tclsh, 'tcl_timing'):
+            self._tclsh.tcl_timing = False
+        return profiler
+
+    def enable_timeseries(self, store:Optional[TimeSeriesStore]=None, capacity:int=3600, max_series:Optional[int]=None) -> TimeSeriesStore:
+        """keep counters polled by stc_sample and StatsPoller in a time series store
+
+        Args:
+            store (TimeSeriesStore, optional): store to add samples to. Defaults to None, create a new one
+            capacity (int, optional): samples kept per counter of the new store. Defaults to 3600
+            max_series (int, optional): counters kept by the new store. Defaults to None, no limit
+
+        Returns:
+            TimeSeriesStore: store
+        """
+        self.timeseries = store if store != None else TimeSeriesStore(capacity, max_series)
+        return self.timeseries
+
+    def disable_timeseries(self) -> Optional[TimeSeriesStore]:
+        """stop keeping polled counters
+
+        Returns:
+            TimeSeriesStore: store used, None if it's not enabled
+        """
+        store, self.timeseries = self.timeseries, None
+        return store
+
+    def enable_bulk(self, size:int=16 * 1024 * 1024, threshold:Optional[int]=65536, directory:Optional[str]=None) -> NoReturn:
+        """read large replies through a memory-mapped file shared with tclsh, in /dev/shm if it exists, instead of stdout
+
+        tclsh writes the reply into the file, and only its offset and length are sent through the pipe
+
+        Args:
+            size (int, optional): bytes of the file. Defaults to 16MB
+            threshold (int, optional): replies longer than it are read through the file. Defaults to 65536, None for eval_bulk only
+            directory (str, optional): directory of the file. Defaults to None, /dev/shm or temp directory
         """
-        logger.info('shutdown tcl process')
-        if self._tclsh != None:          # stop Tcl shell
+        assert isinstance(self._tclsh, TCLWrapper), 'bulk channel needs a tclsh backend'
+        assert self._tclsh.bulk == None, 'bulk channel is already enabled'
+
+        self._tclsh.open_bulk(size, threshold, directory)
+
+    def eval_bulk(self, cmd:str) -> memoryview:
+        """run tcl shell command, return the result as utf-8 bytes without copying, for example, to parse by numpy
+
+        with enable_bulk, the memoryview is the memory map of the bulk channel, it's valid until size more bytes are replied through it,
+        call bytes() to keep it longer
+
+        Args:
+            cmd (str): cmd to run
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            memoryview: result
+        """
+        assert self._tclsh != None, "tcl is not started"
+
+        logger.info(cmd)
+        if not hasattr(self._tclsh, 'eval_bulk'):
+            return memoryview(self._tcl_eval(cmd).encode('utf-8'))
+
+        return self._tclsh.eval_bulk(cmd)
+
+    def start_job(self, steps:Union[str, list], name:Optional[str]=None) -> Job:
+        """run steps in background, in the tcl event loop, the session is free for other commands meanwhile
+
+        steps run in order, one at a time, commands sent to the session are run between steps,
+        and while a step waits by ::spirentapi::job_sleep or ::spirentapi::job_wait_complete,
+        a step can report progress by ::spirentapi::job_progress value ?message?
+
+        Example:
+            job = api.start_job([ 'stc::perform SequencerStart', '::spirentapi::job_wait_complete 3600' ], name='sequencer')
+            while not job.done():
+                api.stc_sample(streams, [ 'FrameCount' ])
+                time.sleep(1)
+
+        Args:
+            steps (str or list): tcl command, or list of tcl commands
+            name (str, optional): job name. Defaults to None, the first word of the first step
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            Job: job handle
+        """
+        assert self._tclsh != None, "tcl is not started"
+        assert hasattr(self._tclsh, 'start_event_loop'), 'background jobs need a tclsh backend'
+
+        if type(steps) != list:
+            steps = [ steps ]
+        assert len(steps) > 0 and all([ type(step) == str for step in steps ]), 'steps should be str, or list of str and not empty'
+
+        name = name if name != None else steps[0].split(' ', 1)[0]
+
+        self._tclsh.start_event_loop()
+        for proc, (args, body) in _JOB_PROCS.items():
+            self.register_proc(proc, args, body)
+
+        id = self.call_proc('job_start', name, quote_tcllist(steps))
+        logger.info('job %s %s started' % (id, name))
+        return Job(self, id, name)
+
+    def _phase(self, name:str):
+        """profiler phase, or nothing if profiler is not enabled"""
+        return self.profiler.phase(name) if self.profiler != None else nullcontext()
+
+    def _encode(self, kwargs:dict) -> str:
+        """convert arguments to tcl options, timed as encode phase"""
+        with self._phase('encode'):
+            return dict_to_opt(kwargs, prefix='-')
+
+    def close(self) -> NoReturn:
+        """shut down tcl process, the session can't be used after it's closed, closing it again does nothing
+
+        Example:
+            with SpirentAPI() as api:
+                api.stc_connect('10.182.32.138')
+        """
+        # stop spare tclsh
+        if getattr(self, '_spare_thread', None) != None:
+            self._spare_thread.join()
+            if self._spare != None:
+                self._spare.stop()
+                self._spare = None
+
+        if getattr(self, '_tclsh', None) != None:          # stop Tcl shell
+            logger.info('shutdown tcl process')
             self._tclsh.stop()
+
+            # close trace file
+            if getattr(self._tclsh, 'trace', None) != None:
+                self._tclsh.trace.close()
+
             self._tclsh = None
             logger.info('tclsh process stopped')
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self) -> NoReturn:
+        """shut down tcl process when it's collected
+        """
+        self.close()
+
+    def create_session(self, name:Optional[str]=None) -> 'SpirentAPI':
+        """create a logical session in a tcl child interpreter of this session's tclsh
+
+        the logical session has its own tcl variables, procs and results, and shares the loaded packages, 
+        the STC backend and the pipe of this session, so it costs no process. 
+        it's closed by its close, and can't be used after this session is closed
+
+        Args:
+            name (str, optional): interpreter name. Defaults to None, named by tcl
+
+        Returns:
+            SpirentAPI: logical session
+        """
+        assert self._tclsh != None, "tcl is not started"
+        assert isinstance(self._tclsh, TCLWrapper), 'logical session needs a tclsh backend'
+        assert not self._standby, "logical session can't be used with standby, its interpreter is lost when tclsh is swapped"
+
+        return SpirentAPI(tclsh=InterpWrapper(self._tclsh, name), threadsafe=self._threadsafe, emulator=self._emulator)
+
+    def emulator_config(self, latency:Union[float, dict, None]=None, jitter:Union[float, dict, None]=None) -> NoReturn:
+        """set latency and jitter of emulator commands
+
+        Args:
+            latency (float or dict, optional): seconds every command is delayed, or dict of command -> seconds, '*' for other commands. Defaults to None, unchanged
+            jitter (float or dict, optional): seconds latency varies by, uniformly, or dict like latency. Defaults to None, unchanged
+
+        Example:
+            api = SpirentAPI(emulator=True)
+            api.emulator_config(latency={'stc::get': 0.0005, '*': 0.002}, jitter=0.0002)
+        """
+        assert self._emulator, 'emulator_config needs emulator=True'
+
+        options = [ ]
+        for name, value in [ ('-latency', latency), ('-jitter', jitter) ]:
+            if value == None:
+                continue
+            if type(value) == dict:
+                value = quote_tcllist([ str(item) for pair in value.items() for item in pair ])
+            else:
+                assert value >= 0, '%s should not be negative' % name[1:]
+                value = str(value)
+            options.extend([ name, quote_tclstring(value) ])
+
+        if options:
+            self.eval('::stcemu::configure %s' % ' '.join(options))
+
     def install(self,  package_name:str) -> NoReturn:
         """check if package is installed, if not, install it
 
@@ -93,13 +805,25 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         """
         assert self._tclsh != None , "tcl is not started, can't check and install package"
 
+        self._install(self._tclsh, package_name)
+
+    def _install(self, tclsh:TCLWrapper, package_name:str) -> NoReturn:
+        """check if package is installed in tclsh, if not, install it
+
+        Args:
+            tclsh (TCLWrapper): tclsh to install package
+            package_name (str): package name to check and install , case-sensitive
+
+        Raises:
+            RuntimeError: if installation failed, raise RuntimeError
+        """
         assert type(package_name) == str, 'package_name should be str type'
 
         logger.info('check and install package: %s'  % package_name)
 
         try:
 
-            self._tclsh.eval(
+            tclsh.eval(
                 'if {[ catch { package require %s } error ]} { \
                     if {[ catch { teacup install %s } error2 ]}  { \
                         exit \
@@ -132,13 +856,35 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         if type(cmd) == list:
 
             # if command is list type, run command one by one
+            # in threadsafe mode, commands are pipelined, sent without waiting for the replies
+            if self._tclsh.threadsafe:
+                for c in cmd:
+                    assert type(c) == str, "command in list must be str type"
+
+                    logger.info(c)
+                
+                tclsh = self._tclsh
+                try:
+                    replies = [ future.result() for future in [ tclsh.submit(c) for c in cmd ] ]
+                except TCLWrapperInstanceError as e:
+                    # pipelined commands may be partly run, they are not run again
+                    if self._standby:
+                        self.failover(tclsh)
+                    raise e
+
+            else:
+                replies = None
+
             ret = [ ]
-            for c in cmd:
+            for i, c in enumerate(cmd):
 
                 assert type(c) == str, "command in list must be str type"
 
-                logger.info(c)
-                ret_ = remove_empty_lines(self._tclsh.eval(c))
+                if replies == None:
+                    logger.info(c)
+                    ret_ = remove_empty_lines(self._tcl_eval(c))
+                else:
+                    ret_ = remove_empty_lines(replies[i])
                 
                 logger.debug(ret_)
                 ret.append(ret_)
@@ -149,7 +895,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
 
             # if command is str type, run command directly
             logger.info(cmd)
-            ret = remove_empty_lines(self._tclsh.eval(cmd))
+            ret = remove_empty_lines(self._tcl_eval(cmd))
 
             logger.debug(ret)
             return ret
@@ -158,6 +904,62 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
             # esle raise TypeError
             raise TypeError("cmd should be str or list[str] type")
 
+    def register_proc(self, name:str, args:str, body:str) -> NoReturn:
+        """define tcl proc ::spirentapi::name once in this session
+
+        tcl compiles proc body once, and reuses its bytecode every time it's called,
+        so commands run frequently are cheaper as procs called by call_proc
+
+        Args:
+            name (str): proc name
+            args (str): proc arguments, for example, 'handle {attribute Name}'
+            body (str): proc body
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+        """
+        assert type(name) == str and re.match('^\w+$', name), 'name should be str type, and only contain letters, digits and _'
+        assert type(args) == str, 'args should be str type'
+        assert type(body) == str, 'body should be str type'
+
+        with self._procs_lock:
+
+            # same proc is already defined
+            if self._procs.get(name) == (args, body):
+                return
+
+            self.eval('namespace eval ::spirentapi %s' % list_to_tclword(['proc', name, args, body]))
+            self._procs[name] = (args, body)
+
+    def call_proc(self, name:str, *args, to_list:bool=False) -> Union[str, tuple]:
+        """call tcl proc ::spirentapi::name registered by register_proc
+
+        builtin procs used by SpirentAPI are registered when first called
+
+        Args:
+            name (str): proc name
+            args (optional): proc arguments, every argument is passed as one tcl word
+            to_list (bool, optional): if True, split result as tcl list. Defaults to False
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            str or tuple: result, or elements of result if to_list is True
+        """
+        if name not in self._procs:
+
+            assert name in _BUILTIN_PROCS, 'proc %s is not registered' % name
+
+            self.register_proc(name, *_BUILTIN_PROCS[name])
+
+        cmd = '::spirentapi::%s %s' % (name, quote_tcllist(args))
+
+        if to_list:
+            return self._eval_list(cmd)
+        else:
+            return self.eval(cmd)
+
     def _get_unique_name(self, name:str, start_index:Optional[int]=0):
         """return a unique variable name for name
 
@@ -168,30 +970,30 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         Returns:
             str: unique name
         """
-        if '_count' not in dir(self):
-            self._count = { }
-        
         # if name has a number suffix, strip off number suffix in the tail
         match = re.match('(^[\_a-zA-Z]+)(\d+$)', name)
         if match and len(match.groups()) == 2:
             name = match.groups()[0]
         
-        if name not in self._count.keys():
-            unique_name = '%s%d' % (name, start_index)
-            self._count[name] = start_index + 1
-        else:
-            unique_name ='%s%d' % (name, self._count[name])
-            self._count[name] = self._count[name] + 1
+        # counter is shared by threads in threadsafe mode
+        with self._count_lock:
+            if name not in self._count.keys():
+                unique_name = '%s%d' % (name, start_index)
+                self._count[name] = start_index + 1
+            else:
+                unique_name ='%s%d' % (name, self._count[name])
+                self._count[name] = self._count[name] + 1
         
         # I don't verify if the name which I give is unique
         return unique_name
 
-    def _run_api(self, variable:str, cmd:str, **kargs) -> dotdict:
+    def _run_api(self, variable:str, cmd:str, lazy:bool=False, **kargs) -> Union[dotdict, KeyedListView]:
         """run hlt api(sth::) and save the result to given variable, and automatically parse the result and save into a dot-accessible dict
 
         Args:
             variable (str): the variable to save
             cmd (str): sth:: cmd to run
+            lazy (bool, optional): if True, return KeyedListView, which fetches the result when it's accessed. Defaults to False
             kargs (optional): argument passed to sth:: cmd
 
         Raises:
@@ -206,17 +1008,28 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(variable) == str, 'variable should be str type'
         assert type(cmd) == str, 'cmd should be str type'
 
-        # convert arguments
-        args = dict_to_opt(kargs, prefix='-')
-        
-        
-        # run command
-        unique_name = self._get_unique_name(variable)
-        cmd = 'set %s [ %s %s ]' % (unique_name, cmd, args)
-        self.eval(cmd)
+        with self._phase(cmd):
+
+            # convert arguments
+            args = self._encode(kargs)
+            
+            # run command
+            unique_name = self._get_unique_name(variable)
+            self.eval('set %s [ %s %s ]' % (unique_name, cmd, args))
+
+            if not lazy:
+                # parse result data
+                with self._phase('parse'):
+                    ret = self._resolve_keyset(unique_name)
+
+        if lazy:
+            ret = KeyedListView(self, unique_name)
+
+            # check result
+            assert 'log' not in ret, ret.log
+
+            return ret
 
-        # parse result data
-        ret = self._resolve_keyset(unique_name)
         ret.name = unique_name
 
         # check result
@@ -304,6 +1117,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
 
 
         ret = self._run_api('connect', 'sth::connect', **kwargs)
+        self._journal_add('set %s [ sth::connect %s ]' % (ret.name, dict_to_opt({ k: v for k, v in kwargs.items() if k != 'lazy' }, prefix='-')))
 
         ret.port_handles =  [ ]
         for port in re.split("\s+", kwargs['port_list']):
@@ -321,6 +1135,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         """
         self.eval('stc::apply')
     
+    @profiled('stc::config')
     def stc_config(self, handle:str, **kwargs) -> NoReturn:
         """stc::config
 
@@ -332,7 +1147,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         """
         assert type(handle) == str, 'handle should be str type'
 
-        self.eval('stc::config %s %s' % (handle, dict_to_opt(kwargs, prefix='-')))
+        self.eval('stc::config %s %s' % (handle, self._encode(kwargs)))
 
     def stc_connect(self, chassisIp:str) -> NoReturn:
         """stc::connect
@@ -346,7 +1161,9 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(chassisIp) == str, 'chassisIp should be str type'
 
         self.eval('stc::connect %s' % chassisIp)
+        self._journal_add('stc::connect %s' % chassisIp)
 
+    @profiled('stc::create')
     def stc_create(self, objectType:str, **kwargs) -> str:
         """stc::create
 
@@ -362,7 +1179,89 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         """
         assert type(objectType) == str, 'objectType should be str type'
         
-        return self.eval('stc::create %s %s' % (objectType, dict_to_opt(kwargs, prefix='-')))
+        return self.eval('stc::create %s %s' % (objectType, self._encode(kwargs)))
+
+    def stc_create_many(self, objectType:str, count:int, **kwargs) -> list[str]:
+        """create many objects by one stc::create loop in tclsh
+
+        every argument can be a scalar, which is used by all objects,
+        or a list/tuple of count values, one per object, for example:
+
+            stc_create_many('StreamBlock', 3, under=['port1', 'port1', 'port2'], Name=['s1', 's2', 's3'], FrameLengthMode='FIXED')
+
+        created objects are not validated one by one, if one creation fails,
+        the objects created before it are kept, and TCLWrapperError is raised
+
+        Args:
+            objectType (str): object type to create
+            count (int): number of objects to create
+            under (optional, str or list[str]): parent handle, or parent handle per object
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            list[str]: created object handles, in the same order as the columns
+        """
+        assert type(objectType) == str, 'objectType should be str type'
+        assert type(count) == int and count >= 0, 'count should be int type and not negative'
+
+        if count == 0:
+            return [ ]
+
+        columns = [ ]
+        options = [ ]
+        for name, value in kwargs.items():
+
+            assert ' ' not in name, 'attribute name should not contain space'
+
+            if type(value) in [list, tuple]:
+                # one value per object
+                assert len(value) == count, '%s should have %d values' % (name, count)
+
+                columns.extend([ name, quote_tcllist(value) ])
+            else:
+                options.extend([ '-%s' % name, value ])
+
+        return list(self.call_proc('create_many', objectType, count, quote_tcllist(options), quote_tcllist(columns), to_list=True))
+
+    def reconcile(self, spec:list, under:str='project1', key:str='Name', delete:bool=False, dry_run:bool=False, batch_size:int=1000) -> ReconcilePlan:
+        """make the object tree under parent same as spec, with as few operations as possible
+
+        spec is a list of desired objects, every object is a dict of type, attributes, and children, for example:
+
+            [
+                { 'type': 'Port', 'Name': 'port A', 'Location': '//10.0.0.1/1/1', 'children': [
+                    { 'type': 'StreamBlock', 'Name': 's1', 'FrameLengthMode': 'FIXED' },
+                ] },
+            ]
+
+        the objects of spec types are read in one round-trip, objects are identified by key attribute,
+        missing objects are created, different attributes are configured, and the operations run in batches.
+        if the tree is already same as spec, nothing is run
+
+        Args:
+            spec (list): desired objects
+            under (str, optional): parent handle of the spec objects. Defaults to 'project1'
+            key (str, optional): attribute to identify objects of the same type. Defaults to 'Name'
+            delete (bool, optional): delete objects of the spec types which are not in spec. Defaults to False
+            dry_run (bool, optional): only compute the operations. Defaults to False
+            batch_size (int, optional): operations per round-trip. Defaults to 1000
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            ReconcilePlan: operations, plan.created has the handles of created objects
+        """
+        assert type(under) == str, 'under should be str type'
+
+        plan = plan_reconcile(self, spec, under, key=key, delete=delete)
+
+        if not dry_run:
+            apply_plan(self, plan, batch_size=batch_size)
+
+        return plan
 
     def stc_delete(self, handle:str) -> NoReturn:
         """stc::delete
@@ -389,7 +1288,9 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(chassisIp) == str, 'chassisIp should be str type'
 
         self.eval('stc::disconnect %s' % chassisIp)
+        self._journal_remove('stc::connect %s' % chassisIp)
 
+    @profiled('stc::get')
     def stc_get(self, handle:str, attributes:Optional[list[str]]=[]) -> Union[dotdict, str, int, float, bool, datetime, NoReturn]:
         """stc::get
 
@@ -410,44 +1311,203 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         
         attributes_str = attributes_str.strip()
 
-        result = self.eval('stc::get %s %s' % (handle, attributes_str))
-
         if len(attributes) != 1:
 
-            return self._resolve_pairs(result)
+            # stc::get replies -name value pairs as a well-formed tcl list,
+            # so split it once and pair it up instead of scanning the raw text
+            return self._resolve_pairs(self._eval_list('stc::get %s %s' % (handle, attributes_str)))
 
         else:
             # if get only one attribute
 
-            ret = result.strip()
+            ret = self.eval('stc::get %s %s' % (handle, attributes_str)).strip()
             
             return  None if ret == '' else ret
 
-    def _resolve_pairs(self, data:str) -> dotdict:
+    def stc_sample(self, handles:Union[str, list], attributes:list[str]) -> dotdict:
+        """stc::get attributes of handles in one round-trip, and add them to the time series store if it's enabled
+
+        Args:
+            handles (str or list): handle, or list of handles(or STCObject), for example, result handles
+            attributes (list[str]): attributes to get
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            dotdict: handle -> dotdict(attribute -> value)
+        """
+        if type(handles) != list:
+            handles = [ handles ]
+
+        assert type(attributes) == list and len(attributes) > 0, 'attributes should be list type and not empty'
+
+        handles = [ str(handle) for handle in handles ]
+        options = ' '.join([ '-%s' % attribute for attribute in attributes ])
+        cmd = 'list %s' % ' '.join([ '[ stc::get %s %s ]' % (quote_tclstring(handle), options) for handle in handles ])
+
+        # timestamp of samples is the middle of the round-trip
+        begin = time.time_ns()
+        reply = self._eval_list(cmd)
+        timestamp = (begin + time.time_ns()) / 2e9
+
+        ret = dotdict()
+        for handle, values in zip(handles, reply):
+            if len(attributes) == 1:
+                ret[handle] = dotdict({ attributes[0]: values.strip() })
+            else:
+                ret[handle] = self._resolve_pairs(values)
+
+        if self.timeseries != None:
+            for handle, values in ret.items():
+                self.timeseries.add_many(handle, values, timestamp)
+
+        return ret
+
+    def _eval_list(self, cmd:str) -> tuple:
+        """run tcl shell command, and split the result as tcl list
+
+        unlike eval, empty lines inside the values are kept as they are
+
+        Args:
+            cmd (str): cmd to run
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            tuple: elements of the result list
+        """
+        assert self._tclsh != None, "tcl is not started"
+
+        logger.info(cmd)
+        ret = self._tcl_eval(cmd, to_list=True)
+
+        logger.debug(ret)
+        return ret
+
+    def _resolve_pairs(self, data:Union[str, tuple, list]) -> dotdict:
         """parse name-value pairs
 
         Args:
-            data (str): string contains name-value
+            data (str, tuple or list): string contains name-value, or the tcl list already split
 
         Returns:
             dotdict: dict that contains name-value
         """
-        assert type(data) == str, 'data should be str type'
+        with self._phase('parse'):
+            return resolve_pairs(data)
+
+    def wait_until(self, handles:Union[str, list], attribute:str, predicate:str, timeout:float=60, interval:float=1) -> dotdict:
+        """poll attribute of handles in tclsh until predicate is met, or timeout
+
+        the polling loop runs inside tclsh, so it costs one round-trip no matter how many handles and polls
+
+        predicate is a tcl expression on $value, for example, '$value eq "UP"' or '$value > 0',
+        if it doesn't refer to $value, it's the expected value, compared case-insensitively, for example, 'true'
+
+        Args:
+            handles (str or list): handle, or list of handles(or STCObject) to poll
+            attribute (str): attribute to poll
+            predicate (str): tcl expression on $value, or the expected value
+            timeout (float, optional): timeout in seconds. Defaults to 60
+            interval (float, optional): polling interval in seconds. Defaults to 1
 
-        pair_re = re.compile('\s?-([\w\d\-\.]+)\s((\{[^{}]+\})|([\S]+))\s?')
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            dotdict: handle -> dotdict(met, value, time), value is the final value, 
+                     time is the seconds since start when predicate is met, None if it's not met
+        """
+        if type(handles) != list:
+            handles = [ handles ]
+
+        assert type(attribute) == str, 'attribute should be str type'
+        assert type(predicate) == str, 'predicate should be str type'
+
+        if '$value' not in predicate:
+            predicate = '[ string equal -nocase $value %s ]' % quote_tclstring(predicate)
 
         ret = dotdict()
+        for item in self.call_proc('wait_until', quote_tcllist([ str(handle) for handle in handles ]), attribute, predicate, 
+                                   int(timeout * 1000), int(interval * 1000), to_list=True):
+            
+            handle, value, time_ = tclstring_to_list(item)
+            ret[handle] = dotdict(met=time_ != '', value=value, time=float(time_) if time_ != '' else None)
+
+        return ret
+
+    def stc_query(self, root:Union[str, list]='project1', object_type:Optional[str]=None, where:Optional[dict]=None, 
+                  depth:Optional[int]=None, attributes:Optional[list[str]]=None) -> list[dotdict]:
+        """find objects under root by type and attribute conditions
+
+        objects are walked in tclsh, only matched handles and the attributes asked for are returned, for example:
+
+            # streamblocks whose Name starts with video
+            stc_query('project1', object_type='StreamBlock', where={'Name': re.compile('^video')}, attributes=['Name'])
 
-        for t in pair_re.findall(data):
+            # ports which are offline
+            stc_query('project1', object_type='Port', where={'Online': 'false'}, depth=1)
 
-            key, val, _, _ = t
+        condition of where is:
+            str, int, float or bool: attribute equals to it
+            re.Pattern: attribute matches the pattern, tcl regexp syntax, flags I, M, S and X are supported
+            tuple(min, max): attribute is a number in the range, None for no limit
 
-            if val.startswith('{') and val.endswith('}'):
+        Args:
+            root (str or list, optional): handle or DDN path, or list of them, to walk from. Defaults to 'project1'
+            object_type (str, optional): object type, as stc::get -children-<type> filters children. Defaults to None, all types
+            where (dict, optional): attribute -> condition. Defaults to None, no condition
+            depth (int, optional): max depth under root, 1 for children. Defaults to None, no limit
+            attributes (list[str], optional): attributes to return. Defaults to None, only handle
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            list[dotdict]: matched objects, with handle and the attributes asked for
+        """
+        roots = root if isinstance(root, list) else [ root ]
+        where = where if where != None else { }
+        attributes = attributes if attributes != None else [ ]
+
+        assert isinstance(where, dict), 'where should be dict type'
+        assert depth == None or (isinstance(depth, int) and depth > 0), 'depth should be positive int'
+        assert object_type == None or re.match(r'^\w+$', object_type), 'object_type should only contain letters and digits'
+
+        conditions = [ ]
+        for attribute, condition in where.items():
+
+            if isinstance(condition, re.Pattern):
+                assert condition.flags & ~_REGEXP_FLAGS == 0, 'only flags I, M, S and X of %s are supported' % attribute
+
+                # unlike python, . matches new line in tcl, unless -linestop is set
+                switches = [ switch for flag, switch in _REGEXP_SWITCHES.items() if condition.flags & flag ]
+                if not condition.flags & re.S:
+                    switches.append('-linestop')
+                conditions.append([ attribute, 're', condition.pattern, quote_tcllist(switches) ])
+            elif isinstance(condition, tuple):
+                assert len(condition) == 2, 'range condition should be (min, max)'
+
+                conditions.append([ attribute, 'range' ] + [ '' if v == None else v for v in condition ])
+            elif isinstance(condition, bool):
+                conditions.append([ attribute, 'eq', 'true' if condition else 'false', '' ])
+            else:
+                conditions.append([ attribute, 'eq', condition, '' ])
+
+        ret = [ ]
+        for item in self.call_proc('query', quote_tcllist([ str(r) for r in roots ]), object_type if object_type != None else '', 
+                                   quote_tcllist([ quote_tcllist(c) for c in conditions ]), depth if depth != None else -1, 
+                                   quote_tcllist(attributes), to_list=True):
             
-                val = val[1:-1].strip()
-        
-            ret[key] = val
-        
+            handle, values = tclstring_to_list(item)
+            values = tclstring_to_list(values)
+
+            obj = dotdict(handle=handle)
+            obj.update(zip(values[0::2], values[1::2]))
+            ret.append(obj)
+
         return ret
 
     def stc_help(self, arg:str=None) -> str:
@@ -504,6 +1564,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
 
         self.eval('stc::log %s "%s"' % (level, message))
     
+    @profiled('stc::perform')
     def stc_perform(self, cmd:str, **kwargs) -> NoReturn:
         """stc::perform
 
@@ -515,7 +1576,14 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         """
         assert type(cmd) == str, 'cmd should be str type'
 
-        result = self.eval('stc::perform %s %s' % (cmd, dict_to_opt(kwargs, prefix='-')))
+        cmd = 'stc::perform %s %s' % (cmd, self._encode(kwargs))
+        result = self.eval(cmd)
+
+        if self._standby and cmd.lower().startswith('stc::perform loadfromxml'):
+            # only the last loaded configuration is replayed
+            for loaded in [ c for c in self._journal if c.lower().startswith('stc::perform loadfromxml') ]:
+                self._journal_remove(loaded)
+            self._journal_add(cmd)
 
         return self._resolve_pairs(result)
 
@@ -531,6 +1599,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(location) == str, 'location should be str type'
 
         self.eval('stc::release %s' % location)
+        self._journal_remove('stc::reserve %s' % location)
     
     def stc_reserve(self, location:str) -> NoReturn:
         """stc::reserve
@@ -544,20 +1613,29 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(location) == str, 'location should be str type'
 
         self.eval('stc::reserve %s' % location)
+        self._journal_add('stc::reserve %s' % location)
     
-    def stc_sleep(self, duration:int) -> NoReturn:
+    def stc_sleep(self, duration:int, background:bool=False) -> Optional[Job]:
         """stc::sleep
 
         Args:
             duration (int): sleep duration
+            background (bool, optional): sleep in a background job, the session is free meanwhile. Defaults to False
 
         Raises:
             TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            Job: job if background is True
         """
         assert type(duration) == int, 'duration should be int type'
 
+        if background:
+            return self.start_job('::spirentapi::job_sleep %s' % duration, name='stc::sleep')
+
         self.eval('stc::sleep %s' % duration)
     
+    @profiled('stc::subscribe')
     def stc_subscribe(self, parent:str, configType:str, resultType:str, **kwargs) -> str:
         """stc::subscribe
 
@@ -576,7 +1654,7 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
         assert type(configType) == str, 'configType should be str type'
         assert type(resultType) == str, 'resultType should be str type'
 
-        return self.eval('stc::subscribe -parent %s -configType %s -resultType %s %s' % (parent, configType, resultType, dict_to_opt(kwargs, prefix='-')))
+        return self.eval('stc::subscribe -parent %s -configType %s -resultType %s %s' % (parent, configType, resultType, self._encode(kwargs)))
     
     def stc_unsubscribe(self, parent:str) -> NoReturn:
         """stc::unsubscribe
@@ -591,15 +1669,24 @@ class SpirentAPI(metaclass=SpirentAPIMeta):
 
         self.eval('stc::unsubscribe %s' % parent)
 
-    def stc_waitUntilComplete(self, timeout:Optional[int]=None) -> NoReturn:
+    def stc_waitUntilComplete(self, timeout:Optional[int]=None, background:bool=False) -> Optional[Job]:
         """stc::waitUntilComplete
 
         Args:
             timeout (Optional[int], optional): timeout in seconds. Defaults to None, wait until complete
+            background (bool, optional): wait in a background job polling the sequencer, the session is free meanwhile,
+                                         the result of the job is TestState of the sequencer. Defaults to False
 
         Raises:
             TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            Job: job if background is True
         """
+        if background:
+            assert timeout == None or type(timeout) == int, 'timeout should be int type'
+            return self.start_job('::spirentapi::job_wait_complete %s' % (timeout if timeout != None else '{}'), name='stc::waitUntilComplete')
+
         if timeout == None:
 
             self.eval('stc::waitUntilComplete')
@@ -0,0 +1,400 @@
+'''
+Packet capture, saved as pcap and read through a memory map
+'''
+import ipaddress
+import logging
+import mmap
+import os
+import re
+import struct
+from collections import namedtuple
+from typing import Callable, Iterator, NoReturn, Optional, Union
+
+from .apiwrapper import SpirentAPI
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# fields of frame index
+FIELDS = ['offset', 'timestamp', 'caplen', 'length', 'ethertype', 'vlan', 'proto', 'src_ip', 'dst_ip', 'src_port', 'dst_port']
+
+# frame read from pcap, data is a memoryview of the mapped file, ip addresses are int, only ipv4 addresses are indexed
+Frame = namedtuple('Frame', ['number'] + FIELDS + ['data'])
+
+_MAGIC = { 0xa1b2c3d4: 1e-6, 0xa1b23c4d: 1e-9 }
+_PCAPNG_MAGIC = 0x0a0d0d0a
+_LINKTYPE_ETHERNET = 1
+
+_ETHERTYPE_VLAN = [0x8100, 0x88a8, 0x9100]
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86dd
+_PROTO_PORTS = [6, 17, 132]
+
+# characters substituted by tcl in double-quoted option values
+_unquotable = re.compile(r'["$\[\\]')
+
+
+def _parse_headers(buf, offset:int, caplen:int) -> tuple:
+    """parse ethernet, vlan, ip and tcp/udp/sctp ports of a frame
+
+    Returns:
+        tuple: ethertype, vlan, proto, src_ip, dst_ip, src_port, dst_port, -1 or 0 if the header is not in the frame
+    """
+    ethertype, vlan, proto, src_ip, dst_ip, src_port, dst_port = -1, -1, -1, 0, 0, -1, -1
+
+    end = offset + caplen
+    pos = offset + 12
+    if pos + 2 > end:
+        return ethertype, vlan, proto, src_ip, dst_ip, src_port, dst_port
+
+    ethertype, = struct.unpack_from('!H', buf, pos)
+    pos = pos + 2
+
+    # outer vlan tag is indexed
+    while ethertype in _ETHERTYPE_VLAN and pos + 4 <= end:
+        tci, ethertype = struct.unpack_from('!HH', buf, pos)
+        if vlan == -1:
+            vlan = tci & 0x0fff
+        pos = pos + 4
+
+    if ethertype == _ETHERTYPE_IPV4 and pos + 20 <= end:
+        version_ihl, = struct.unpack_from('!B', buf, pos)
+        proto, src_ip, dst_ip = struct.unpack_from('!B2xII', buf, pos + 9)
+        pos = pos + (version_ihl & 0x0f) * 4
+    elif ethertype == _ETHERTYPE_IPV6 and pos + 40 <= end:
+        proto, = struct.unpack_from('!B', buf, pos + 6)
+        pos = pos + 40
+    else:
+        return ethertype, vlan, proto, src_ip, dst_ip, src_port, dst_port
+
+    if proto in _PROTO_PORTS and pos + 4 <= end:
+        src_port, dst_port = struct.unpack_from('!HH', buf, pos)
+
+    return ethertype, vlan, proto, src_ip, dst_ip, src_port, dst_port
+
+def _ip(value:Union[str, int]) -> int:
+    """convert ipv4 address to int"""
+    return int(ipaddress.IPv4Address(value)) if type(value) == str else value
+
+
+class PcapFile:
+    """pcap file read through a memory map
+
+    frames are never loaded together, index of frames keeps offset, timestamp, length and basic header fields,
+    if numpy is installed, index columns are numpy arrays and filters are vectorized, otherwise lists
+
+    Example:
+        with PcapFile('port1.pcap') as pcap:
+            len(pcap)
+            pcap.index['timestamp']
+            for frame in pcap.frames(proto=17, dst_port=4789):
+                frame.timestamp, bytes(frame.data)
+    """
+
+    def __init__(self, path:str) -> NoReturn:
+        """init function
+
+        Args:
+            path (str): pcap file path, pcapng is not supported
+
+        Raises:
+            ValueError: if it's not a pcap file, raise ValueError
+        """
+        assert type(path) == str, 'path should be str type'
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(self._file.fileno()).st_size > 0 else b''
+        self._index = None
+
+        if len(self._map) < 24:
+            self.close()
+            raise ValueError('%s is not a pcap file' % path)
+
+        magic, = struct.unpack_from('<I', self._map, 0)
+        if magic in _MAGIC:
+            self._endian = '<'
+        else:
+            magic, = struct.unpack_from('>I', self._map, 0)
+            self._endian = '>'
+
+        if magic not in _MAGIC:
+            self.close()
+            if magic == _PCAPNG_MAGIC:
+                raise ValueError('%s is pcapng, save capture as pcap' % path)
+            raise ValueError('%s is not a pcap file' % path)
+
+        self._resolution = _MAGIC[magic]
+        self.snaplen, self.linktype = struct.unpack_from(self._endian + '16xII', self._map, 0)
+        self._record = struct.Struct(self._endian + 'IIII')
+
+    def _records(self, start:int=24) -> Iterator[tuple]:
+        """scan record headers
+
+        Returns:
+            Iterator[tuple]: offset of frame data, timestamp, caplen, length
+        """
+        record = self._record
+        size = len(self._map)
+        offset = start
+
+        while offset + 16 <= size:
+            seconds, fraction, caplen, length = record.unpack_from(self._map, offset)
+            if offset + 16 + caplen > size:
+                # the last frame is still being written
+                break
+            yield offset + 16, seconds + fraction * self._resolution, caplen, length
+            offset = offset + 16 + caplen
+
+    def _scan(self) -> Iterator[tuple]:
+        """scan frames, with header fields"""
+        ethernet = self.linktype == _LINKTYPE_ETHERNET
+        for offset, timestamp, caplen, length in self._records():
+            headers = _parse_headers(self._map, offset, caplen) if ethernet else (-1, -1, -1, 0, 0, -1, -1)
+            yield (offset, timestamp, caplen, length) + headers
+
+    @property
+    def index(self) -> dict:
+        """index of frames, built by one scan when it's first accessed
+
+        Returns:
+            dict: field -> column
+        """
+        if self._index == None:
+
+            if np != None:
+                self._index, count = self._build_arrays()
+            else:
+                self._index = { name: [ ] for name in FIELDS }
+                columns = [ self._index[name] for name in FIELDS ]
+                for row in self._scan():
+                    for column, value in zip(columns, row):
+                        column.append(value)
+                count = len(self._index['offset'])
+
+            logger.info('%s: %d frames indexed' % (self.path, count))
+
+        return self._index
+
+    def _build_arrays(self, chunk:int=65536) -> tuple:
+        """scan frames into numpy arrays, which grow by doubling, rows of one chunk are copied into them at a time
+
+        Returns:
+            tuple: field -> array, number of frames
+        """
+        types = [ np.int64, np.float64, np.int64, np.int64, np.int32, np.int32, np.int32, np.uint32, np.uint32, np.int32, np.int32 ]
+
+        # frames are 60 bytes at least, unless they're cut by snaplen
+        capacity = max(chunk, (len(self._map) - 24) // (16 + 60))
+        arrays = [ np.empty(capacity, dtype=type_) for type_ in types ]
+        count = 0
+        rows = [ ]
+
+        def flush():
+            nonlocal arrays, count
+            if count + len(rows) > len(arrays[0]):
+                size = max(count + len(rows), len(arrays[0]) * 2)
+                arrays = [ np.concatenate([ array[:count], np.empty(size - count, dtype=array.dtype) ]) for array in arrays ]
+            for array, column in zip(arrays, zip(*rows)):
+                array[count:count + len(rows)] = column
+            count = count + len(rows)
+            rows.clear()
+
+        for row in self._scan():
+            rows.append(row)
+            if len(rows) == chunk:
+                flush()
+        if rows:
+            flush()
+
+        return { name: array[:count].copy() for name, array in zip(FIELDS, arrays) }, count
+
+    def __len__(self) -> int:
+        return len(self.index['offset'])
+
+    def _frame(self, number:int, row:tuple) -> Frame:
+        offset, caplen = row[0], row[2]
+        return Frame(number, *row, memoryview(self._map)[offset:offset + caplen])
+
+    def __getitem__(self, number:int) -> Frame:
+        """frame by number, from 0"""
+        index = self.index
+        return self._frame(number, tuple(index[name][number].item() if np != None else index[name][number] for name in FIELDS))
+
+    def select(self, start:Optional[float]=None, end:Optional[float]=None, **conditions) -> list:
+        """numbers of frames matching conditions, by index
+
+        Args:
+            start (float, optional): timestamp from, included. Defaults to None
+            end (float, optional): timestamp to, excluded. Defaults to None
+            conditions (optional): field=value, or field=list of values, src_ip and dst_ip accept str
+
+        Returns:
+            list: frame numbers
+        """
+        index = self.index
+        conditions = self._conditions(conditions)
+
+        if np != None:
+            mask = np.ones(len(index['offset']), dtype=bool)
+            if start != None:
+                mask &= index['timestamp'] >= start
+            if end != None:
+                mask &= index['timestamp'] < end
+            for name, values in conditions.items():
+                mask &= np.isin(index[name], values)
+            return np.nonzero(mask)[0].tolist()
+
+        return [ number for number in range(len(index['offset']))
+                    if (start == None or index['timestamp'][number] >= start)
+                    and (end == None or index['timestamp'][number] < end)
+                    and all([ index[name][number] in values for name, values in conditions.items() ]) ]
+
+    def _conditions(self, conditions:dict) -> dict:
+        """field -> list of values"""
+        ret = { }
+        for name, value in conditions.items():
+            assert name in FIELDS, 'unknown field %s, should be one of %s' % (name, FIELDS)
+            values = value if type(value) in [list, tuple, set] else [ value ]
+            ret[name] = [ _ip(value) for value in values ] if name in ['src_ip', 'dst_ip'] else list(values)
+        return ret
+
+    def frames(self, predicate:Optional[Callable[[Frame], bool]]=None, start:Optional[float]=None, end:Optional[float]=None, **conditions) -> Iterator[Frame]:
+        """iterate frames matching conditions
+
+        if index is not built, frames are scanned once without building it, so memory use doesn't grow with file size.
+        data of frame is a view of the mapped file, copy it by bytes(frame.data) to keep it after the file is closed
+
+        Args:
+            predicate (Callable[[Frame], bool], optional): extra filter of frame. Defaults to None
+            start (float, optional): timestamp from, included. Defaults to None
+            end (float, optional): timestamp to, excluded. Defaults to None
+            conditions (optional): field=value, or field=list of values, see select
+
+        Returns:
+            Iterator[Frame]: frames
+        """
+        if self._index != None:
+            for number in self.select(start=start, end=end, **conditions):
+                frame = self[number]
+                if predicate == None or predicate(frame):
+                    yield frame
+            return
+
+        conditions = self._conditions(conditions)
+        positions = [ (FIELDS.index(name), values) for name, values in conditions.items() ]
+
+        for number, row in enumerate(self._scan()):
+            if start != None and row[1] < start:
+                continue
+            if end != None and row[1] >= end:
+                continue
+            if not all([ row[position] in values for position, values in positions ]):
+                continue
+            frame = self._frame(number, row)
+            if predicate == None or predicate(frame):
+                yield frame
+
+    def close(self) -> NoReturn:
+        """unmap and close file, frame data still referenced keeps the map open until it's released
+        """
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                logger.debug('frame data of %s is still referenced' % self.path)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return 'PcapFile(%s)' % repr(self.path)
+
+
+class Capture:
+    """capture of port, started, stopped and saved as pcap by stc::perform
+
+    Example:
+        capture = Capture('port1')
+        capture.start()
+        ...
+        capture.stop()
+        with capture.save('port1.pcap') as pcap:
+            for frame in pcap.frames(dst_ip='192.168.1.1'):
+                ...
+    """
+
+    def __init__(self, port:str, api:Optional[SpirentAPI]=None) -> NoReturn:
+        """init function
+
+        Args:
+            port (str): port handle
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+        """
+        assert type(port) == str, 'port should be str type'
+
+        self.port = port
+        self._api = api
+        self._handle = None
+
+    @property
+    def api(self) -> SpirentAPI:
+        return self._api if self._api != None else SpirentAPI.instance
+
+    @property
+    def handle(self) -> str:
+        """handle of capture object under port"""
+        if self._handle == None:
+            self._handle = self.api.stc_get(self.port, ['children-capture'])
+        return self._handle
+
+    def start(self) -> NoReturn:
+        """CaptureStart
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+        """
+        self.api.stc_perform('CaptureStart', captureProxyId=self.handle)
+
+    def stop(self) -> NoReturn:
+        """CaptureStop
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+        """
+        self.api.stc_perform('CaptureStop', captureProxyId=self.handle)
+
+    def save(self, path:str) -> PcapFile:
+        """CaptureDataSave as pcap, and open it
+
+        Args:
+            path (str): pcap file path, spaces are kept, ", $, [ and backslash in file name are not allowed
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            PcapFile: saved capture
+        """
+        assert type(path) == str, 'path should be str type'
+
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        directory = directory.replace('\\', '/')
+
+        # values are double-quoted when they have spaces, these would be substituted by tcl
+        for value in [ name, directory ]:
+            assert not _unquotable.search(value), 'path should not contain ", $, [ or backslash in file name: %s' % path
+
+        self.api.stc_perform('CaptureDataSave', captureProxyId=self.handle,
+                             FileName=name, FileNamePath=directory, FileNameFormat='PCAP', IsScap='FALSE')
+
+        return PcapFile(path)
@@ -0,0 +1,143 @@
+'''
+spirentapi command, run scenario files through sessions
+
+Example:
+    spirentapi throughput.json --var chassis=10.0.0.1
+    spirentapi soak.tcl --repeat 100 --parallel-sessions 4 --emulator
+'''
+import argparse
+import logging
+import math
+import sys
+import threading
+import time
+from typing import Optional
+
+from .pool import SessionPool
+from .scenario import Scenario
+
+logger = logging.getLogger(__name__)
+
+
+def _variables(items:list) -> dict:
+    """parse NAME=VALUE options"""
+    ret = { }
+    for item in items:
+        name, sep, value = item.partition('=')
+        if sep == '' or name == '':
+            raise argparse.ArgumentTypeError('--var should be NAME=VALUE, not %s' % item)
+        ret[name] = value
+    return ret
+
+def _percentile(values:list, q:float) -> float:
+    """percentile of sorted values, nearest rank"""
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+def report(results:list) -> str:
+    """text report of step results, one line per step, times in milliseconds
+
+    Args:
+        results (list[StepResult]): results of all runs
+
+    Returns:
+        str: report
+    """
+    steps = { }
+    for result in results:
+        item = steps.setdefault(result.index, [ result.name, [ ], 0 ])
+        item[1].append(result.seconds * 1000)
+        if not result.ok:
+            item[2] = item[2] + 1
+
+    lines = [ '%5s %-40s %6s %6s %10s %10s %10s %10s' % ('step', 'name', 'runs', 'failed', 'min', 'mean', 'p95', 'max') ]
+    for index, (name, times, failed) in sorted(steps.items()):
+        times.sort()
+        lines.append('%5d %-40s %6d %6d %10.3f %10.3f %10.3f %10.3f' % (index, name[:40], len(times), failed,
+                     times[0], sum(times) / len(times), _percentile(times, 95), times[-1]))
+
+    return '\n'.join(lines)
+
+def main(argv:Optional[list]=None) -> int:
+    """entry point of spirentapi command
+
+    Args:
+        argv (list, optional): arguments. Defaults to None, sys.argv[1:]
+
+    Returns:
+        int: exit code, 0 if all steps passed, 1 if any step failed
+    """
+    parser = argparse.ArgumentParser(prog='spirentapi', description='run scenario, a tcl script or a json step list, through Spirent TestCenter sessions, independent steps are pipelined')
+    parser.add_argument('scenario', help='scenario file, .tcl or .json')
+    parser.add_argument('--format', choices=[ 'tcl', 'json' ], default=None, help='scenario format, default by file extension')
+    parser.add_argument('--var', action='append', default=[ ], metavar='NAME=VALUE', help='global tcl variable set before the scenario, can be repeated')
+    parser.add_argument('--repeat', type=int, default=1, help='times each session runs the scenario, default 1')
+    parser.add_argument('--parallel-sessions', type=int, default=1, help='sessions running the scenario at the same time, default 1')
+    parser.add_argument('--batch-size', type=int, default=100, help='max steps sent without waiting for replies, default 100')
+    parser.add_argument('--continue-on-error', action='store_true', default=False, help="don't stop a run when a step fails")
+    parser.add_argument('--emulator', action='store_true', default=False, help='run on the emulator, without chassis')
+    parser.add_argument('--standby', action='store_true', default=False, help='keep a standby tclsh in every session')
+    parser.add_argument('--verbose', '-v', action='store_true', default=False, help='print every step')
+    parser.add_argument('--log-level', default='WARNING', help='logging level, default WARNING')
+
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1 or args.parallel_sessions < 1 or args.batch_size < 1:
+        parser.error('--repeat, --parallel-sessions and --batch-size should be positive')
+
+    try:
+        variables = _variables(args.var)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    scenario = Scenario(args.scenario, args.format)
+
+    start = time.perf_counter()
+    pool = SessionPool(args.parallel_sessions, threadsafe=True, standby=args.standby, emulator=args.emulator)
+    print('%d sessions started in %.3f seconds' % (args.parallel_sessions, time.perf_counter() - start))
+
+    results = [ ]
+    errors = [ ]
+    lock = threading.Lock()
+
+    def run(session:int, api) -> None:
+        for iteration in range(args.repeat):
+            try:
+                ret = scenario.run(api, args.batch_size, dict(variables, session=session, iteration=iteration), not args.continue_on_error)
+            except Exception as e:
+                logger.exception(e)
+                with lock:
+                    errors.append(e)
+                return
+
+            with lock:
+                results.extend(ret)
+                if args.verbose:
+                    for result in ret:
+                        print('%d %d %5d %-40s %-4s %10.3f %s' % (session, iteration, result.index, result.name[:40],
+                              'ok' if result.ok else 'FAIL', result.seconds * 1000, result.result.strip().replace('\n', ' ')[:80]))
+                elif not all([ result.ok for result in ret ]):
+                    failed = [ result for result in ret if not result.ok ][0]
+                    print('session %d iteration %d step %d %s failed: %s' % (session, iteration, failed.index, failed.name, failed.result), file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        threads = [ threading.Thread(target=run, args=(i, api), name='Scenario%d' % i) for i, api in enumerate(pool.sessions) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = time.perf_counter() - start
+        pool.close()
+
+    if results:
+        print(report(results))
+    print('%d steps in %.3f seconds, %.1f steps per second' % (len(results), elapsed, len(results) / elapsed if elapsed > 0 else 0))
+
+    for e in errors:
+        print('error: %s' % e, file=sys.stderr)
+
+    return 0 if not errors and all([ result.ok for result in results ]) else 1
+
@@ -0,0 +1,216 @@
+'''
+Content-addressed configuration cache for LoadFromXml/SaveAsXml
+'''
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, NoReturn, Optional
+
+from .apiwrapper import SpirentAPI
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_file(path:str) -> str:
+    """sha256 of file content
+
+    Args:
+        path (str): file path
+
+    Returns:
+        str: hex digest
+    """
+    assert type(path) == str, 'path should be str type'
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint(key:Any) -> str:
+    """sha256 of a json-serializable description of configuration, for example, reconcile spec
+
+    Args:
+        key (Any): json-serializable description
+
+    Returns:
+        str: hex digest
+    """
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+# unset fingerprint of loaded configuration when commands change it, the traces are added once per session.
+# performs which only read, save, subscribe or run the configuration are listed, every other perform may change it.
+# commands run while ::spirentapi::readonly > 0 are not watched, for example, paging of result views
+_WATCH = '''
+namespace eval ::spirentapi {
+    variable readonly_performs { saveasxml saveresult* export* get* subscribe* unsubscribe* updatedynamicresultview refresh*
+                                 generatorstart generatorstop analyzerstart analyzerstop capturestart capturestop capturedatasave
+                                 resultsclear* devicesstart* devicesstop* arpndstart* protocolstart protocolstop wait* }
+}
+proc ::spirentapi::config_changed { command args } {
+    if { [ info exists ::spirentapi::readonly ] && $::spirentapi::readonly > 0 } {
+        return
+    }
+    if { [ string match -nocase *perform* [ lindex $command 0 ] ] } {
+        set name [ regsub {command$} [ string tolower [ lindex $command 1 ] ] {} ]
+        foreach pattern $::spirentapi::readonly_performs {
+            if { [ string match $pattern $name ] } {
+                return
+            }
+        }
+    }
+    unset -nocomplain ::spirentapi::config
+}
+foreach command { ::stc::create ::stc::config ::stc::delete ::stc::perform } {
+    if { [ lsearch -exact [ trace info execution $command ] { enter ::spirentapi::config_changed } ] < 0 } {
+        trace add execution $command enter ::spirentapi::config_changed
+    }
+}
+'''
+
+
+class ConfigCache:
+    """skip reloading configuration which is already loaded in the session, and keep configuration images on disk
+
+    the fingerprint of the loaded configuration is saved in the tcl session,
+    so it's known by every SpirentAPI using the same session.
+    it's forgotten when stc::create, stc::config, stc::delete, or any stc::perform except the ones only reading, saving,
+    subscribing or running the configuration (SaveAsXml, Get*, Subscribe*, GeneratorStart ...) are run in the session,
+    sth:: functions included, as they run these commands, so edits in place are detected.
+    call invalidate after changing the configuration in other ways
+
+    Example:
+        cache = ConfigCache('config_cache')
+
+        # LoadFromXml only when another configuration is loaded
+        cache.load('topology.xml')
+
+        # build configuration by code once, later it's restored from the SaveAsXml image
+        cache.build({'ports': 2, 'streams': 4000}, lambda api: build_topology(api))
+    """
+
+    def __init__(self, cache_dir:Optional[str]=None, api:Optional[SpirentAPI]=None) -> NoReturn:
+        """init function
+
+        Args:
+            cache_dir (str, optional): directory to keep SaveAsXml images, named by fingerprint. Defaults to None, don't keep images
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+        """
+        if cache_dir != None:
+            assert type(cache_dir) == str, 'cache_dir should be str type'
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self._api = api
+
+    @property
+    def api(self) -> SpirentAPI:
+        return self._api if self._api != None else SpirentAPI.instance
+
+    @property
+    def loaded(self) -> Optional[str]:
+        """fingerprint of the configuration loaded in the session
+
+        Returns:
+            str: fingerprint, None if it's unknown
+        """
+        ret = self.api.eval('if { [ info exists ::spirentapi::config ] } { set ::spirentapi::config }')
+        return None if ret == '' else ret
+
+    def _mark(self, fingerprint_:str) -> NoReturn:
+        """save fingerprint of loaded configuration in the session, it's unset by commands changing the configuration"""
+        self.api.eval(_WATCH)
+        self.api.eval('namespace eval ::spirentapi { variable config %s }' % fingerprint_)
+
+    def invalidate(self) -> NoReturn:
+        """forget the loaded configuration, call it after changing the configuration
+        """
+        self.api.eval('if { [ info exists ::spirentapi::config ] } { unset ::spirentapi::config }')
+
+    def image(self, fingerprint_:str) -> Optional[str]:
+        """path of configuration image
+
+        Args:
+            fingerprint_ (str): fingerprint
+
+        Returns:
+            str: image path, None if cache_dir is not set
+        """
+        if self.cache_dir == None:
+            return None
+
+        return os.path.join(self.cache_dir, '%s.xml' % fingerprint_)
+
+    def _load_xml(self, path:str) -> NoReturn:
+        """LoadFromXml"""
+        logger.info('LoadFromXml %s' % path)
+        self.api.stc_perform('LoadFromXml', FileName=os.path.abspath(path).replace('\\', '/'))
+
+    def _save_xml(self, path:str) -> NoReturn:
+        """SaveAsXml"""
+        logger.info('SaveAsXml %s' % path)
+        self.api.stc_perform('SaveAsXml', config='project1', FileName=os.path.abspath(path).replace('\\', '/'))
+
+    def load(self, path:str) -> bool:
+        """LoadFromXml, unless the same content is already loaded
+
+        Args:
+            path (str): xml file path
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            bool: True if it's loaded, False if it's skipped
+        """
+        fingerprint_ = fingerprint_file(path)
+
+        if self.loaded == fingerprint_:
+            logger.info('%s is already loaded, skip' % path)
+            return False
+
+        self.invalidate()
+        self._load_xml(path)
+        self._mark(fingerprint_)
+
+        return True
+
+    def build(self, key:Any, builder:Callable[[SpirentAPI], Any]) -> bool:
+        """build configuration described by key, unless it's already loaded
+
+        if the image of key is in cache_dir, it's loaded instead of calling builder,
+        otherwise builder is called, and the configuration is saved as image
+
+        Args:
+            key (Any): json-serializable description of configuration
+            builder (Callable[[SpirentAPI], Any]): function to build configuration
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            bool: True if it's built or restored, False if it's skipped
+        """
+        fingerprint_ = fingerprint(key)
+
+        if self.loaded == fingerprint_:
+            logger.info('configuration %s is already loaded, skip' % fingerprint_)
+            return False
+
+        self.invalidate()
+
+        image = self.image(fingerprint_)
+        if image != None and os.path.exists(image):
+            self._load_xml(image)
+        else:
+            builder(self.api)
+            if image != None:
+                # save to temp file first, so a partly written image is never used
+                self._save_xml(image + '.tmp')
+                os.replace(image + '.tmp', image)
+
+        self._mark(fingerprint_)
+
+        return True
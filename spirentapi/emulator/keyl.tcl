@@ -0,0 +1,124 @@
+# keyed list commands of Tclx, used by the emulator when Tclx is not installed
+#
+# keyed list is a list of { key value } pairs, value is a keyed list too for nested keys, keys are separated by .
+
+namespace eval ::keyl { }
+
+proc ::keyl::find { keyset key } {
+    set i 0
+    foreach field $keyset {
+        if { [ lindex $field 0 ] eq $key } {
+            return $i
+        }
+        incr i
+    }
+    return -1
+}
+
+proc ::keyl::is_keyset { value } {
+    if { [ catch { llength $value } size ] || $size == 0 } {
+        return 0
+    }
+    foreach field $value {
+        if { [ catch { llength $field } size ] || $size != 2 } {
+            return 0
+        }
+    }
+    return 1
+}
+
+proc ::keyl::get { keyset path } {
+    foreach key [ split $path . ] {
+        if { ![ is_keyset $keyset ] } {
+            return -code error "key \"$path\" not found in keyed list"
+        }
+        set i [ find $keyset $key ]
+        if { $i < 0 } {
+            return -code error "key \"$path\" not found in keyed list"
+        }
+        set keyset [ lindex $keyset $i 1 ]
+    }
+    return $keyset
+}
+
+proc ::keyl::set_ { keyset keys value } {
+    set key [ lindex $keys 0 ]
+    set i [ find $keyset $key ]
+    if { [ llength $keys ] == 1 } {
+        set new $value
+    } else {
+        set new [ set_ [ expr { $i < 0 ? [ list ] : [ lindex $keyset $i 1 ] } ] [ lrange $keys 1 end ] $value ]
+    }
+    if { $i < 0 } {
+        lappend keyset [ list $key $new ]
+    } else {
+        lset keyset $i [ list $key $new ]
+    }
+    return $keyset
+}
+
+proc ::keyl::del { keyset keys } {
+    set i [ find $keyset [ lindex $keys 0 ] ]
+    if { $i < 0 } {
+        return -code error "key \"[ join $keys . ]\" not found in keyed list"
+    }
+    if { [ llength $keys ] == 1 } {
+        return [ lreplace $keyset $i $i ]
+    }
+    lset keyset $i 1 [ del [ lindex $keyset $i 1 ] [ lrange $keys 1 end ] ]
+    return $keyset
+}
+
+# keylget listvar ?key? ?retvar?
+proc keylget { listvar args } {
+    upvar 1 $listvar keyset
+    if { [ llength $args ] == 0 } {
+        return [ keylkeys keyset ]
+    }
+    set key [ lindex $args 0 ]
+    if { [ llength $args ] == 1 } {
+        return [ ::keyl::get $keyset $key ]
+    }
+    set retvar [ lindex $args 1 ]
+    if { [ catch { ::keyl::get $keyset $key } value ] } {
+        return 0
+    }
+    if { $retvar ne "" } {
+        upvar 1 $retvar ret
+        set ret $value
+    }
+    return 1
+}
+
+# keylkeys listvar ?key?
+proc keylkeys { listvar { key "" } } {
+    upvar 1 $listvar keyset
+    set value [ expr { $key eq "" ? $keyset : [ ::keyl::get $keyset $key ] } ]
+    if { ![ ::keyl::is_keyset $value ] } {
+        return -code error "invalid keyed list format: $value"
+    }
+    set ret [ list ]
+    foreach field $value {
+        lappend ret [ lindex $field 0 ]
+    }
+    return $ret
+}
+
+# keylset listvar key value ?key value ...?
+proc keylset { listvar args } {
+    upvar 1 $listvar keyset
+    if { ![ info exists keyset ] } {
+        set keyset [ list ]
+    }
+    foreach { key value } $args {
+        set keyset [ ::keyl::set_ $keyset [ split $key . ] $value ]
+    }
+    return
+}
+
+# keyldel listvar key
+proc keyldel { listvar key } {
+    upvar 1 $listvar keyset
+    set keyset [ ::keyl::del $keyset [ split $key . ] ]
+    return
+}
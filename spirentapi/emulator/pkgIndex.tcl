@@ -0,0 +1,3 @@
+# Spirent TestCenter emulator, provides SpirentTestCenter and SpirentHltApi in memory, without chassis
+package ifneeded SpirentTestCenter 0.1 [ list source [ file join $dir stc.tcl ] ]
+package ifneeded SpirentHltApi 0.1 [ list source [ file join $dir sth.tcl ] ]
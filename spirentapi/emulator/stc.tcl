@@ -0,0 +1,645 @@
+# Spirent TestCenter emulator, stc:: object model in memory
+#
+# objects are kept in arrays by handle, handles are lowercase type and a number, like STC does, for example, port1.
+# attributes are case-insensitive, attributes never set are read as empty string.
+# results subscribed by stc::subscribe count frames at FrameRate of the result or its parent (default 1000) since they are subscribed.
+# DynamicResultView rows are filtered, grouped, sorted and paged when the view is subscribed or updated.
+# every port has a Capture child, CaptureDataSave writes an empty pcap file.
+# every command is delayed by the latency and jitter set by ::stcemu::configure
+
+namespace eval ::stcemu {
+
+    # seconds of latency and jitter per command, * for all commands
+    variable latency
+    variable jitter
+    array set latency { * 0 }
+    array set jitter { * 0 }
+
+    # microseconds commands are delayed in total, by command
+    variable delayed
+    array set delayed { }
+
+    variable count
+    variable type
+    variable parent
+    variable children
+    variable attrs
+    variable names
+    variable started
+    variable chassis [ list ]
+    variable reserved [ list ]
+
+    # variables saved by SaveAsXml
+    variable state { count type parent children attrs names started }
+}
+
+# set latency and jitter, value is seconds for all commands, or list of command seconds ..., * for other commands
+proc ::stcemu::configure { args } {
+    foreach { option value } $args {
+        switch -- $option {
+            -latency { upvar #0 ::stcemu::latency delays }
+            -jitter { upvar #0 ::stcemu::jitter delays }
+            default { error "unknown option $option, should be -latency or -jitter" }
+        }
+        if { [ llength $value ] == 1 } {
+            array unset delays
+            set delays(*) $value
+        } else {
+            array set delays $value
+        }
+    }
+    return
+}
+
+# wait latency +- jitter of command
+proc ::stcemu::delay { command } {
+    variable latency
+    variable jitter
+    variable delayed
+
+    set base [ expr { [ info exists latency($command) ] ? $latency($command) : $latency(*) } ]
+    set spread [ expr { [ info exists jitter($command) ] ? $jitter($command) : $jitter(*) } ]
+    if { $base == 0 && $spread == 0 } {
+        return
+    }
+
+    set microseconds [ expr { int(($base + $spread * (2 * rand() - 1)) * 1000000) } ]
+    if { $microseconds <= 0 } {
+        return
+    }
+    incr delayed($command) $microseconds
+
+    # after has millisecond resolution, the rest is busy waited
+    set end [ expr { [ clock microseconds ] + $microseconds } ]
+    after [ expr { $microseconds / 1000 } ]
+    while { [ clock microseconds ] < $end } { }
+}
+
+# forget all objects, only system1 is left
+proc ::stcemu::reset { } {
+    variable state
+    foreach name $state {
+        variable $name
+        array unset $name
+        array set $name { }
+    }
+    variable chassis [ list ]
+    variable reserved [ list ]
+
+    new system ""
+    return
+}
+
+proc ::stcemu::new { type_ parent_ } {
+    variable count
+    variable type
+    variable parent
+    variable children
+    variable attrs
+
+    set type_ [ string tolower $type_ ]
+    set handle $type_[ incr count($type_) ]
+
+    set type($handle) $type_
+    set parent($handle) $parent_
+    set children($handle) [ list ]
+    set attrs($handle) [ dict create ]
+    if { $parent_ ne "" } {
+        lappend children($parent_) $handle
+    }
+    return $handle
+}
+
+proc ::stcemu::check { handle } {
+    variable type
+    if { ![ info exists type($handle) ] } {
+        error "invalid handle \"$handle\""
+    }
+}
+
+proc ::stcemu::set_attributes { handle options } {
+    variable attrs
+    variable names
+    foreach { name value } $options {
+        set name [ string range $name 1 end ]
+        set key [ string tolower $name ]
+        set names($key) $name
+        dict set attrs($handle) $key $value
+    }
+}
+
+proc ::stcemu::get_attribute { handle name } {
+    variable type
+    variable parent
+    variable children
+    variable attrs
+    variable started
+
+    set key [ string tolower $name ]
+
+    if { $key eq "children" } {
+        return $children($handle)
+    }
+    if { [ string match children-* $key ] } {
+        set wanted [ string range $key 9 end ]
+        set ret [ list ]
+        foreach child $children($handle) {
+            if { $type($child) eq $wanted } {
+                lappend ret $child
+            }
+        }
+        return $ret
+    }
+    if { $key eq "parent" } {
+        return $parent($handle)
+    }
+
+    if { [ info exists started($handle) ] && ![ dict exists $attrs($handle) $key ] } {
+        # counters of subscribed results
+        # frame rate of result, or of the object it's subscribed for
+        set rate 1000
+        foreach source [ list $parent($handle) $handle ] {
+            if { [ dict exists $attrs($source) framerate ] } {
+                set rate [ dict get $attrs($source) framerate ]
+            }
+        }
+        set frames [ expr { wide(([ clock milliseconds ] - $started($handle)) * $rate / 1000) } ]
+        if { [ string match *octet* $key ] || [ string match *byte* $key ] } {
+            return [ expr { [ string match *rate $key ] ? $rate * 128 : $frames * 128 } ]
+        }
+        if { [ string match *rate $key ] } {
+            return $rate
+        }
+        if { [ string match *count $key ] } {
+            return $frames
+        }
+    }
+
+    if { [ dict exists $attrs($handle) $key ] } {
+        return [ dict get $attrs($handle) $key ]
+    }
+    return ""
+}
+
+proc ::stcemu::descendants { handle } {
+    variable children
+    set ret [ list ]
+    foreach child $children($handle) {
+        lappend ret $child {*}[ descendants $child ]
+    }
+    return $ret
+}
+
+proc ::stcemu::remove { handle } {
+    variable type
+    variable parent
+    variable children
+    variable attrs
+    variable started
+
+    foreach child $children($handle) {
+        remove $child
+    }
+
+    set parent_ $parent($handle)
+    if { $parent_ ne "" && [ info exists children($parent_) ] } {
+        set i [ lsearch -exact $children($parent_) $handle ]
+        set children($parent_) [ lreplace $children($parent_) $i $i ]
+    }
+
+    unset type($handle) parent($handle) children($handle) attrs($handle)
+    if { [ info exists started($handle) ] } {
+        unset started($handle)
+    }
+}
+
+proc ::stcemu::save { path } {
+    variable state
+    set f [ open $path w ]
+    puts $f "# Spirent TestCenter emulator configuration"
+    foreach name $state {
+        variable $name
+        puts $f [ list array set ::stcemu::$name [ array get $name ] ]
+    }
+    close $f
+}
+
+proc ::stcemu::load { path } {
+    reset
+    variable state
+    foreach name $state {
+        variable $name
+        array unset $name
+    }
+    source $path
+    return
+}
+
+# empty pcap file, link type ethernet
+proc ::stcemu::save_pcap { path } {
+    set f [ open $path wb ]
+    puts -nonewline $f [ binary format issiiii 0xa1b2c3d4 2 4 0 0 65535 1 ]
+    close $f
+}
+
+proc ::stcemu::options { args } {
+    set ret [ dict create ]
+    foreach { name value } $args {
+        dict set ret [ string tolower [ string range $name 1 end ] ] $value
+    }
+    return $ret
+}
+
+# value of property Type.Attribute of object, read from the object, its ancestors, or its first child of Type
+proc ::stcemu::property { handle property } {
+    variable type
+    variable parent
+    variable children
+
+    lassign [ split $property . ] wanted name
+    set wanted [ string tolower $wanted ]
+    for { set object $handle } { $object ne "" } { set object $parent($object) } {
+        if { $type($object) eq $wanted } {
+            return [ get_attribute $object $name ]
+        }
+    }
+    foreach child $children($handle) {
+        if { $type($child) eq $wanted } {
+            return [ get_attribute $child $name ]
+        }
+    }
+    return ""
+}
+
+# if object meets WhereConditions condition of PresentationResultQuery,
+# like StreamBlock.DroppedFrameCount > 0 AND Port.Name = 'Port 1'
+proc ::stcemu::matches { handle condition } {
+    regsub -all {'([^']*)'} $condition {{\1}} condition
+    regsub -all {([^=!<>])=([^=])} $condition {\1==\2} condition
+    regsub -all -nocase {\mAND\M} $condition {\&\&} condition
+    regsub -all -nocase {\mOR\M} $condition {||} condition
+    regsub -all -nocase {\mNOT\M} $condition {!} condition
+
+    set ret ""
+    while { [ regexp -indices {[A-Za-z_]\w*\.[A-Za-z_]\w*} $condition at ] } {
+        lassign $at first last
+        append ret [ string range $condition 0 [ expr { $first - 1 } ] ] [ list [ property $handle [ string range $condition $first $last ] ] ]
+        set condition [ string range $condition [ expr { $last + 1 } ] end ]
+    }
+    append ret $condition
+    return [ expr $ret ]
+}
+
+# fill ResultViewData of PresentationResultQuery of DynamicResultView,
+# rows of objects under FromObjects, filtered by WhereConditions,
+# grouped by GroupByProperties with numbers summed, sorted by SortBy, from LimitOffset, at most LimitSize rows
+proc ::stcemu::update_view { view } {
+    variable type
+    variable parent
+
+    foreach query [ get_attribute $view children-presentationresultquery ] {
+        foreach data [ get_attribute $query children-resultviewdata ] {
+            remove $data
+        }
+
+        set select [ get_attribute $query SelectProperties ]
+        set sources [ get_attribute $query FromObjects ]
+        if { $sources eq "" } {
+            set sources [ get_attribute $view ResultSources ]
+        }
+
+        # rows are objects of the deepest type of the properties, others are read from their ancestors
+        set wanted ""
+        set deepest -1
+        foreach property $select {
+            set candidate [ string tolower [ lindex [ split $property . ] 0 ] ]
+            foreach source $sources {
+                check $source
+                foreach handle [ list $source {*}[ descendants $source ] ] {
+                    if { $type($handle) eq $candidate } {
+                        set depth 0
+                        for { set object $handle } { $object ne "" } { set object $parent($object) } {
+                            incr depth
+                        }
+                        if { $depth > $deepest } {
+                            set wanted $candidate
+                            set deepest $depth
+                        }
+                        break
+                    }
+                }
+            }
+        }
+
+        set objects [ list ]
+        foreach source $sources {
+            check $source
+            foreach handle [ list $source {*}[ descendants $source ] ] {
+                if { $type($handle) ne $wanted || $handle in $objects } {
+                    continue
+                }
+                set matched 1
+                foreach condition [ get_attribute $query WhereConditions ] {
+                    if { ![ matches $handle $condition ] } {
+                        set matched 0
+                        break
+                    }
+                }
+                if { $matched } {
+                    lappend objects $handle
+                }
+            }
+        }
+
+        # rows are object values
+        set rows [ list ]
+        set groupBy [ get_attribute $query GroupByProperties ]
+        if { $groupBy eq "" } {
+            foreach handle $objects {
+                set values [ list ]
+                foreach property $select {
+                    lappend values [ property $handle $property ]
+                }
+                lappend rows [ list $handle $values ]
+            }
+        } else {
+            set keys [ list ]
+            foreach handle $objects {
+                set key [ list ]
+                foreach property $groupBy {
+                    lappend key [ property $handle $property ]
+                }
+                set values [ list ]
+                foreach property $select {
+                    lappend values [ property $handle $property ]
+                }
+                if { ![ info exists groups($key) ] } {
+                    lappend keys $key
+                    set groups($key) [ list $handle $values ]
+                    continue
+                }
+                lassign $groups($key) first sums
+                set i 0
+                foreach property $select sum $sums value $values {
+                    if { $property ni $groupBy && [ string is double -strict $sum ] && [ string is double -strict $value ] } {
+                        lset sums $i [ expr { $sum + $value } ]
+                    }
+                    incr i
+                }
+                set groups($key) [ list $first $sums ]
+            }
+            foreach key $keys {
+                lappend rows $groups($key)
+            }
+        }
+
+        # stable sort by the last key first
+        foreach item [ lreverse [ get_attribute $query SortBy ] ] {
+            lassign $item property order
+            set i [ lsearch -exact -nocase $select $property ]
+            set keyed [ list ]
+            set numeric 1
+            foreach row $rows {
+                lassign $row handle values
+                set value [ expr { $i >= 0 ? [ lindex $values $i ] : [ property $handle $property ] } ]
+                if { ![ string is double -strict $value ] } {
+                    set numeric 0
+                }
+                lappend keyed [ list $value $row ]
+            }
+            set rows [ list ]
+            foreach item [ lsort -index 0 [ expr { $numeric ? "-real" : "-dictionary" } ] \
+                               [ expr { [ string toupper $order ] eq "DESC" ? "-decreasing" : "-increasing" } ] $keyed ] {
+                lappend rows [ lindex $item 1 ]
+            }
+        }
+
+        set offset [ get_attribute $query LimitOffset ]
+        set offset [ expr { $offset eq "" ? 0 : $offset } ]
+        set size [ get_attribute $query LimitSize ]
+        set last [ expr { $size eq "" ? "end" : $offset + $size - 1 } ]
+        foreach row [ lrange $rows $offset $last ] {
+            set data [ new resultviewdata $query ]
+            set_attributes $data [ list -ResultData [ lindex $row 1 ] ]
+        }
+    }
+}
+
+namespace eval ::stc { }
+
+proc ::stc::create { objectType args } {
+    ::stcemu::delay stc::create
+
+    set parent_ system1
+    set options [ list ]
+    foreach { name value } $args {
+        if { [ string tolower $name ] eq "-under" } {
+            set parent_ $value
+        } else {
+            lappend options $name $value
+        }
+    }
+    ::stcemu::check $parent_
+
+    set handle [ ::stcemu::new $objectType $parent_ ]
+    ::stcemu::set_attributes $handle [ list -Name "$objectType [ string range $handle [ string length $objectType ] end ]" {*}$options ]
+
+    # capture is created with port, like STC does
+    if { [ string tolower $objectType ] eq "port" } {
+        ::stcemu::set_attributes [ ::stcemu::new capture $handle ] [ list -Status IDLE ]
+    }
+    return $handle
+}
+
+proc ::stc::config { handle args } {
+    ::stcemu::delay stc::config
+    ::stcemu::check $handle
+    ::stcemu::set_attributes $handle $args
+    return
+}
+
+proc ::stc::get { handle args } {
+    ::stcemu::delay stc::get
+    ::stcemu::check $handle
+
+    if { [ llength $args ] == 1 } {
+        return [ ::stcemu::get_attribute $handle [ string range [ lindex $args 0 ] 1 end ] ]
+    }
+
+    set ret [ list ]
+    if { [ llength $args ] == 0 } {
+        upvar #0 ::stcemu::attrs attrs ::stcemu::names names
+        dict for { key value } $attrs($handle) {
+            lappend ret -$names($key) $value
+        }
+        lappend ret -children [ ::stcemu::get_attribute $handle children ] -parent [ ::stcemu::get_attribute $handle parent ]
+        return $ret
+    }
+
+    foreach name $args {
+        lappend ret $name [ ::stcemu::get_attribute $handle [ string range $name 1 end ] ]
+    }
+    return $ret
+}
+
+proc ::stc::delete { handle } {
+    ::stcemu::delay stc::delete
+    ::stcemu::check $handle
+    ::stcemu::remove $handle
+    return
+}
+
+proc ::stc::apply { } {
+    ::stcemu::delay stc::apply
+    return
+}
+
+proc ::stc::perform { command args } {
+    ::stcemu::delay stc::perform
+
+    set options [ ::stcemu::options {*}$args ]
+    switch -- [ regsub {command$} [ string tolower $command ] {} ] {
+        loadfromxml {
+            ::stcemu::load [ dict get $options filename ]
+        }
+        saveasxml {
+            ::stcemu::save [ dict get $options filename ]
+        }
+        subscribedynamicresultview -
+        updatedynamicresultview {
+            set view [ dict get $options dynamicresultview ]
+            ::stcemu::check $view
+            ::stcemu::update_view $view
+        }
+        unsubscribedynamicresultview {
+            set view [ dict get $options dynamicresultview ]
+            ::stcemu::check $view
+            foreach query [ ::stcemu::get_attribute $view children-presentationresultquery ] {
+                foreach data [ ::stcemu::get_attribute $query children-resultviewdata ] {
+                    ::stcemu::remove $data
+                }
+            }
+        }
+        devicecreate {
+            set ret [ list ]
+            foreach parent_ [ dict get $options parentlist ] {
+                ::stcemu::check $parent_
+                set count 1
+                if { [ dict exists $options devicecount ] } {
+                    set count [ dict get $options devicecount ]
+                }
+                for { set i 0 } { $i < $count } { incr i } {
+                    set device [ ::stcemu::new emulateddevice $parent_ ]
+                    ::stcemu::set_attributes $device [ list -Name "Device [ string range $device 14 end ]" ]
+                    lappend ret $device
+                }
+            }
+            return [ list -State COMPLETED -Status "" -ReturnList $ret ]
+        }
+        capturestart -
+        capturestop {
+            set capture [ dict get $options captureproxyid ]
+            ::stcemu::check $capture
+            ::stcemu::set_attributes $capture [ list -Status [ expr { [ string match -nocase capturestart* $command ] ? "RUNNING" : "IDLE" } ] ]
+        }
+        capturedatasave {
+            set path [ dict get $options filename ]
+            if { [ dict exists $options filenamepath ] } {
+                set path [ file join [ dict get $options filenamepath ] $path ]
+            }
+            ::stcemu::save_pcap $path
+        }
+    }
+    return [ list -State COMPLETED -Status "" ]
+}
+
+proc ::stc::subscribe { args } {
+    ::stcemu::delay stc::subscribe
+
+    set options [ ::stcemu::options {*}$args ]
+    set parent_ [ dict get $options parent ]
+    set configType [ string tolower [ dict get $options configtype ] ]
+    set resultType [ dict get $options resulttype ]
+    ::stcemu::check $parent_
+
+    upvar #0 ::stcemu::type type ::stcemu::started started
+
+    set dataset [ ::stcemu::new resultdataset $parent_ ]
+    set results [ list ]
+    foreach handle [ ::stcemu::descendants $parent_ ] {
+        if { $type($handle) eq $configType } {
+            set result [ ::stcemu::new $resultType $handle ]
+            set started($result) [ clock milliseconds ]
+            lappend results $result
+        }
+    }
+    ::stcemu::set_attributes $dataset [ list -ResultHandleList $results ]
+    return $dataset
+}
+
+proc ::stc::unsubscribe { handle } {
+    ::stcemu::delay stc::unsubscribe
+    ::stcemu::check $handle
+
+    foreach result [ ::stcemu::get_attribute $handle ResultHandleList ] {
+        if { [ info exists ::stcemu::type($result) ] } {
+            ::stcemu::remove $result
+        }
+    }
+    ::stcemu::remove $handle
+    return
+}
+
+proc ::stc::connect { args } {
+    ::stcemu::delay stc::connect
+    lappend ::stcemu::chassis {*}$args
+    return
+}
+
+proc ::stc::disconnect { args } {
+    ::stcemu::delay stc::disconnect
+    foreach address $args {
+        set i [ lsearch -exact $::stcemu::chassis $address ]
+        set ::stcemu::chassis [ lreplace $::stcemu::chassis $i $i ]
+    }
+    return
+}
+
+proc ::stc::reserve { args } {
+    ::stcemu::delay stc::reserve
+    foreach location $args {
+        lappend ::stcemu::reserved [ string trimleft $location / ]
+    }
+    return
+}
+
+proc ::stc::release { args } {
+    ::stcemu::delay stc::release
+    foreach location $args {
+        set i [ lsearch -exact $::stcemu::reserved [ string trimleft $location / ] ]
+        set ::stcemu::reserved [ lreplace $::stcemu::reserved $i $i ]
+    }
+    return
+}
+
+proc ::stc::help { args } {
+    return "Spirent TestCenter emulator"
+}
+
+proc ::stc::log { level message } {
+    return
+}
+
+proc ::stc::sleep { duration } {
+    after [ expr { int($duration * 1000) } ]
+    return
+}
+
+proc ::stc::waitUntilComplete { args } {
+    ::stcemu::delay stc::waitUntilComplete
+    return PASSED
+}
+
+::stcemu::reset
+
+package provide SpirentTestCenter 0.1
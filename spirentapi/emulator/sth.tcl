@@ -0,0 +1,257 @@
+# Spirent TestCenter emulator, subset of sth:: returning keyed lists
+#
+# connect, cleanup_session, interface_config, interface_stats, traffic_config, traffic_control and traffic_stats
+# work on the stc:: object model of the emulator, streams send rate_pps frames per second while traffic runs,
+# and every frame sent is received. other functions in API.TXT only return status 1
+
+package require SpirentTestCenter
+
+if { [ catch { package require Tclx } ] } {
+    source [ file join [ file dirname [ info script ] ] keyl.tcl ]
+}
+
+namespace eval ::sthemu {
+
+    # stream -> frames sent before the last start, stream -> start time in milliseconds if it's running
+    variable sent
+    variable running
+    array set sent { }
+    array set running { }
+
+    variable dir [ file dirname [ info script ] ]
+}
+
+proc ::sthemu::options { args } {
+    set ret [ dict create ]
+    foreach { name value } $args {
+        dict set ret [ string range $name 1 end ] $value
+    }
+    return $ret
+}
+
+proc ::sthemu::option { options name { default "" } } {
+    return [ expr { [ dict exists $options $name ] ? [ dict get $options $name ] : $default } ]
+}
+
+proc ::sthemu::ports { options } {
+    set ports [ option $options port_handle all ]
+    if { $ports eq "all" } {
+        set ports [ list ]
+        foreach project [ ::stcemu::get_attribute system1 children-project ] {
+            lappend ports {*}[ ::stcemu::get_attribute $project children-port ]
+        }
+    }
+    return $ports
+}
+
+proc ::sthemu::frames { stream } {
+    variable sent
+    variable running
+
+    set frames [ expr { [ info exists sent($stream) ] ? $sent($stream) : 0 } ]
+    if { [ info exists running($stream) ] } {
+        set rate [ ::stcemu::get_attribute $stream FrameRate ]
+        set frames [ expr { $frames + wide(([ clock milliseconds ] - $running($stream)) * $rate / 1000) } ]
+    }
+    return $frames
+}
+
+namespace eval ::sth { }
+
+proc ::sth::connect { args } {
+    ::stcemu::delay sth::connect
+
+    set options [ ::sthemu::options {*}$args ]
+    set device [ ::sthemu::option $options device ]
+
+    set project [ lindex [ ::stcemu::get_attribute system1 children-project ] 0 ]
+    if { $project eq "" } {
+        set project [ stc::create project ]
+    }
+
+    stc::connect $device
+    keylset ret status 1 offline [ ::sthemu::option $options offline 0 ]
+    foreach port [ ::sthemu::option $options port_list ] {
+        set handle [ stc::create port -under $project -location //$device/$port ]
+        stc::reserve //$device/$port
+        keylset ret port_handle.$device.$port $handle
+    }
+    return $ret
+}
+
+proc ::sth::cleanup_session { args } {
+    ::stcemu::delay sth::cleanup_session
+    ::stcemu::reset
+    array unset ::sthemu::sent
+    array unset ::sthemu::running
+    keylset ret status 1
+    return $ret
+}
+
+proc ::sth::interface_config { args } {
+    ::stcemu::delay sth::interface_config
+
+    set options [ ::sthemu::options {*}$args ]
+    set port [ ::sthemu::option $options port_handle ]
+    dict unset options port_handle
+    dict for { name value } $options {
+        stc::config $port -$name $value
+    }
+    keylset ret status 1 handles $port
+    return $ret
+}
+
+proc ::sth::interface_stats { args } {
+    ::stcemu::delay sth::interface_stats
+
+    set options [ ::sthemu::options {*}$args ]
+    set port [ ::sthemu::option $options port_handle ]
+
+    set frames 0
+    foreach stream [ ::stcemu::get_attribute $port children-streamblock ] {
+        incr frames [ ::sthemu::frames $stream ]
+    }
+    keylset ret status 1 link 1 intf_speed 1000 tx_frames $frames rx_frames $frames
+    return $ret
+}
+
+proc ::sth::traffic_config { args } {
+    ::stcemu::delay sth::traffic_config
+
+    set options [ ::sthemu::options {*}$args ]
+    set mode [ ::sthemu::option $options mode create ]
+
+    switch -- $mode {
+        create {
+            set port [ ::sthemu::option $options port_handle ]
+            set stream [ stc::create streamBlock -under $port -FrameRate [ ::sthemu::option $options rate_pps 1000 ] ]
+            keylset ret status 1 stream_id $stream
+        }
+        modify {
+            set stream [ ::sthemu::option $options stream_id ]
+            if { [ dict exists $options rate_pps ] } {
+                set ::sthemu::sent($stream) [ ::sthemu::frames $stream ]
+                if { [ info exists ::sthemu::running($stream) ] } {
+                    set ::sthemu::running($stream) [ clock milliseconds ]
+                }
+                stc::config $stream -FrameRate [ dict get $options rate_pps ]
+            }
+            keylset ret status 1 stream_id $stream
+        }
+        remove {
+            foreach stream [ ::sthemu::option $options stream_id ] {
+                stc::delete $stream
+                array unset ::sthemu::sent $stream
+                array unset ::sthemu::running $stream
+            }
+            keylset ret status 1
+        }
+        reset {
+            foreach port [ ::sthemu::ports $options ] {
+                foreach stream [ ::stcemu::get_attribute $port children-streamblock ] {
+                    stc::delete $stream
+                    array unset ::sthemu::sent $stream
+                    array unset ::sthemu::running $stream
+                }
+            }
+            keylset ret status 1
+        }
+        default {
+            keylset ret status 0 log "mode $mode is not supported by emulator"
+        }
+    }
+    return $ret
+}
+
+proc ::sth::traffic_control { args } {
+    ::stcemu::delay sth::traffic_control
+
+    set options [ ::sthemu::options {*}$args ]
+    set action [ ::sthemu::option $options action ]
+
+    foreach port [ ::sthemu::ports $options ] {
+        foreach stream [ ::stcemu::get_attribute $port children-streamblock ] {
+            switch -- $action {
+                run {
+                    if { ![ info exists ::sthemu::running($stream) ] } {
+                        set ::sthemu::running($stream) [ clock milliseconds ]
+                    }
+                }
+                stop {
+                    set ::sthemu::sent($stream) [ ::sthemu::frames $stream ]
+                    array unset ::sthemu::running $stream
+                }
+                clear_stats {
+                    set ::sthemu::sent($stream) 0
+                    if { [ info exists ::sthemu::running($stream) ] } {
+                        set ::sthemu::running($stream) [ clock milliseconds ]
+                    }
+                }
+                reset {
+                    set ::sthemu::sent($stream) 0
+                    array unset ::sthemu::running $stream
+                }
+            }
+        }
+    }
+    keylset ret status 1
+    return $ret
+}
+
+proc ::sth::traffic_stats { args } {
+    ::stcemu::delay sth::traffic_stats
+
+    set options [ ::sthemu::options {*}$args ]
+    set mode [ ::sthemu::option $options mode aggregate ]
+
+    keylset ret status 1
+    foreach port [ ::sthemu::ports $options ] {
+        set total 0
+        set rate 0
+        foreach stream [ ::stcemu::get_attribute $port children-streamblock ] {
+            set frames [ ::sthemu::frames $stream ]
+            set stream_rate [ expr { [ info exists ::sthemu::running($stream) ] ? [ ::stcemu::get_attribute $stream FrameRate ] : 0 } ]
+            incr total $frames
+            set rate [ expr { $rate + $stream_rate } ]
+            if { $mode eq "streams" || $mode eq "all" } {
+                foreach direction { tx rx } {
+                    keylset ret $port.stream.$stream.$direction.total_pkts $frames
+                    keylset ret $port.stream.$stream.$direction.total_pkt_rate $stream_rate
+                }
+            }
+        }
+        if { $mode eq "aggregate" || $mode eq "all" } {
+            foreach direction { tx rx } {
+                keylset ret $port.aggregate.$direction.total_pkts $total
+                keylset ret $port.aggregate.$direction.pkt_count $total
+                keylset ret $port.aggregate.$direction.total_pkt_rate $rate
+            }
+        }
+    }
+    return $ret
+}
+
+# other functions of API.TXT only return status 1
+proc ::sthemu::define_others { } {
+    variable dir
+    set path [ file join [ file dirname $dir ] API.TXT ]
+    if { ![ file exists $path ] } {
+        return
+    }
+    set f [ open $path r ]
+    foreach line [ split [ read $f ] \n ] {
+        set name [ string trim $line ]
+        if { [ string match sth::* $name ] && [ info commands ::$name ] eq "" } {
+            proc ::$name { args } [ list apply { { name } {
+                ::stcemu::delay $name
+                keylset ret status 1
+                return $ret
+            } } $name ]
+        }
+    }
+    close $f
+}
+
+::sthemu::define_others
+
+package provide SpirentHltApi 0.1
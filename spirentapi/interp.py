@@ -0,0 +1,187 @@
+'''
+Logical sessions hosted as tcl child interpreters inside one tclsh
+'''
+import logging
+import os
+import time
+from concurrent.futures import Future
+from typing import NoReturn, Optional
+
+from .tclwrapper import TCLWrapper, TCLWrapperError, TCLWrapperInstanceError, tclstring_to_list, quote_tclstring
+
+logger = logging.getLogger(__name__)
+
+# keyed list commands in tcl, used by child interpreters when Tclx can't be loaded
+KEYLSCRIPT = os.path.join(os.path.dirname(__file__), 'emulator', 'keyl.tcl').replace('\\', '/')
+
+# create child interpreter, stc:: and sth:: commands of the parent are aliased in it,
+# commands not loaded yet by auto_index are aliased too, they are loaded in the parent when they are called
+_CREATE = '''
+set name [ interp create %s ]
+$name eval [ list set auto_path $::auto_path ]
+foreach command [ concat [ info commands ::stc::* ] [ info commands ::sth::* ] [ array names ::auto_index ::sth::* ] [ array names ::auto_index sth::* ] ] {
+    set command ::[ string trimleft $command : ]
+    if { [ interp alias $name $command ] eq "" } {
+        interp alias $name $command {} $command
+    }
+}
+if { [ catch { $name eval { package require Tclx } } ] } {
+    $name eval [ list source %s ]
+}
+set name
+'''
+
+
+class InterpWrapper:
+    """tcl child interpreter in the tclsh of a TCLWrapper, with the eval/submit interface of TCLWrapper
+
+    every child interpreter has its own variables and procs, stc:: and sth:: commands are aliases to the
+    commands of the parent interpreter, so child interpreters share the packages loaded once, and the STC backend.
+    commands of all child interpreters are sent through the pipe of the parent TCLWrapper,
+    in threadsafe mode they are pipelined by its dispatcher, and child interpreters can be used by threads at the same time
+
+    it's the backend of logical sessions created by SpirentAPI.create_session:
+
+        api = SpirentAPI(threadsafe=True)
+        tenant = api.create_session()
+        tenant.sth_connect(...)
+    """
+
+    def __init__(self, parent:TCLWrapper, name:Optional[str]=None) -> NoReturn:
+        """init function
+
+        Args:
+            parent (TCLWrapper): tclsh the child interpreter is created in
+            name (str, optional): interpreter name. Defaults to None, named by tcl, for example, interp0
+        """
+        assert name == None or (type(name) == str and name.isidentifier()), 'name should be None, or str of letters, digits and _'
+
+        self.parent = parent
+        self.name = name
+        self.trace = None
+        self.last_stderr = None
+        self._started = False
+
+    @property
+    def threadsafe(self) -> bool:
+        return self.parent.threadsafe
+
+    @property
+    def tcl_timing(self) -> bool:
+        """time commands in tclsh, it's shared with the parent and all child interpreters"""
+        return self.parent.tcl_timing
+
+    @tcl_timing.setter
+    def tcl_timing(self, value:bool) -> NoReturn:
+        self.parent.tcl_timing = value
+
+    @property
+    def event_loop(self) -> bool:
+        """tcl event loop runs in the parent, it's shared by all child interpreters"""
+        return self.parent.event_loop
+
+    def start_event_loop(self) -> NoReturn:
+        """run the tcl event loop in the parent tclsh, see TCLWrapper.start_event_loop"""
+        self.parent.start_event_loop()
+
+    @property
+    def last_tcl_time(self) -> Optional[float]:
+        return getattr(self.parent, 'last_tcl_time', None)
+
+    def start(self) -> NoReturn:
+        """create child interpreter
+
+        Raises:
+            TCLWrapperInstanceError: if it's already created, raise TCLWrapperInstanceError
+        """
+        if self._started:
+            raise TCLWrapperInstanceError('interpreter %s already created.' % self.name)
+
+        self.name = self.parent.eval(_CREATE % (self.name if self.name != None else '', quote_tclstring(KEYLSCRIPT))).strip()
+        self._started = True
+        logger.info('interpreter %s created' % self.name)
+
+    def stop(self) -> NoReturn:
+        """delete child interpreter, its variables and procs
+
+        Raises:
+            TCLWrapperInstanceError: if it's not created, raise TCLWrapperInstanceError
+        """
+        if not self._started:
+            raise TCLWrapperInstanceError('interpreter is not created.')
+
+        self._started = False
+        try:
+            self.parent.eval('interp delete %s' % self.name)
+        except TCLWrapperInstanceError:
+            # parent tclsh is already stopped
+            pass
+        logger.info('interpreter %s deleted' % self.name)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _wrap(self, command:str) -> str:
+        """command run in child interpreter"""
+        if not self._started:
+            raise TCLWrapperInstanceError('interpreter is not created.')
+        return 'interp eval %s %s' % (self.name, quote_tclstring(command))
+
+    def eval(self, command:str, to_list:bool=False):
+        """run command in child interpreter
+
+        Raises:
+            TCLWrapperError: if command failed, raise TCLWrapperError
+            TCLWrapperInstanceError: if interpreter is not created, or parent tclsh is dead
+
+        Returns:
+            str or tuple: output, or elements of output if to_list is True
+        """
+        start = time.time()
+        begin = time.perf_counter()
+        try:
+            stdout = self.parent.eval(self._wrap(command))
+        except TCLWrapperError as e:
+            if self.trace is not None:
+                self.trace.record(command, start, time.perf_counter() - begin, error = e.error_message)
+            raise TCLWrapperError(command, e.error_message, e.stderr)
+
+        self.last_stderr = getattr(self.parent, 'last_stderr', None)
+        if self.trace is not None:
+            self.trace.record(command, start, time.perf_counter() - begin, reply = stdout)
+
+        return tclstring_to_list(stdout) if to_list else stdout
+
+    def submit(self, command:str) -> Future:
+        """send command to child interpreter without waiting for its reply, see TCLWrapper.submit
+
+        Returns:
+            concurrent.futures.Future: future of the output string
+        """
+        start = time.time()
+        begin = time.perf_counter()
+        future = Future()
+
+        def resolve(inner:Future) -> NoReturn:
+            error = inner.exception()
+            if isinstance(error, TCLWrapperError):
+                error = TCLWrapperError(command, error.error_message, error.stderr)
+
+            if self.trace is not None and (error is None or isinstance(error, TCLWrapperError)):
+                if error is None:
+                    self.trace.record(command, start, time.perf_counter() - begin, reply = inner.result())
+                else:
+                    self.trace.record(command, start, time.perf_counter() - begin, error = error.error_message)
+
+            future.tcl_time = getattr(inner, 'tcl_time', None)
+            if error is None:
+                future.set_result(inner.result())
+            else:
+                future.set_exception(error)
+
+        self.parent.submit(self._wrap(command)).add_done_callback(resolve)
+        return future
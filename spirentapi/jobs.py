@@ -0,0 +1,236 @@
+'''
+Background jobs run by the tcl event loop, the session is free for other commands while they run
+'''
+import logging
+import time
+from typing import NoReturn, Optional
+
+from .tclwrapper import TCLWrapperError, tclstring_to_list, quote_tcllist
+from .utils import dotdict
+
+logger = logging.getLogger(__name__)
+
+# procs registered in the session by SpirentAPI.start_job
+_PROCS = {
+
+    # start job of steps as coroutine ::spirentapi::job<id>, it runs when the event loop is idle, return id
+    'job_start': ('name steps', '''
+    variable jobs
+    variable job_count
+    set id [ incr job_count ]
+    set jobs($id) [ dict create name $name status running progress 0 message "" done 0 steps [ llength $steps ] \\
+                    result "" error "" started [ clock milliseconds ] ended "" ]
+    coroutine ::spirentapi::job$id ::spirentapi::job_run $id $steps
+    return $id
+'''),
+
+    # body of job coroutine, steps run in global scope one by one, the event loop runs between steps
+    'job_run': ('id steps', '''
+    variable jobs
+    after idle [ info coroutine ]
+    yield
+    foreach step $steps {
+        if { [ catch { uplevel #0 $step } result ] } {
+            dict set jobs($id) status failed
+            dict set jobs($id) error $result
+            dict set jobs($id) ended [ clock milliseconds ]
+            return
+        }
+        dict incr jobs($id) done
+        dict set jobs($id) result $result
+        dict set jobs($id) progress [ expr { double([ dict get $jobs($id) done ]) / [ dict get $jobs($id) steps ] } ]
+        after idle [ info coroutine ]
+        yield
+    }
+    dict set jobs($id) status done
+    dict set jobs($id) progress 1.0
+    dict set jobs($id) ended [ clock milliseconds ]
+'''),
+
+    # status of jobs, list of id name status progress message done steps result error seconds per job
+    'job_status': ('ids', '''
+    variable jobs
+    set ret [ list ]
+    foreach id $ids {
+        if { ![ info exists jobs($id) ] } {
+            error "no job $id"
+        }
+        set job $jobs($id)
+        set ended [ dict get $job ended ]
+        set seconds [ expr { (($ended eq "" ? [ clock milliseconds ] : $ended) - [ dict get $job started ]) / 1000.0 } ]
+        lappend ret [ list $id {*}[ dict values [ dict remove $job started ended ] ] $seconds ]
+    }
+    return $ret
+'''),
+
+    # stop running job, its pending after events are cancelled
+    'job_cancel': ('id', '''
+    variable jobs
+    if { ![ info exists jobs($id) ] } {
+        error "no job $id"
+    }
+    if { [ dict get $jobs($id) status ] ne "running" } {
+        return 0
+    }
+    set coroutine ::spirentapi::job$id
+    foreach event [ after info ] {
+        if { [ lindex [ after info $event ] 0 ] eq $coroutine } {
+            after cancel $event
+        }
+    }
+    catch { rename $coroutine {} }
+    dict set jobs($id) status cancelled
+    dict set jobs($id) ended [ clock milliseconds ]
+    return 1
+'''),
+
+    # forget finished job
+    'job_forget': ('id', '''
+    variable jobs
+    unset -nocomplain jobs($id)
+'''),
+
+    # progress 0 to 1 and message of the job running this step, in steps of jobs
+    'job_progress': ('value {message ""}', '''
+    variable jobs
+    set id [ string range [ namespace tail [ info coroutine ] ] 3 end ]
+    if { [ info exists jobs($id) ] } {
+        dict set jobs($id) progress $value
+        dict set jobs($id) message $message
+    }
+'''),
+
+    # sleep seconds, in steps of jobs the event loop runs meanwhile
+    'job_sleep': ('seconds', '''
+    set ms [ expr { int($seconds * 1000) } ]
+    if { [ info coroutine ] eq "" } {
+        after $ms
+        return
+    }
+    after $ms [ info coroutine ]
+    yield
+'''),
+
+    # wait until sequencer is not running, or timeout in seconds, return its TestState, like stc::waitUntilComplete,
+    # in steps of jobs the event loop runs between polls
+    'job_wait_complete': ('{timeout ""} {interval 1}', '''
+    set start [ clock milliseconds ]
+    set sequencer [ stc::get system1 -children-sequencer ]
+    while { $sequencer ne "" && [ string toupper [ stc::get $sequencer -State ] ] in { INIT RUNNING WAIT STOPPING } } {
+        if { $timeout ne "" && [ clock milliseconds ] - $start >= $timeout * 1000 } {
+            error "sequencer is not completed in $timeout seconds"
+        }
+        job_sleep $interval
+    }
+    if { $sequencer eq "" } {
+        return PASSED
+    }
+    return [ stc::get $sequencer -TestState ]
+'''),
+}
+
+
+class Job:
+    """handle of background job started by SpirentAPI.start_job
+
+    steps of the job run in the tcl event loop of the session, one step at a time,
+    commands sent to the session are run between steps, and while steps wait by job_sleep or job_wait_complete
+
+    Example:
+        job = api.start_job([ 'sth::traffic_control -action run -port_handle all',
+                              '::spirentapi::job_sleep 60',
+                              'sth::traffic_control -action stop -port_handle all' ], name='traffic')
+        while not job.done():
+            poller.poll()
+            time.sleep(1)
+        job.wait()
+    """
+
+    def __init__(self, api, id:str, name:str) -> NoReturn:
+        """init function
+
+        Args:
+            api (SpirentAPI): session the job runs in
+            id (str): job id in tclsh
+            name (str): job name
+        """
+        self.api = api
+        self.id = id
+        self.name = name
+
+    def __repr__(self) -> str:
+        return 'Job(%s, %s)' % (self.id, self.name)
+
+    def poll(self) -> dotdict:
+        """status of job
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            dotdict: status(running, done, failed or cancelled), progress(0 to 1), message, done(steps done), steps,
+                     result(of the last step), error, seconds(since started)
+        """
+        return _status(self.api, [ self ])[0]
+
+    @property
+    def status(self) -> str:
+        return self.poll().status
+
+    @property
+    def progress(self) -> float:
+        return self.poll().progress
+
+    def done(self) -> bool:
+        """if job is not running"""
+        return self.status != 'running'
+
+    def wait(self, timeout:Optional[float]=None, interval:float=0.1) -> str:
+        """wait until job is not running, other threads can use the session meanwhile
+
+        Args:
+            timeout (float, optional): seconds to wait. Defaults to None, wait forever
+            interval (float, optional): seconds between polls. Defaults to 0.1
+
+        Raises:
+            TimeoutError: if job is still running after timeout, raise TimeoutError
+            TCLWrapperError: if job failed, raise TCLWrapperError with the error of the failed step
+
+        Returns:
+            str: result of the last step
+        """
+        start = time.perf_counter()
+        while True:
+            status = self.poll()
+            if status.status == 'failed':
+                raise TCLWrapperError('job %s' % self.name, status.error, '')
+            if status.status != 'running':
+                return status.result
+            if timeout != None and time.perf_counter() - start >= timeout:
+                raise TimeoutError('job %s is running after %s seconds' % (self.name, timeout))
+            time.sleep(interval)
+
+    def cancel(self) -> bool:
+        """stop job, the running step is stopped when it waits
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            bool: True if job was running
+        """
+        return self.api.call_proc('job_cancel', self.id) == '1'
+
+    def forget(self) -> NoReturn:
+        """drop status of job kept in tclsh"""
+        self.api.call_proc('job_forget', self.id)
+
+
+def _status(api, jobs:list) -> list:
+    """status of jobs in one round-trip"""
+    ret = [ ]
+    for item in api.call_proc('job_status', quote_tcllist([ job.id for job in jobs ]), to_list=True):
+        id, name, status, progress, message, done, steps, result, error, seconds = tclstring_to_list(item)
+        ret.append(dotdict(status=status, progress=float(progress), message=message, done=int(done), steps=int(steps),
+                           result=result, error=error, seconds=float(seconds)))
+    return ret
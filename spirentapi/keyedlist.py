@@ -0,0 +1,251 @@
+'''
+Lazy view of HLTAPI keyed list result
+'''
+import logging
+from typing import Any, NoReturn, Optional, Union
+
+from .tclwrapper import TCLWrapperError, tclstring_to_list, quote_tcllist
+from .utils import dotdict
+
+logger = logging.getLogger(__name__)
+
+
+def _join(key:str, sub_key:str) -> str:
+    """join keyed list path"""
+    return sub_key if key == '' else '%s.%s' % (key, sub_key)
+
+def build_keyset(pairs:Union[list, tuple], base:str='') -> Union[dotdict, str]:
+    """build nested dotdict from flat path, value pairs returned by keyl_flatten
+
+    Args:
+        pairs (list or tuple): path value path value ...
+        base (str, optional): path the pairs are flattened from, stripped from paths. Defaults to ''
+
+    Returns:
+        dotdict or str: nested dotdict, or value if base is a leaf
+    """
+    ret = dotdict()
+    for i in range(0, len(pairs) - 1, 2):
+
+        path, value = pairs[i], pairs[i + 1]
+
+        if path == base:
+            return value
+        if base != '':
+            path = path[len(base) + 1:]
+
+        # TclX forbids '.' in keys, so ip keys like 10.0.0.1 are nested per octet, as _resolve_keyset does
+        parts = path.split('.')
+        node = ret
+        for part in parts[:-1]:
+            node = node.setdefault(part, dotdict())
+        node[parts[-1]] = value
+
+    return ret
+
+
+class KeyedListView:
+    """lazy view of keyed list saved in a tcl variable
+
+    keys are fetched when they are asked for, and subtrees are resolved and cached when they are first accessed,
+    so only the part of the result used is moved from tclsh. the tcl variable is unset when the view is closed
+
+    Example:
+        with api.sth_traffic_stats(port_handle='port1', mode='all', lazy=True) as ret:
+            ret.status
+            ret.port1.aggregate.rx.total_pkts
+            ret.prefetch('port1.aggregate.tx', 'port1.aggregate.rx')
+    """
+
+    def __init__(self, api, var:str, key:str='', root:Optional['KeyedListView']=None) -> NoReturn:
+        """init function
+
+        Args:
+            api (SpirentAPI): session
+            var (str): tcl variable which saves the keyed list
+            key (str, optional): path of the subtree. Defaults to '', the whole keyed list
+            root (KeyedListView, optional): view of the whole keyed list, None if it's the root
+        """
+        assert type(var) == str, 'var should be str type'
+        assert type(key) == str, 'key should be str type'
+
+        self._api = api
+        self._var = var
+        self._key = key
+        self._root = root if root != None else self
+        self._keys = None
+        self._children = { }
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        """tcl variable which saves the keyed list"""
+        return self._var
+
+    @property
+    def path(self) -> str:
+        """path of the subtree"""
+        return self._key
+
+    def _check(self) -> NoReturn:
+        assert not self._root._closed, 'keyed list %s has been closed' % self._var
+
+    def _view(self, relative:str) -> 'KeyedListView':
+        """get view of relative path, without fetching anything"""
+        view = self
+        for part in relative.split('.') if relative != '' else [ ]:
+            child = view._children.get(part)
+            if not isinstance(child, KeyedListView):
+                child = KeyedListView(view._api, view._var, _join(view._key, part), self._root)
+                view._children[part] = child
+            view = child
+        return view
+
+    def keys(self) -> list:
+        """keys of the subtree
+
+        Returns:
+            list: keys
+        """
+        self._check()
+
+        if self._keys == None:
+            is_keyset, value = self._api.call_proc('keyl_node', self._var, self._key, to_list=True)
+            assert is_keyset == '1', '%s.%s is not a keyed list' % (self._var, self._key)
+            self._keys = list(tclstring_to_list(value))
+
+        return self._keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __contains__(self, sub_key:str) -> bool:
+        return sub_key in self.keys()
+
+    def __getitem__(self, sub_key:str) -> Union['KeyedListView', str]:
+        """get sub keyed list view, or value if it's a leaf
+
+        Args:
+            sub_key (str): key, or dotted path
+
+        Raises:
+            KeyError: if key doesn't exist
+        """
+        self._check()
+
+        if sub_key in self._children:
+            return self._children[sub_key]
+
+        if '.' in sub_key:
+            first, rest = sub_key.split('.', 1)
+            return self[first][rest]
+
+        if self._keys != None and sub_key not in self._keys:
+            raise KeyError(sub_key)
+
+        path = _join(self._key, sub_key)
+        try:
+            is_keyset, value = self._api.call_proc('keyl_node', self._var, path, to_list=True)
+        except TCLWrapperError:
+            raise KeyError(sub_key)
+
+        if is_keyset == '1':
+            child = KeyedListView(self._api, self._var, path, self._root)
+            child._keys = list(tclstring_to_list(value))
+        else:
+            child = value
+
+        self._children[sub_key] = child
+        return child
+
+    def __getattr__(self, sub_key:str) -> Union['KeyedListView', str, None]:
+        """get by dot, None if key doesn't exist, like dotdict"""
+        if sub_key.startswith('_'):
+            raise AttributeError(sub_key)
+
+        return self.get(sub_key)
+
+    def get(self, sub_key:str, default:Any=None) -> Any:
+        """get sub keyed list view, or value, default if key doesn't exist
+
+        Args:
+            sub_key (str): key, or dotted path
+            default (Any, optional): default value. Defaults to None
+        """
+        try:
+            return self[sub_key]
+        except KeyError:
+            return default
+
+    def _fill(self, tree:Union[dotdict, str]) -> NoReturn:
+        """cache resolved subtree"""
+        if not isinstance(tree, dict):
+            return
+
+        self._keys = list(tree.keys())
+        for sub_key, value in tree.items():
+            if isinstance(value, dict):
+                child = self._children.get(sub_key)
+                if not isinstance(child, KeyedListView):
+                    child = KeyedListView(self._api, self._var, _join(self._key, sub_key), self._root)
+                    self._children[sub_key] = child
+                child._fill(value)
+            else:
+                self._children[sub_key] = value
+
+    def prefetch(self, *paths:str) -> NoReturn:
+        """resolve subtrees of paths in one round-trip, and cache them
+
+        Args:
+            paths (str): dotted paths relative to this view, all of this view if no path given
+        """
+        self._check()
+
+        relatives = list(paths) if paths else [ '' ]
+        paths = [ _join(self._key, relative) if relative != '' else self._key for relative in relatives ]
+
+        replies = self._api.call_proc('keyl_flatten', self._var, quote_tcllist(paths), to_list=True)
+
+        for relative, path, reply in zip(relatives, paths, replies):
+
+            tree = build_keyset(tclstring_to_list(reply), path)
+
+            if isinstance(tree, dict):
+                self._view(relative)._fill(tree)
+            else:
+                # leaf value is cached by its parent
+                parent, _, last = relative.rpartition('.')
+                self._view(parent)._children[last] = tree
+
+    def to_dict(self) -> Union[dotdict, str]:
+        """resolve the whole subtree in one round-trip
+
+        Returns:
+            dotdict: same as the result of eager sth:: function
+        """
+        self._check()
+
+        reply, = self._api.call_proc('keyl_flatten', self._var, quote_tcllist([ self._key ]), to_list=True)
+
+        return build_keyset(tclstring_to_list(reply), self._key)
+
+    def close(self) -> NoReturn:
+        """unset the tcl variable which saves the keyed list
+        """
+        if self._root is not self:
+            self._root.close()
+        elif not self._closed:
+            self._api.eval('if { [ info exists %s ] } { unset %s }' % (self._var, self._var))
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return 'KeyedListView(%s, %s)' % (self._var, repr(self._key))
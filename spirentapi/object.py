@@ -4,6 +4,7 @@ Spirent TestCenter Object
 
 import logging
 import re
+import sys
 from typing import Any, NoReturn, Union
 
 from .apiwrapper import SpirentAPI, TCLWrapperError
@@ -11,13 +12,22 @@ from .tclwrapper import nested_list_to_tclstring
 
 logger = logging.getLogger(__name__)
 
+# handle is object type followed by index, for example, port1, emulateddevice12, ipv4if3
+_handle_pattern = re.compile('^([a-zA-Z]+\d*[a-zA-Z]+[46]?:?[a-zA-Z]+\d*[a-zA-Z]+[46]?)(\d+)$')
+
 class STCObject:
     """STC Object
 
     STCObject is used to wrap STC object handle.
     with STCObject, you can access or set object's attribute by [ ] 
+
+    there is only one STCObject for a handle in a session, STCObject('port1') is STCObject('port1').
+    handle is checked once by STCObject(handle), objects wrapped from stc::create or stc::get replies aren't checked,
+    objects of a session are released when it fails over to the standby tclsh
     """
 
+    __slots__ = ('_handle', '_type', '__weakref__')
+
     @staticmethod
     def create(type:str, **kwargs):
         """create STC Object
@@ -32,8 +42,27 @@ class STCObject:
         # create Object
         handle = SpirentAPI.instance.stc_create(type, **kwargs)
         
-        # wrap handle with STCObject
-        return STCObject(handle)
+        # wrap handle with STCObject, handle returned by stc::create needn't check
+        return STCObject._wrap(handle)
+
+    @staticmethod
+    def create_many(type:str, count:int, **kwargs) -> list:
+        """create many STC Objects by one round-trip
+
+        Args:
+            type (str): object type
+            count (int): number of objects to create
+            under (Optional, str or list[str]): parent handle, or parent handle per object
+            kwargs (Optional): attribute value used by all objects, or list of values, one per object
+
+        Returns:
+            list[STCObject]: created objects
+        """
+
+        logger.info('create %d STCObject' % count)
+
+        # handles returned by stc::create needn't check
+        return [ STCObject._wrap(handle) for handle in SpirentAPI.instance.stc_create_many(type, count, **kwargs) ]
 
     @staticmethod
     def is_handle(handle:str) -> bool:
@@ -59,18 +88,42 @@ class STCObject:
 
         return True
 
-    def __init__(self, handle:str) -> None:
-        """init function
+    @classmethod
+    def _wrap(cls, handle:str, check:bool=False):
+        """get the STCObject of handle from the identity map of the session, create it if not exists
 
         Args:
-            type (ObjectType): ObjectType
+            handle (str): handle
+            check (bool, optional): check if handle is valid before creating STCObject. Defaults to False
+
+        Returns:
+            STCObject: the STCObject of handle
         """
+        objects = SpirentAPI.instance._stc_objects
+
+        obj = objects.get(handle)
+        if obj != None:
+            return obj
 
         logger.info('init STCObject %s' % handle)
 
-        assert STCObject.is_handle(handle), '\'%s\' is invalid handle' % handle
+        if check:
+            assert STCObject.is_handle(handle), '\'%s\' is invalid handle' % handle
+
+        obj = object.__new__(cls)
+        obj._handle = sys.intern(handle)
+        obj._type = None
+
+        # another thread may have wrapped the same handle
+        return objects.setdefault(obj._handle, obj)
+
+    def __new__(cls, handle:str):
+        """get STCObject of handle
 
-        self._handle = handle
+        Args:
+            handle (str): handle
+        """
+        return cls._wrap(handle, check=True)
 
     @property
     def active(self) -> str:
@@ -123,17 +176,19 @@ class STCObject:
         Returns:
             str: type of object
         """
-        pattern = re.compile('^([a-zA-Z]+\d*[a-zA-Z]+[46]?:?[a-zA-Z]+\d*[a-zA-Z]+[46]?)(\d+)$')
-      
-        try:
+        if self._type == None:
+
+            try:
 
-            type_, suffix = pattern.findall(self.handle)[0]
+                type_, suffix = _handle_pattern.findall(self.handle)[0]
 
-        except IndexError as error:
-            logger.debug('index error: self.handle')
-            raise error
+            except IndexError as error:
+                logger.debug('index error: self.handle')
+                raise error
 
-        return type_.lower()
+            self._type = sys.intern(type_.lower())
+
+        return self._type
 
     @property
     def handle(self) -> str:
@@ -144,9 +199,17 @@ class STCObject:
         """
         assert self._handle != None, 'handle has been released'
 
-        assert STCObject.is_handle(self._handle), 'handle(%s) is not valid any more' % self._handle
-
+        # checked when it's wrapped, not on every access, use valid to check it again
         return self._handle
+
+    @property
+    def valid(self) -> bool:
+        """if handle is still a Spirent TestCenter object, checked by one stc::get round-trip
+
+        Returns:
+            bool: True, handle is valid; False, it's released or deleted
+        """
+        return self._handle != None and STCObject.is_handle(self._handle)
     
     @property
     def parent(self):
@@ -158,7 +221,7 @@ class STCObject:
 
         if 'parent' in self.attributes:
 
-            return STCObject(self['parent'])
+            return STCObject._wrap(self['parent'])
 
         else:    
             return None
@@ -172,7 +235,7 @@ class STCObject:
         """
         if 'children' in self.attributes:
 
-            return [ STCObject(handle)  for handle in re.compile('\s+').split(self['children']) ]
+            return [ STCObject._wrap(handle)  for handle in re.compile('\s+').split(self['children']) ]
         
         else:
             return [ ]
@@ -228,4 +291,5 @@ class STCObject:
         """
         if self.handle != None:
             SpirentAPI.instance.stc_delete(self.handle)
+            SpirentAPI.instance._stc_objects.pop(self._handle, None)
             self._handle = None
\ No newline at end of file
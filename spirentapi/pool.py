@@ -0,0 +1,342 @@
+'''
+Pool of sessions and leases of chassis ports shared by parallel test workers
+'''
+import json
+import logging
+import os
+import queue
+import re
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, NoReturn, Optional
+
+from .apiwrapper import SpirentAPI
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """pool of initialized SpirentAPI sessions
+
+    starting tclsh and loading Spirent TestCenter takes seconds, so sessions are started once, in parallel,
+    and borrowed by tests or threads
+
+    Example:
+        pool = SessionPool(4, threadsafe=False)
+        with pool.session() as api:
+            api.stc_get('system1')
+        pool.close()
+    """
+
+    def __init__(self, size:int=1, factory:Optional[Callable[[], SpirentAPI]]=None, **kwargs) -> NoReturn:
+        """init function, start sessions
+
+        Args:
+            size (int, optional): number of sessions. Defaults to 1
+            factory (Callable[[], SpirentAPI], optional): function to create session. Defaults to None, SpirentAPI(**kwargs)
+            kwargs (optional): argument passed to SpirentAPI
+        """
+        assert type(size) == int and size > 0, 'size should be positive int'
+
+        factory = factory if factory != None else lambda: SpirentAPI(**kwargs)
+
+        self._idle = queue.Queue()
+        self.sessions = [ None ] * size
+        errors = [ ]
+
+        def start(i):
+            try:
+                self.sessions[i] = factory()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [ threading.Thread(target=start, args=(i, ), name='SessionPoolStart%d' % i, daemon=True) for i in range(size) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            self.close()
+            raise errors[0]
+
+        for api in self.sessions:
+            self._idle.put(api)
+
+        logger.info('%d sessions started' % size)
+
+    def acquire(self, timeout:Optional[float]=None) -> SpirentAPI:
+        """borrow an idle session, wait if all sessions are borrowed
+
+        Args:
+            timeout (float, optional): seconds to wait. Defaults to None, wait forever
+
+        Raises:
+            TimeoutError: if no session is returned in timeout, raise TimeoutError
+
+        Returns:
+            SpirentAPI: session
+        """
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('no idle session in %s seconds' % timeout)
+
+    def release(self, api:SpirentAPI) -> NoReturn:
+        """return borrowed session
+
+        Args:
+            api (SpirentAPI): session
+        """
+        assert api in self.sessions, 'session is not from this pool'
+        self._idle.put(api)
+
+    @contextmanager
+    def session(self, timeout:Optional[float]=None):
+        """borrow a session in with block"""
+        api = self.acquire(timeout)
+        try:
+            yield api
+        finally:
+            self.release(api)
+
+    def close(self) -> NoReturn:
+        """shut down tclsh of all sessions
+        """
+        for api in self.sessions:
+            if api != None:
+                api.close()
+        self.sessions = [ ]
+
+
+class PortLeaseScheduler:
+    """lease chassis ports to tests, tests with disjoint ports run at the same time, conflicting ones wait
+
+    a lease is a file in lease_dir, created exclusively, so workers in other processes, for example, pytest-xdist workers, see it.
+    ports of one lease are taken all or none, in sorted order, so two tests waiting for each other never deadlock.
+    a lease expires after ttl, unless it's renewed, lease() renews it every ttl/3 while the with block runs.
+    a lease which is expired, or held by a process of this host which is not running any more, is from a dead worker, and is broken.
+    leases are taken, broken and released under a lock of the port, so two workers never break the same lease,
+    and a worker only releases a lease it still holds
+
+    Example:
+        scheduler = PortLeaseScheduler()
+        with scheduler.lease(['10.182.32.138/1/1', '10.182.32.138/1/2'], owner='test_traffic'):
+            ...
+    """
+
+    def __init__(self, lease_dir:Optional[str]=None, ttl:float=3600, interval:float=0.5) -> NoReturn:
+        """init function
+
+        Args:
+            lease_dir (str, optional): directory of lease files, shared by all workers. Defaults to None, spirentapi-leases in temp directory
+            ttl (float, optional): seconds a lease is valid after it's taken or renewed. Defaults to 3600
+            interval (float, optional): seconds between tries when ports are leased by others. Defaults to 0.5
+        """
+        self.lease_dir = lease_dir if lease_dir != None else os.path.join(tempfile.gettempdir(), 'spirentapi-leases')
+        self.ttl = ttl
+        self.interval = interval
+
+        os.makedirs(self.lease_dir, exist_ok=True)
+
+    def _path(self, port:str) -> str:
+        """lease file of port"""
+        return os.path.join(self.lease_dir, re.sub('[^0-9A-Za-z.-]+', '_', port.strip('/')) + '.lease')
+
+    def _read(self, port:str) -> Optional[dict]:
+        """lease of port, None if it's not leased"""
+        try:
+            with open(self._path(port), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, port:str, owner:str) -> NoReturn:
+        """write lease of port held by this process, replaced at once so it's never read partly written"""
+        path = self._path(port)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({ 'port': port, 'owner': owner, 'host': socket.gethostname(), 'pid': os.getpid(), 'expires': time.time() + self.ttl }, f)
+        os.replace(path + '.tmp', path)
+
+    def _dead(self, lease:dict) -> bool:
+        """lease is expired, or its process of this host is not running"""
+        if lease.get('expires', 0) <= time.time():
+            return True
+
+        # pid is only known on the host of the worker, os.kill of windows terminates the process, so it's not checked there
+        if lease.get('host') != socket.gethostname() or fcntl == None:
+            return False
+        try:
+            os.kill(lease.get('pid'), 0)
+        except ProcessLookupError:
+            return True
+        except (PermissionError, TypeError):
+            pass
+        return False
+
+    @contextmanager
+    def _locked(self, port:str):
+        """hold lock of port, shared by workers in other processes"""
+        fd = os.open(self._path(port)[:-len('.lease')] + '.lock', os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl != None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after 10 seconds
+                        pass
+            yield
+        finally:
+            if fcntl != None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+    def _take(self, port:str, owner:str) -> bool:
+        """create lease file of port exclusively, break it if it's expired"""
+        path = self._path(port)
+
+        with self._locked(port):
+            lease = self._read(port)
+            if lease != None:
+                if not self._dead(lease):
+                    return False
+                logger.warning('break lease of %s held by %s, pid %s, it is expired or the process is dead' % (port, lease.get('owner'), lease.get('pid')))
+                os.remove(path)
+            elif os.path.exists(path):
+                # not written completely by a worker which died
+                logger.warning('break broken lease of %s' % port)
+                os.remove(path)
+
+            self._write(port, owner)
+            return True
+
+    def try_acquire(self, ports:list, owner:str='') -> bool:
+        """lease all ports, or none of them
+
+        Args:
+            ports (list): port locations
+            owner (str, optional): owner shown to other workers. Defaults to ''
+
+        Returns:
+            bool: True if all ports are leased
+        """
+        taken = [ ]
+        for port in sorted(set(ports)):
+            if not self._take(port, owner):
+                self.release(taken, owner)
+                return False
+            taken.append(port)
+
+        return True
+
+    def acquire(self, ports:list, owner:str='', timeout:Optional[float]=None) -> NoReturn:
+        """lease all ports, wait while any of them is leased by others
+
+        Args:
+            ports (list): port locations
+            owner (str, optional): owner shown to other workers. Defaults to ''
+            timeout (float, optional): seconds to wait. Defaults to None, wait forever
+
+        Raises:
+            TimeoutError: if ports are not leased in timeout, raise TimeoutError
+        """
+        start = time.time()
+        while not self.try_acquire(ports, owner):
+            if timeout != None and time.time() - start >= timeout:
+                raise TimeoutError('ports %s are not released in %s seconds, held by %s' % (ports, timeout, self.holders(ports)))
+            time.sleep(self.interval)
+
+        logger.info('%s leased %s' % (owner, ports))
+
+    def release(self, ports:list, owner:str='') -> NoReturn:
+        """end lease of ports, leases broken and taken by others are kept
+
+        Args:
+            ports (list): port locations
+            owner (str, optional): owner the ports are leased by. Defaults to ''
+        """
+        for port in ports:
+            with self._locked(port):
+                lease = self._read(port)
+                if lease == None:
+                    continue
+                if lease.get('owner') != owner or lease.get('pid') != os.getpid():
+                    logger.warning('lease of %s is held by %s, not released by %s' % (port, lease.get('owner'), owner))
+                    continue
+                os.remove(self._path(port))
+
+    def renew(self, ports:list, owner:str='') -> bool:
+        """extend lease of ports by ttl from now
+
+        Args:
+            ports (list): port locations
+            owner (str, optional): owner the ports are leased by. Defaults to ''
+
+        Returns:
+            bool: True if all ports are still leased by owner
+        """
+        ret = True
+        for port in ports:
+            with self._locked(port):
+                lease = self._read(port)
+                if lease == None or lease.get('owner') != owner or lease.get('pid') != os.getpid():
+                    logger.warning('lease of %s is lost by %s, held by %s' % (port, owner, lease.get('owner') if lease != None else None))
+                    ret = False
+                    continue
+                self._write(port, owner)
+        return ret
+
+    @contextmanager
+    def lease(self, ports:list, owner:str='', timeout:Optional[float]=None):
+        """lease ports in with block, the lease is renewed every ttl/3 until the block ends"""
+        self.acquire(ports, owner, timeout)
+
+        stop = threading.Event()
+        def heartbeat():
+            while not stop.wait(self.ttl / 3):
+                self.renew(ports, owner)
+
+        # lease which expires at once, for example, ttl <= 0, is not renewed
+        thread = threading.Thread(target=heartbeat, name='lease heartbeat', daemon=True) if self.ttl > 0 else None
+        if thread != None:
+            thread.start()
+        try:
+            yield ports
+        finally:
+            stop.set()
+            if thread != None:
+                thread.join()
+            self.release(ports, owner)
+
+    def holders(self, ports:list) -> dict:
+        """owners of leased ports
+
+        Args:
+            ports (list): port locations
+
+        Returns:
+            dict: port -> owner, for ports leased
+        """
+        ret = { }
+        for port in ports:
+            lease = self._read(port)
+            if lease != None:
+                ret[port] = lease.get('owner')
+        return ret
@@ -0,0 +1,180 @@
+'''
+Latency decomposition of API calls
+'''
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, NoReturn, Optional
+
+logger = logging.getLogger(__name__)
+
+# phases of one API call
+PHASES = ['encode', 'io', 'tcl', 'parse']
+
+
+class Profiler:
+    """time each phase of API calls, and aggregate them per API
+
+    phases:
+        encode, convert python arguments to tcl options (dict_to_opt)
+        io, framing, pipe write and read in TCLWrapper, without tcl execution
+        tcl, execution of the command in tclsh, measured by clock microseconds in tclsh
+        parse, convert the result to python (_resolve_keyset, _resolve_pairs), without the commands it runs
+
+    phases are nested in a stack per thread, the root of the stack is the API, for example, sth::traffic_stats,
+    time of a frame doesn't include the time of the frames under it
+
+    Example:
+        profiler = api.enable_profiler()
+        api.sth_traffic_stats(port_handle='port1', mode='all')
+        print(profiler.report())
+        profiler.dump_folded('stc.folded')     # flamegraph.pl stc.folded > stc.svg
+    """
+
+    def __init__(self) -> NoReturn:
+        # stack -> [ count, seconds, seconds of child frames ]
+        self._stacks = { }
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = [ ]
+        return self._local.stack
+
+    def _add(self, stack:tuple, seconds:float) -> NoReturn:
+        """add time of frame, and count it as child time of its parent frame"""
+        with self._lock:
+            item = self._stacks.setdefault(stack, [ 0, 0.0, 0.0 ])
+            item[0] = item[0] + 1
+            item[1] = item[1] + seconds
+
+            if len(stack) > 1:
+                parent = self._stacks.setdefault(stack[:-1], [ 0, 0.0, 0.0 ])
+                parent[2] = parent[2] + seconds
+
+    @contextmanager
+    def phase(self, name:str):
+        """time the block as a frame named name, under the current frame
+
+        Args:
+            name (str): API or phase name
+        """
+        stack = self._stack
+        stack.append(name)
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(tuple(stack), time.perf_counter() - begin)
+            stack.pop()
+
+    def add(self, name:str, seconds:float) -> NoReturn:
+        """add a frame measured elsewhere under the current frame, for example, tcl time measured in tclsh
+
+        Args:
+            name (str): phase name
+            seconds (float): duration
+        """
+        self._add(tuple(self._stack) + (name, ), seconds)
+
+    @property
+    def active(self) -> bool:
+        """if there is a frame in this thread"""
+        return len(self._stack) > 0
+
+    def reset(self) -> NoReturn:
+        """forget all timings
+        """
+        with self._lock:
+            self._stacks = { }
+
+    def _self_times(self) -> dict:
+        """stack -> (count, seconds not spent in child frames)"""
+        with self._lock:
+            return { stack: (count, max(total - child, 0.0)) for stack, (count, total, child) in self._stacks.items() }
+
+    def summary(self) -> dict:
+        """time per API and phase
+
+        Returns:
+            dict: api -> dict of calls, total, and seconds of each phase, time not in any phase is 'python'
+        """
+        ret = { }
+        with self._lock:
+            for stack, (count, total, child) in self._stacks.items():
+                item = ret.setdefault(stack[0], dict({ 'calls': 0, 'total': 0.0, 'python': 0.0 }, **{ phase: 0.0 for phase in PHASES }))
+                if len(stack) == 1:
+                    item['calls'] = item['calls'] + count
+                    item['total'] = item['total'] + total
+                    item['python'] = item['python'] + max(total - child, 0.0)
+                else:
+                    name = stack[-1] if stack[-1] in PHASES else 'python'
+                    item[name] = item[name] + max(total - child, 0.0)
+        return ret
+
+    def report(self, sort:str='total') -> str:
+        """text report, one line per API, in milliseconds
+
+        Args:
+            sort (str, optional): column to sort by, descending, calls, total, python, or a phase. Defaults to 'total'
+
+        Returns:
+            str: report
+        """
+        columns = [ 'total', 'python' ] + PHASES
+        summary = self.summary()
+
+        assert sort in ['calls'] + columns, 'sort should be calls or one of %s' % columns
+
+        lines = [ '%-40s %8s %s' % ('api', 'calls', ' '.join([ '%10s' % name for name in columns ])) ]
+        for api, item in sorted(summary.items(), key=lambda x: x[1][sort], reverse=True):
+            lines.append('%-40s %8d %s' % (api, item['calls'], ' '.join([ '%10.3f' % (item[name] * 1000) for name in columns ])))
+
+        return '\n'.join(lines)
+
+    def folded(self) -> str:
+        """flamegraph folded stacks, frame;frame;... microseconds
+
+        Returns:
+            str: folded stacks
+        """
+        lines = [ ]
+        for stack, (count, seconds) in sorted(self._self_times().items()):
+            microseconds = int(round(seconds * 1000000))
+            if microseconds > 0:
+                lines.append('%s %d' % (';'.join(stack), microseconds))
+        return '\n'.join(lines)
+
+    def dump_folded(self, path:str) -> NoReturn:
+        """write folded stacks to file, input of flamegraph.pl or speedscope
+
+        Args:
+            path (str): file path
+        """
+        with open(path, 'w') as f:
+            f.write(self.folded() + '\n')
+
+
+def profiled(name:str) -> Callable:
+    """decorator, time SpirentAPI method as API name if profiler is enabled
+
+    Args:
+        name (str): API name, for example, stc::get
+    """
+    def decorator(func:Callable) -> Callable:
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler == None:
+                return func(self, *args, **kwargs)
+            with profiler.phase(name):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,77 @@
+'''
+pytest plugin, sessions and port leases shared by tests
+
+fixtures:
+    stc_pool, SessionPool started once per worker
+    stc_api, session borrowed from stc_pool, it's also SpirentAPI.instance during the test
+    stc_ports, ports given by stc_ports marker, leased for the test
+
+run tests in parallel by pytest-xdist, for example, pytest -n 4,
+tests with disjoint ports run at the same time on different workers, and tests with the same ports wait for each other
+
+Example:
+    @pytest.mark.stc_ports('10.182.32.138/1/1', '10.182.32.138/1/2')
+    def test_traffic(stc_api, stc_ports):
+        stc_api.sth_connect(device='10.182.32.138', port_list='1/1 1/2')
+'''
+import logging
+import os
+
+import pytest
+
+from .apiwrapper import SpirentAPI
+from .pool import SessionPool, PortLeaseScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('spirentapi')
+    group.addoption('--stc-sessions', type=int, default=1, help='sessions started per worker, default 1')
+    group.addoption('--stc-threadsafe', action='store_true', default=False, help='start threadsafe sessions')
+    group.addoption('--stc-standby', action='store_true', default=False, help='start sessions with a standby tclsh')
+    group.addoption('--stc-emulator', action='store_true', default=False, help='start sessions on the emulator, without chassis')
+    group.addoption('--stc-lease-dir', default=None, help='directory of port lease files shared by workers, default spirentapi-leases in temp directory')
+    group.addoption('--stc-lease-timeout', type=float, default=None, help='seconds to wait for leased ports, default wait forever')
+    group.addoption('--stc-lease-ttl', type=float, default=3600, help='seconds a lease is valid unless it is renewed, leases of running tests are renewed every ttl/3, default 3600')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'stc_ports(*ports): chassis ports used by the test, leased by stc_ports fixture')
+
+
+@pytest.fixture(scope='session')
+def stc_pool(request):
+    """sessions of this worker"""
+    option = request.config.option
+    pool = SessionPool(option.stc_sessions, threadsafe=option.stc_threadsafe, standby=option.stc_standby, emulator=option.stc_emulator)
+    yield pool
+    pool.close()
+
+@pytest.fixture(scope='session')
+def stc_lease_scheduler(request):
+    """port lease scheduler shared by all workers"""
+    option = request.config.option
+    return PortLeaseScheduler(option.stc_lease_dir, ttl=option.stc_lease_ttl)
+
+@pytest.fixture
+def stc_api(stc_pool):
+    """session borrowed for the test, set as SpirentAPI.instance"""
+    with stc_pool.session() as api:
+        previous = SpirentAPI._instance
+        SpirentAPI.instance = api
+        try:
+            yield api
+        finally:
+            SpirentAPI.instance = previous
+
+@pytest.fixture
+def stc_ports(request, stc_lease_scheduler):
+    """ports given by stc_ports marker, leased for the test"""
+    ports = [ ]
+    for marker in request.node.iter_markers('stc_ports'):
+        ports.extend(marker.args)
+
+    owner = '%s %s' % (os.environ.get('PYTEST_XDIST_WORKER', 'master'), request.node.nodeid)
+
+    with stc_lease_scheduler.lease(ports, owner=owner, timeout=request.config.option.stc_lease_timeout):
+        yield ports
@@ -0,0 +1,234 @@
+'''
+Declarative configuration reconciliation against the live object tree
+'''
+import logging
+from typing import Any, NoReturn, Optional
+
+from .tclwrapper import tclstring_to_list, quote_tcllist
+
+logger = logging.getLogger(__name__)
+
+# keys of spec node which are not attributes
+_RESERVED_KEYS = ['type', 'children']
+
+
+def _attributes(node:dict) -> dict:
+    """attributes of spec node"""
+    return { name: value for name, value in node.items() if name not in _RESERVED_KEYS }
+
+def _value(value:Any) -> str:
+    """convert desired value to str used by STC"""
+    if type(value) == bool:
+        return 'true' if value else 'false'
+
+    return str(value)
+
+def _options(attributes:dict) -> str:
+    """convert attributes to tcl list of -name value"""
+    options = [ ]
+    for name, value in attributes.items():
+        options.extend([ '-%s' % name, _value(value) ])
+    return quote_tcllist(options)
+
+def _same(desired:Any, actual:str) -> bool:
+    """check if desired value is same as the value read from STC"""
+    desired = _value(desired)
+
+    if desired.lower() in ['true', 'false']:
+        return desired.lower() == actual.lower()
+
+    return desired == actual
+
+def _type_tree(spec:list, key:str) -> list:
+    """merge spec nodes by type on every level, return it in the tcl list form read_tree uses
+
+    Returns:
+        list: type attributes subtree type attributes subtree ...
+    """
+    types = { }
+    for node in spec:
+        assert type(node) == dict and 'type' in node, 'spec node should be dict with type'
+
+        type_ = node['type'].lower()
+        attributes, children = types.setdefault(type_, ([ key ], [ ]))
+
+        for name in _attributes(node).keys():
+            if name not in attributes:
+                attributes.append(name)
+
+        children.extend(node.get('children', [ ]))
+
+    ret = [ ]
+    for type_, (attributes, children) in types.items():
+        ret.extend([ type_, quote_tcllist(attributes), quote_tcllist(_type_tree(children, key)) ])
+
+    return ret
+
+def _parse_tree(data:str) -> list:
+    """parse tree returned by read_tree
+
+    Returns:
+        list: list of (handle, type, attributes dict, children)
+    """
+    ret = [ ]
+    for item in tclstring_to_list(data):
+
+        handle, type_, attributes, children = tclstring_to_list(item)
+        attributes = tclstring_to_list(attributes)
+        ret.append((handle, type_, dict(zip(attributes[0::2], attributes[1::2])), _parse_tree(children)))
+
+    return ret
+
+
+class ReconcilePlan:
+    """create/config/delete operations to turn the live object tree into the desired state
+
+    operations are tuples:
+        ('create', parent, type, attributes), parent is a handle, or '@n' for the n-th created object
+        ('config', handle, attributes)
+        ('delete', handle)
+    """
+
+    def __init__(self) -> NoReturn:
+        self.operations = [ ]
+        self.created = [ ]
+        self._creates = 0
+
+    def create(self, parent:str, type_:str, attributes:dict) -> str:
+        """add create operation
+
+        Returns:
+            str: reference of created object, '@n'
+        """
+        self.operations.append(('create', parent, type_, attributes))
+        self._creates = self._creates + 1
+        return '@%d' % (self._creates - 1)
+
+    def config(self, handle:str, attributes:dict) -> NoReturn:
+        """add config operation"""
+        self.operations.append(('config', handle, attributes))
+
+    def delete(self, handle:str) -> NoReturn:
+        """add delete operation"""
+        self.operations.append(('delete', handle))
+
+    @property
+    def creates(self) -> list:
+        return [ op for op in self.operations if op[0] == 'create' ]
+
+    @property
+    def configs(self) -> list:
+        return [ op for op in self.operations if op[0] == 'config' ]
+
+    @property
+    def deletes(self) -> list:
+        return [ op for op in self.operations if op[0] == 'delete' ]
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def __str__(self) -> str:
+        return '\n'.join([ ' '.join([ str(item) for item in op ]) for op in self.operations ])
+
+
+def _match(plan:ReconcilePlan, parent:str, spec:list, existing:list, key:str, delete:bool) -> NoReturn:
+    """compare spec nodes under parent with existing children, add operations to plan"""
+
+    unmatched = list(existing)
+
+    for node in spec:
+
+        type_ = node['type'].lower()
+        attributes = _attributes(node)
+
+        # match by key attribute if spec node has it, otherwise by order
+        found = None
+        for item in unmatched:
+            handle, item_type, values, children = item
+            if item_type != type_:
+                continue
+            if key in attributes and not _same(attributes[key], values.get(key, '')):
+                continue
+            found = item
+            break
+
+        if found == None:
+            reference = plan.create(parent, node['type'], attributes)
+            _match(plan, reference, node.get('children', [ ]), [ ], key, delete)
+            continue
+
+        unmatched.remove(found)
+        handle, item_type, values, children = found
+
+        changed = { name: value for name, value in attributes.items() if not _same(value, values.get(name, '')) }
+        if changed:
+            plan.config(handle, changed)
+
+        _match(plan, handle, node.get('children', [ ]), children, key, delete)
+
+    if delete:
+        for handle, item_type, values, children in unmatched:
+            plan.delete(handle)
+
+
+def plan_reconcile(api, spec:list, under:str, key:str='Name', delete:bool=False) -> ReconcilePlan:
+    """read the object tree under parent in one round-trip, and compute the operations to reach spec
+
+    Args:
+        api (SpirentAPI): session
+        spec (list): desired objects, see SpirentAPI.reconcile
+        under (str): parent handle of the spec objects
+        key (str, optional): attribute to identify objects of the same type. Defaults to 'Name'
+        delete (bool, optional): delete objects of the spec types which are not in spec. Defaults to False
+
+    Returns:
+        ReconcilePlan: operations
+    """
+    assert type(spec) == list, 'spec should be list type'
+
+    existing = _parse_tree(api.call_proc('read_tree', under, quote_tcllist(_type_tree(spec, key))))
+
+    plan = ReconcilePlan()
+    _match(plan, under, spec, existing, key, delete)
+
+    logger.info('reconcile plan: %d create, %d config, %d delete' % (len(plan.creates), len(plan.configs), len(plan.deletes)))
+
+    return plan
+
+def apply_plan(api, plan:ReconcilePlan, batch_size:int=1000) -> NoReturn:
+    """run operations of plan, batch_size operations per round-trip
+
+    handles of created objects are saved in plan.created
+
+    Args:
+        api (SpirentAPI): session
+        plan (ReconcilePlan): operations
+        batch_size (int, optional): operations per round-trip. Defaults to 1000
+    """
+    assert type(batch_size) == int and batch_size > 0, 'batch_size should be positive int'
+
+    def resolve(target):
+        # objects created in previous batches are known
+        if target.startswith('@') and int(target[1:]) < len(plan.created):
+            return plan.created[int(target[1:])]
+        return target
+
+    for start in range(0, len(plan.operations), batch_size):
+
+        offset = len(plan.created)
+        ops = [ ]
+        for op in plan.operations[start:start + batch_size]:
+
+            target = resolve(op[1])
+            if target.startswith('@'):
+                # created in this batch, index in this batch
+                target = '@%d' % (int(target[1:]) - offset)
+
+            if op[0] == 'create':
+                ops.append(quote_tcllist([ 'create', target, op[2], _options(op[3]) ]))
+            elif op[0] == 'config':
+                ops.append(quote_tcllist([ 'config', target, '', _options(op[2]) ]))
+            else:
+                ops.append(quote_tcllist([ 'delete', target, '', '' ]))
+
+        plan.created.extend(api.call_proc('apply_plan', quote_tcllist(ops), to_list=True))
@@ -0,0 +1,301 @@
+'''
+Spirent TestCenter result files
+'''
+import csv
+import io
+import logging
+import mmap
+import os
+import sqlite3
+import time
+from typing import Iterator, NoReturn, Optional, Union
+
+from .utils import dotdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+def _to_column(values:list) -> Union[list, 'np.ndarray']:
+    """convert str values of one column to typed column
+
+    int column, then float column, else str column.
+    with numpy, column is converted in one vectorized call, otherwise it's a list,
+    64-bit counters above the int64 maximum are kept as uint64
+
+    Args:
+        values (list): str values
+
+    Returns:
+        np.ndarray or list: typed column
+    """
+    if np != None:
+
+        column = np.array(values)
+        for dtype in [np.int64, np.uint64, np.float64]:
+            try:
+                return column.astype(dtype)
+            except (ValueError, OverflowError):
+                pass
+        return column
+
+    for type_ in [int, float]:
+        try:
+            return [ type_(value) for value in values ]
+        except ValueError:
+            pass
+    return values
+
+
+class ResultFile:
+    """read result file written by Spirent TestCenter, for example, by stc_subscribe with filenamePrefix, or by results export
+
+    file is read through a memory map, rows are split in one pass and converted to typed columns,
+    if numpy is installed, columns are numpy arrays, otherwise lists.
+    rows whose fields are not the columns of header are skipped, with a warning logged.
+
+    Example:
+        api.stc_subscribe('project1', 'StreamBlock', 'RxStreamSummaryResults', filenamePrefix='rx', interval=1)
+
+        f = ResultFile('rx.csv')
+        columns = f.read()
+        columns['FrameCount']
+
+        # get new rows while STC is still writing
+        for columns in f.follow(interval=1):
+            ...
+    """
+
+    def __init__(self, path:str, delimiter:str=',', encoding:str='utf-8') -> NoReturn:
+        """init function
+
+        Args:
+            path (str): result file path
+            delimiter (str, optional): field delimiter. Defaults to ','
+            encoding (str, optional): file encoding. Defaults to 'utf-8'
+        """
+        assert type(path) == str, 'path should be str type'
+        assert type(delimiter) == str and len(delimiter) == 1, 'delimiter should be a single char'
+
+        self.path = path
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.header = None
+        self._offset = 0
+
+    def _map(self) -> Optional[mmap.mmap]:
+        """map the file, None if it's empty"""
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _split(self, data:bytes) -> list:
+        """split complete lines to rows of str fields"""
+        text = data.decode(self.encoding)
+
+        if '"' in text:
+            # quoted fields, which may have new lines, let csv deal with it
+            return [ row for row in csv.reader(io.StringIO(text, newline=''), delimiter=self.delimiter) if row ]
+
+        return [ line.split(self.delimiter) for line in text.splitlines() if line.strip() != '' ]
+
+    def _columns(self, rows:list) -> dotdict:
+        """convert rows to typed columns named by header"""
+        ret = dotdict()
+
+        width = len(self.header)
+        count = len(rows)
+        rows = [ row for row in rows if len(row) == width ]
+        if len(rows) != count:
+            logger.warning('%s: %d rows are skipped, their fields are not the %d columns of header' % (self.path, count - len(rows), width))
+
+        fields = list(zip(*rows)) if rows else [ () ] * width
+        for name, values in zip(self.header, fields):
+            ret[name] = _to_column(list(values))
+
+        return ret
+
+    def _read_new(self) -> Optional[dotdict]:
+        """read complete rows after the last read, None if there is no new row"""
+        data = self._map()
+        if data == None:
+            return None
+
+        try:
+            if len(data) < self._offset:
+                # file is truncated or rewritten, start over
+                logger.info('%s is truncated, read it again' % self.path)
+                self._offset = 0
+                self.header = None
+
+            # only complete lines are read, the last line may be still being written
+            end = data.rfind(b'\n', self._offset)
+            if end == -1:
+                return None
+
+            rows = self._split(data[self._offset:end + 1])
+            self._offset = end + 1
+        finally:
+            data.close()
+
+        if self.header == None:
+            # comment lines before header are skipped
+            while rows and rows[0][0].startswith('#'):
+                rows.pop(0)
+            if not rows:
+                return None
+            self.header = [ name.strip() for name in rows.pop(0) ]
+
+        if not rows:
+            return None
+
+        return self._columns(rows)
+
+    def read(self) -> dotdict:
+        """read the whole file
+
+        Returns:
+            dotdict: column name -> typed column
+        """
+        self._offset = 0
+        self.header = None
+
+        columns = self._read_new()
+        if columns == None:
+            columns = self._columns([ ]) if self.header != None else dotdict()
+
+        return columns
+
+    def follow(self, interval:float=1, timeout:Optional[float]=None) -> Iterator[dotdict]:
+        """read rows appended to the file, from where the last read stopped
+
+        Args:
+            interval (float, optional): seconds to wait when there is no new row. Defaults to 1
+            timeout (float, optional): stop when there is no new row for timeout seconds. Defaults to None, never stop
+
+        Returns:
+            Iterator[dotdict]: column name -> typed column of new rows
+        """
+        last = time.time()
+
+        while True:
+
+            columns = self._read_new() if os.path.exists(self.path) else None
+
+            if columns != None:
+                last = time.time()
+                yield columns
+                continue
+
+            if timeout != None and time.time() - last >= timeout:
+                return
+
+            time.sleep(interval)
+
+
+class ResultDatabase:
+    """read result database written by Spirent TestCenter, for example, by SaveResults, it's a sqlite file
+
+    tables are read by sqlite into typed columns, numpy arrays if numpy is installed, otherwise lists.
+
+    Example:
+        api.stc_perform('SaveResults', CollectResult='TRUE', SaveDetailedResults='TRUE', DatabaseConnectionString='results.db')
+
+        db = ResultDatabase('results.db')
+        db.tables()
+        columns = db.read('RxEotStreamResults', columns=['FrameCount', 'SigFrameCount'])
+
+        # get new rows while STC is still writing
+        for columns in db.follow('RxEotStreamResults', interval=1):
+            ...
+    """
+
+    def __init__(self, path:str) -> NoReturn:
+        """init function
+
+        Args:
+            path (str): result database path
+        """
+        assert type(path) == str, 'path should be str type'
+
+        self.path = path
+        self._rowid = { }
+
+    def _query(self, sql:str, args:tuple=()) -> tuple:
+        """run query read-only, return column names and rows"""
+        connection = sqlite3.connect('file:%s?mode=ro' % self.path, uri=True)
+        try:
+            cursor = connection.execute(sql, args)
+            return [ d[0] for d in cursor.description ], cursor.fetchall()
+        finally:
+            connection.close()
+
+    def tables(self) -> list[str]:
+        """names of result tables
+
+        Returns:
+            list[str]: table names
+        """
+        _, rows = self._query("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+        return [ row[0] for row in rows ]
+
+    def _read(self, table:str, columns:Optional[list], after:int) -> tuple:
+        """read rows of table after rowid, return last rowid and typed columns"""
+        assert table in self.tables(), 'table %s is not in %s' % (table, self.path)
+
+        names = '*' if columns == None else ', '.join([ '"%s"' % c.replace('"', '""') for c in columns ])
+        header, rows = self._query('SELECT rowid, %s FROM "%s" WHERE rowid > ? ORDER BY rowid' % (names, table.replace('"', '""')), (after, ))
+
+        ret = dotdict()
+        fields = list(zip(*rows)) if rows else [ () ] * len(header)
+        for name, values in zip(header[1:], fields[1:]):
+            ret[name] = _to_column([ '' if v == None else str(v) for v in values ])
+
+        return (rows[-1][0] if rows else after), ret
+
+    def read(self, table:str, columns:Optional[list[str]]=None) -> dotdict:
+        """read the whole table
+
+        Args:
+            table (str): table name
+            columns (list[str], optional): columns to read. Defaults to None, all columns
+
+        Returns:
+            dotdict: column name -> typed column
+        """
+        self._rowid[table], ret = self._read(table, columns, 0)
+        return ret
+
+    def follow(self, table:str, columns:Optional[list[str]]=None, interval:float=1, timeout:Optional[float]=None) -> Iterator[dotdict]:
+        """read rows inserted into the table, from where the last read stopped
+
+        Args:
+            table (str): table name
+            columns (list[str], optional): columns to read. Defaults to None, all columns
+            interval (float, optional): seconds to wait when there is no new row. Defaults to 1
+            timeout (float, optional): stop when there is no new row for timeout seconds. Defaults to None, never stop
+
+        Returns:
+            Iterator[dotdict]: column name -> typed column of new rows
+        """
+        last = time.time()
+
+        while True:
+
+            rowid, ret = self._read(table, columns, self._rowid.get(table, 0))
+
+            if rowid != self._rowid.get(table, 0):
+                self._rowid[table] = rowid
+                last = time.time()
+                yield ret
+                continue
+
+            if timeout != None and time.time() - last >= timeout:
+                return
+
+            time.sleep(interval)
@@ -0,0 +1,167 @@
+'''
+Paged result views filtered, sorted and aggregated by Spirent TestCenter
+'''
+import logging
+from typing import Iterator, NoReturn, Optional, Union
+
+from .apiwrapper import SpirentAPI
+from .tclwrapper import tclstring_to_list, list_to_tclword
+from .utils import dotdict
+
+logger = logging.getLogger(__name__)
+
+
+class ResultView:
+    """DynamicResultView with one PresentationResultQuery, results are filtered, sorted, grouped and paged by STC,
+    only the rows of the page asked for are read, one round-trip per page
+
+    properties are Type.Attribute, for example, StreamBlock.DroppedFrameCount, a row is a dotdict of property -> value
+
+    Example:
+        # top 100 streams by dropped frames
+        with ResultView(['StreamBlock.Name', 'StreamBlock.DroppedFrameCount'], where=['StreamBlock.DroppedFrameCount > 0'],
+                        sort_by=['StreamBlock.DroppedFrameCount DESC']) as view:
+            for row in view.rows(limit=100):
+                print(row['StreamBlock.Name'], row['StreamBlock.DroppedFrameCount'])
+
+        # frames sent per port
+        with ResultView(['Port.Name', 'StreamBlock.TxFrameCount'], group_by=['Port.Name']) as view:
+            sums = view.page(0)
+    """
+
+    def __init__(self, select:list, where:Optional[list]=None, sort_by:Optional[list]=None, group_by:Optional[list]=None,
+                 source:Union[str, list]='project1', page_size:int=100, project:Optional[str]=None, api:Optional[SpirentAPI]=None) -> NoReturn:
+        """init function
+
+        Args:
+            select (list): properties of rows, Type.Attribute
+            where (list, optional): conditions, all of them are met, for example, 'StreamBlock.DroppedFrameCount > 0'. Defaults to None
+            sort_by (list, optional): properties to sort by, with ASC or DESC, for example, 'StreamBlock.DroppedFrameCount DESC'. Defaults to None
+            group_by (list, optional): properties to group rows by, other properties are aggregated by STC. Defaults to None
+            source (str or list, optional): objects results are read under. Defaults to 'project1'
+            page_size (int, optional): rows per page. Defaults to 100
+            project (str, optional): project the view is created under. Defaults to None, source if it's a project, otherwise the project of the session
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+        """
+        assert type(select) == list and len(select) > 0, 'select should be list type and not empty'
+        assert type(page_size) == int and page_size > 0, 'page_size should be positive int'
+
+        self.select = select
+        self.where = where if where != None else [ ]
+        self.sort_by = sort_by if sort_by != None else [ ]
+        self.group_by = group_by if group_by != None else [ ]
+        self.source = source if type(source) == list else [ source ]
+        self.page_size = page_size
+        self.project = project
+        self.handle = None
+        self.query = None
+        self._api = api
+
+    @property
+    def api(self) -> SpirentAPI:
+        return self._api if self._api != None else SpirentAPI.instance
+
+    def create(self) -> NoReturn:
+        """create DynamicResultView and its PresentationResultQuery, and subscribe it
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+        """
+        assert self.handle == None, 'result view is already created'
+
+        api = self.api
+
+        project = self.project
+        if project == None:
+            project = self.source[0] if self.source[0].lower().startswith('project') else api.stc_get('system1', [ 'children-project' ])
+
+        self.handle = api.stc_create('DynamicResultView', under=project, ResultSources=list_to_tclword(self.source))
+
+        options = dict(under=self.handle, SelectProperties=list_to_tclword(self.select), FromObjects=list_to_tclword(self.source),
+                       LimitOffset=0, LimitSize=self.page_size)
+        if self.where:
+            options['WhereConditions'] = list_to_tclword(self.where)
+        if self.sort_by:
+            options['SortBy'] = list_to_tclword(self.sort_by)
+        if self.group_by:
+            options['GroupByProperties'] = list_to_tclword(self.group_by)
+        self.query = api.stc_create('PresentationResultQuery', **options)
+
+        api.stc_perform('SubscribeDynamicResultView', DynamicResultView=self.handle)
+        logger.info('result view %s created' % self.handle)
+
+    def close(self) -> NoReturn:
+        """unsubscribe and delete DynamicResultView
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+        """
+        if self.handle == None:
+            return
+
+        handle, self.handle, self.query = self.handle, None, None
+        self.api.stc_perform('UnsubscribeDynamicResultView', DynamicResultView=handle)
+        self.api.stc_delete(handle)
+
+    def __enter__(self):
+        if self.handle == None:
+            self.create()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def page(self, index:int, size:Optional[int]=None) -> list:
+        """rows of page, updated by STC when it's read
+
+        Args:
+            index (int): page index, from 0
+            size (int, optional): rows per page. Defaults to None, page_size
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Returns:
+            list[dotdict]: rows, fewer than size for the last page
+        """
+        size = size if size != None else self.page_size
+        assert type(index) == int and index >= 0, 'index should be int and not negative'
+        assert type(size) == int and size > 0, 'size should be positive int'
+
+        if self.handle == None:
+            self.create()
+
+        return self._read(index * size, size)
+
+    def _read(self, offset:int, size:int) -> list:
+        """read size rows from offset"""
+        rows = self.api.call_proc('result_page', self.handle, self.query, offset, size, to_list=True)
+        return [ dotdict(zip(self.select, tclstring_to_list(row))) for row in rows ]
+
+    def rows(self, limit:Optional[int]=None) -> Iterator[dotdict]:
+        """iterate rows page by page, the next page is read when the rows of the previous one are used
+
+        Args:
+            limit (int, optional): max rows. Defaults to None, all rows
+
+        Raises:
+            TCLWrapperError: if running scripts failed, raise TCLWrapperError
+
+        Yields:
+            dotdict: row
+        """
+        if self.handle == None:
+            self.create()
+
+        offset = 0
+        while limit == None or offset < limit:
+            size = self.page_size if limit == None else min(self.page_size, limit - offset)
+            page = self._read(offset, size)
+            yield from page
+
+            if len(page) < size:
+                return
+            offset = offset + size
+
+    def __iter__(self) -> Iterator[dotdict]:
+        return self.rows()
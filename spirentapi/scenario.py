@@ -0,0 +1,242 @@
+'''
+Scenario of steps run through one session, tcl script or declarative step list
+'''
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from typing import NoReturn, Optional, Union
+
+from .apiwrapper import SpirentAPI
+from .tclwrapper import tclstring_to_list, quote_tclstring
+from .utils import dict_to_opt
+
+logger = logging.getLogger(__name__)
+
+# step of scenario, script is a tcl command, sleep is seconds to wait after the replies of previous steps
+Step = namedtuple('Step', ['name', 'script', 'check', 'sleep'])
+
+# result of step, seconds is the time taken by tcl, or by sleep
+StepResult = namedtuple('StepResult', ['index', 'name', 'ok', 'seconds', 'result'])
+
+# procs registered in the session by Scenario
+_PROCS = {
+
+    # split tcl script to complete commands, comments and empty lines are dropped
+    'split_script': ('script', '''
+    set commands [ list ]
+    set command ""
+    foreach line [ split $script \\n ] {
+        append command $line \\n
+        if { [ info complete $command ] } {
+            set command [ string trim $command ]
+            if { $command ne "" && [ string index $command 0 ] ne "#" } {
+                lappend commands $command
+            }
+            set command ""
+        }
+    }
+    if { [ string trim $command ] ne "" } {
+        error "incomplete command: [ string range [ string trim $command ] 0 80 ]"
+    }
+    return $commands
+'''),
+
+    # run step in global scope, return code, microseconds taken and result, sth:: result with status 0 is an error
+    'run_step': ('script check', '''
+    set start [ clock microseconds ]
+    set code [ catch { uplevel #0 $script } result ]
+    set elapsed [ expr { [ clock microseconds ] - $start } ]
+    if { $code == 0 && $check && ![ catch { keylget result status } status ] && $status == 0 } {
+        set code 1
+        if { [ catch { keylget result log } result ] } {
+            set result "status 0"
+        }
+    }
+    return [ list $code $elapsed $result ]
+'''),
+}
+
+
+def _name(cmd:str) -> str:
+    """default step name, command and its first argument if it's not an option"""
+    words = cmd.split()
+    return ' '.join(words[:2]) if len(words) > 1 and not words[1].startswith('-') else words[0] if words else ''
+
+def _step(item:Union[dict, str], index:int) -> Step:
+    """convert item of declarative step list to Step"""
+    if type(item) == str:
+        item = { 'tcl': item }
+
+    assert type(item) == dict, 'step %d should be dict or str type' % index
+
+    if 'sleep' in item:
+        return Step(item.get('name', 'sleep'), None, False, float(item['sleep']))
+
+    args = item.get('args', { })
+    assert type(args) == dict, 'args of step %d should be dict type' % index
+
+    if 'tcl' in item:
+        cmd = item['tcl']
+    elif 'stc' in item:
+        cmd = ('stc::%s %s' % (item['stc'], dict_to_opt(args, prefix='-'))).strip()
+    elif 'sth' in item:
+        cmd = ('sth::%s %s' % (item['sth'], dict_to_opt(args, prefix='-'))).strip()
+    else:
+        raise ValueError('step %d should have tcl, stc, sth or sleep' % index)
+
+    name = item.get('name', _name(cmd))
+    script = 'set %s [ %s ]' % (quote_tclstring('::' + item['set']), cmd) if 'set' in item else cmd
+
+    return Step(name, script, 'sth' in item, None)
+
+
+class Scenario:
+    """steps run in order through one session, tcl commands are pipelined in batches
+
+    a scenario is a tcl script, every complete command is a step, or a declarative step list in json,
+    a list of steps, or { "variables": { ... }, "steps": [ ... ] }, a step is one of:
+
+        { "tcl": "stc::create project", "set": "project" }
+        { "stc": "create port", "args": { "under": "$project", "location": "//$chassis/1/1" }, "set": "port" }
+        { "sth": "traffic_control", "args": { "action": "run", "port_handle": "all" } }
+        { "sleep": 5 }
+
+    set saves the result to a global tcl variable, which is used by later steps as $name,
+    so steps never wait for the replies of the previous steps, and up to batch_size steps are sent back to back.
+    sleep waits for all replies before it starts. sth:: steps fail if status of the keyed list is 0.
+
+    steps of a batch are already sent when one of them fails, so they still run, and the scenario stops after the batch
+
+    Example:
+        scenario = Scenario('throughput.json')
+        for result in scenario.run(api, variables={ 'chassis': '10.0.0.1' }):
+            print(result.name, result.ok, result.seconds)
+    """
+
+    def __init__(self, source:str, format:Optional[str]=None) -> NoReturn:
+        """init function
+
+        Args:
+            source (str): path of scenario file, or tcl script or json text
+            format (str, optional): 'tcl' or 'json'. Defaults to None, by file extension, or json if it starts with [ or {
+        """
+        assert type(source) == str, 'source should be str type'
+
+        if os.path.isfile(source):
+            self.path = source
+            with open(source, 'r') as f:
+                text = f.read()
+            if format == None:
+                format = 'json' if os.path.splitext(source)[1].lower() == '.json' else 'tcl'
+        else:
+            self.path = None
+            text = source
+            if format == None:
+                format = 'json' if text.lstrip()[:1] in ('[', '{') else 'tcl'
+
+        assert format in ('tcl', 'json'), 'format should be tcl or json'
+
+        self.format = format
+        self.variables = { }
+        self._text = text
+        self._steps = None
+
+        if format == 'json':
+            data = json.loads(text)
+            if type(data) == dict:
+                self.variables = data.get('variables', { })
+                data = data.get('steps', [ ])
+            assert type(data) == list, 'steps should be list type'
+            self._steps = [ _step(item, i) for i, item in enumerate(data) ]
+
+    def steps(self, api:Optional[SpirentAPI]=None) -> list:
+        """steps of scenario, tcl script is split to commands by tclsh of the session
+
+        Args:
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+
+        Returns:
+            list[Step]: steps
+        """
+        if self._steps == None:
+            api = api if api != None else SpirentAPI.instance
+            _register(api)
+            self._steps = [ Step(_name(cmd), cmd, cmd.startswith('sth::'), None)
+                            for cmd in api.call_proc('split_script', self._text, to_list=True) ]
+        return self._steps
+
+    def run(self, api:Optional[SpirentAPI]=None, batch_size:int=100, variables:Optional[dict]=None,
+            stop_on_error:bool=True) -> list:
+        """run steps through session
+
+        steps are pipelined if the session is threadsafe, otherwise they are run one by one
+
+        Args:
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+            batch_size (int, optional): max steps sent without waiting for replies. Defaults to 100
+            variables (dict, optional): global tcl variables set before the steps, over variables of the scenario. Defaults to None
+            stop_on_error (bool, optional): stop after the batch in which a step fails. Defaults to True
+
+        Raises:
+            TCLWrapperInstanceError: if tclsh dies, raise TCLWrapperInstanceError
+
+        Returns:
+            list[StepResult]: results of steps run
+        """
+        assert type(batch_size) == int and batch_size > 0, 'batch_size should be positive int'
+
+        api = api if api != None else SpirentAPI.instance
+        steps = self.steps(api)
+        _register(api)
+
+        values = dict(self.variables)
+        values.update(variables if variables != None else { })
+        if values:
+            api.eval(' ; '.join([ 'set %s %s' % (quote_tclstring('::%s' % name), quote_tclstring(value)) for name, value in values.items() ]))
+
+        results = [ ]
+        batch = [ ]
+
+        def flush() -> bool:
+            """send batch, return False if a step failed"""
+            if not batch:
+                return True
+
+            replies = api.eval([ '::spirentapi::run_step %s %d' % (quote_tclstring(step.script), int(step.check)) for i, step in batch ])
+
+            ok = True
+            for (i, step), reply in zip(batch, replies):
+                code, elapsed, result = tclstring_to_list(reply)
+                results.append(StepResult(i, step.name, code == '0', int(elapsed) / 1e6, result))
+                if code != '0':
+                    ok = False
+                    logger.error('step %d %s failed: %s' % (i, step.name, result))
+
+            batch.clear()
+            return ok
+
+        for i, step in enumerate(steps):
+
+            if step.sleep != None:
+                if not flush() and stop_on_error:
+                    return results
+                begin = time.perf_counter()
+                time.sleep(step.sleep)
+                results.append(StepResult(i, step.name, True, time.perf_counter() - begin, ''))
+                continue
+
+            batch.append((i, step))
+            if len(batch) >= batch_size:
+                if not flush() and stop_on_error:
+                    return results
+
+        flush()
+        return results
+
+
+def _register(api:SpirentAPI) -> NoReturn:
+    """register procs used by Scenario in session"""
+    for name, (args, body) in _PROCS.items():
+        api.register_proc(name, args, body)
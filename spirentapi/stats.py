@@ -0,0 +1,188 @@
+'''
+Columnar HLTAPI statistics
+'''
+import logging
+import math
+from typing import NoReturn, Optional
+
+from .apiwrapper import SpirentAPI
+from .tclwrapper import TCLWrapperError, tclstring_to_list
+from .utils import dict_to_opt
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# columns of a stats table
+COLUMNS = ['port', 'stream', 'direction', 'counter', 'value']
+
+
+def _to_float(value:str) -> float:
+    """convert counter value to float, nan if it's not a number"""
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+class StatsTable:
+    """HLTAPI statistics flattened to rows of (port, stream, direction, counter, value)
+
+    stream is '' for port level counters, direction is '' if the counter has no rx/tx level.
+    if numpy is installed, columns are numpy arrays, value and rate are float64, otherwise lists
+    """
+
+    def __init__(self, port:list, stream:list, direction:list, counter:list, value:list, timestamp:float) -> NoReturn:
+        """init function
+
+        Args:
+            port (list): port column
+            stream (list): stream column
+            direction (list): direction column
+            counter (list): counter column
+            value (list): value column, str
+            timestamp (float): seconds since epoch when statistics are read, by tcl clock
+        """
+        if np != None:
+            self.port = np.array(port, dtype=object)
+            self.stream = np.array(stream, dtype=object)
+            self.direction = np.array(direction, dtype=object)
+            self.counter = np.array(counter, dtype=object)
+            self.value = np.array([ _to_float(v) for v in value ], dtype=np.float64)
+        else:
+            self.port = list(port)
+            self.stream = list(stream)
+            self.direction = list(direction)
+            self.counter = list(counter)
+            self.value = [ _to_float(v) for v in value ]
+
+        self.timestamp = timestamp
+        self.rate = None
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def keys(self) -> list:
+        """(port, stream, direction, counter) of rows"""
+        return list(zip(self.port, self.stream, self.direction, self.counter))
+
+    def columns(self) -> dict:
+        """columns by name, rate is included if it's computed
+
+        Returns:
+            dict: column name -> column
+        """
+        ret = { name: getattr(self, name) for name in COLUMNS }
+        if self.rate is not None:
+            ret['rate'] = self.rate
+        return ret
+
+    def to_dataframe(self):
+        """convert to pandas DataFrame
+
+        Returns:
+            pandas.DataFrame: one row per counter
+        """
+        import pandas
+        return pandas.DataFrame(self.columns())
+
+    def compute_rate(self, previous:'StatsTable') -> NoReturn:
+        """compute per second rate of value since previous table, rows not in previous are nan
+
+        Args:
+            previous (StatsTable): table of the previous poll
+        """
+        interval = self.timestamp - previous.timestamp
+        if interval <= 0:
+            return
+
+        if np != None:
+            # rows are in the same order if keyed list structure doesn't change, no alignment needed
+            if len(previous) == len(self) and all([ np.array_equal(getattr(self, name), getattr(previous, name)) for name in COLUMNS[:4] ]):
+                self.rate = (self.value - previous.value) / interval
+                return
+
+            index = { key: i for i, key in enumerate(previous.keys()) }
+            positions = np.array([ index.get(key, -1) for key in self.keys() ], dtype=np.int64)
+            found = positions >= 0
+            self.rate = np.full(len(self), np.nan)
+            self.rate[found] = (self.value[found] - previous.value[positions[found]]) / interval
+        else:
+            index = dict(zip(previous.keys(), previous.value))
+            self.rate = [ (value - index[key]) / interval if key in index else math.nan for key, value in zip(self.keys(), self.value) ]
+
+
+class StatsPoller:
+    """poll HLTAPI statistics function, and get StatsTable with rates
+
+    keyed list result is flattened in tclsh, without dotdict, so one poll is one round-trip
+
+    Example:
+        poller = StatsPoller('traffic_stats', mode='all', port_handle='port1 port2')
+        table = poller.poll()
+        ...
+        table = poller.poll()
+        table.rate
+    """
+
+    def __init__(self, function:str='traffic_stats', api:Optional[SpirentAPI]=None, **kwargs) -> NoReturn:
+        """init function
+
+        Args:
+            function (str, optional): sth:: function, for example, traffic_stats, interface_stats. Defaults to 'traffic_stats'
+            api (SpirentAPI, optional): session. Defaults to None, use SpirentAPI.instance
+            kwargs (optional): argument passed to sth:: function
+        """
+        assert type(function) == str, 'function should be str type'
+
+        self.function = function if function.startswith('sth::') else 'sth::%s' % function
+        self.kwargs = kwargs
+        self.previous = None
+        self._api = api
+
+    @property
+    def api(self) -> SpirentAPI:
+        return self._api if self._api != None else SpirentAPI.instance
+
+    def read(self) -> StatsTable:
+        """run sth:: function once, and flatten its result
+
+        Raises:
+            TCLWrapperError: if running scripts or sth:: function failed, raise TCLWrapperError
+
+        Returns:
+            StatsTable: statistics
+        """
+        cmd = '%s %s' % (self.function, dict_to_opt(self.kwargs, prefix='-'))
+
+        reply = self.api.call_proc('stats_rows', cmd, to_list=True)
+        timestamp, status, log, rows = reply
+
+        if status == '0':
+            raise TCLWrapperError(cmd, log)
+
+        rows = tclstring_to_list(rows)
+
+        return StatsTable(rows[0::5], rows[1::5], rows[2::5], rows[3::5], rows[4::5], int(timestamp) / 1000.0)
+
+    def poll(self) -> StatsTable:
+        """read statistics, and compute rates since the previous poll
+
+        statistics are added to the time series store of the session if it's enabled, see SpirentAPI.enable_timeseries
+
+        Returns:
+            StatsTable: statistics, rate is None for the first poll
+        """
+        table = self.read()
+
+        if self.previous != None:
+            table.compute_rate(self.previous)
+
+        if self.api.timeseries != None:
+            self.api.timeseries.add_table(table)
+
+        self.previous = table
+        return table
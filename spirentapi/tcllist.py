@@ -0,0 +1,209 @@
+'''
+Tcl list and dict parser, without tcl interpreter
+
+functions have no state, so they can be called from any thread
+'''
+import re
+from typing import Union
+
+# whitespace separating list elements
+_WHITESPACE = ' \t\n\r\v\f'
+
+_space = re.compile('[ \\t\\n\\r\\v\\f]*')
+_word = re.compile('[^ \\t\\n\\r\\v\\f]+')
+_special = re.compile(r'[{}"\\]')
+_not_space = re.compile('[\\x1c-\\x1f]')
+_brace = re.compile(r'[{}\\]')
+_quoted = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"', re.S)
+_bare = re.compile(r'[^ \t\n\r\v\f\\]*(?:\\(?:\n[ \t]*|.)[^ \t\n\r\v\f\\]*)*\\?', re.S)
+_escape = re.compile(r'\\(?:([0-3][0-7]{0,2}|[4-7][0-7]?)|x([0-9a-fA-F]{1,2})|u([0-9a-fA-F]{1,4})|U([0-9a-fA-F]{1,8})|(\n[ \t]*)|(.))', re.S)
+_escapes = { 'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v' }
+
+def _braced(depth:int) -> str:
+    """regular expression of element in braces, nested up to depth levels"""
+    content = r'[^{}\\]*(?:\\.[^{}\\]*)*'
+    for i in range(depth):
+        content = r'[^{}\\]*(?:(?:\\.|\{%s\})[^{}\\]*)*' % content
+    return r'\{%s\}' % content
+
+# one element per match: braced, quoted, bare, or anything else, which is parsed again by _parse_elements
+_element = re.compile(r'[ \t\n\r\v\f]*(?:(%s)(?=[ \t\n\r\v\f]|$)|("[^"\\]*(?:\\.[^"\\]*)*")(?=[ \t\n\r\v\f]|$)|((?:[^ \t\n\r\v\f\\{"]|\\(?:\n[ \t]*|.))[^ \t\n\r\v\f\\]*(?:\\(?:\n[ \t]*|.)[^ \t\n\r\v\f\\]*)*)|([^ \t\n\r\v\f]))' % _braced(4), re.S)
+
+
+def _substitute(match:re.Match) -> str:
+    """replace one backslash sequence"""
+    octal, hex_, unicode_, unicode_long, newline, char = match.groups()
+
+    if char != None:
+        return _escapes.get(char, char)
+    if newline != None:
+        return ' '
+    if octal != None:
+        return chr(int(octal, 8))
+
+    code = int(hex_ or unicode_ or unicode_long, 16)
+    return chr(code) if code <= 0x10ffff else match.group(0)
+
+def unescape(value:str) -> str:
+    """backslash substitution, as tcl does for list elements not in braces
+
+    Args:
+        value (str): element
+
+    Returns:
+        str: substituted element
+    """
+    if '\\' not in value:
+        return value
+
+    return _escape.sub(_substitute, value)
+
+def _close_brace(tclstring:str, start:int) -> int:
+    """position of the brace closing the brace at start"""
+    depth = 0
+    escaped = -1
+    for match in _brace.finditer(tclstring, start):
+        position = match.start()
+        if position == escaped:
+            # char after backslash doesn't count
+            continue
+        char = match.group(0)
+        if char == '\\':
+            escaped = position + 1
+        elif char == '{':
+            depth = depth + 1
+        else:
+            depth = depth - 1
+            if depth == 0:
+                return position
+
+    raise ValueError('unmatched open brace in list')
+
+def _check_end(tclstring:str, position:int, what:str) -> int:
+    """element in braces or quotes must be followed by whitespace"""
+    if position < len(tclstring) and tclstring[position] not in _WHITESPACE:
+        raise ValueError('list element in %s followed by "%s" instead of space' % (what, tclstring[position:position + 20]))
+    return position
+
+def parse_list(tclstring:str) -> tuple:
+    """split tcl list to elements, like lindex or split in tclsh
+
+    braces, quotes and backslash escapes are handled as tcl does, in one pass
+
+    Args:
+        tclstring (str): tcl list
+
+    Raises:
+        ValueError: if it's not a well-formed tcl list, raise ValueError
+
+    Returns:
+        tuple: elements
+    """
+    if type(tclstring) != str:
+        tclstring = str(tclstring)
+
+    # no braces, quotes or backslashes, just split by whitespace
+    if not _special.search(tclstring):
+        if tclstring.isascii() and not _not_space.search(tclstring):
+            # str.split splits by \x1c-\x1f and unicode spaces too, tcl doesn't
+            return tuple(tclstring.split())
+        return tuple(_word.findall(tclstring))
+
+    # one scan by regular expression, braces nested deeper than it handles, or errors, are parsed element by element
+    elements = _element.findall(tclstring)
+    if any([ other for braced, quoted, bare, other in elements ]):
+        return _parse_elements(tclstring)
+
+    return tuple([ braced[1:-1] if braced else (bare if '\\' not in bare else unescape(bare)) if bare else unescape(quoted[1:-1]) for braced, quoted, bare, other in elements ])
+
+def _parse_elements(tclstring:str) -> tuple:
+    """split tcl list element by element"""
+    items = [ ]
+    size = len(tclstring)
+    position = _space.match(tclstring, 0).end()
+
+    while position < size:
+
+        char = tclstring[position]
+
+        if char == '{':
+            end = _close_brace(tclstring, position)
+            items.append(tclstring[position + 1:end])
+            position = _check_end(tclstring, end + 1, 'braces')
+
+        elif char == '"':
+            match = _quoted.match(tclstring, position)
+            if match == None:
+                raise ValueError('unmatched open quote in list')
+            items.append(unescape(match.group(1)))
+            position = _check_end(tclstring, match.end(), 'quotes')
+
+        else:
+            match = _bare.match(tclstring, position)
+            items.append(unescape(match.group(0)))
+            position = match.end()
+
+        position = _space.match(tclstring, position).end()
+
+    return tuple(items)
+
+def parse_dict(tclstring:str) -> dict:
+    """convert tcl dict, or -name value pairs, to dict
+
+    Args:
+        tclstring (str): tcl dict
+
+    Raises:
+        ValueError: if it's not a well-formed tcl list, or a key has no value, raise ValueError
+
+    Returns:
+        dict: key -> value, later value wins if key is repeated
+    """
+    items = parse_list(tclstring)
+    if len(items) % 2 != 0:
+        raise ValueError('missing value to go with key')
+
+    return dict(zip(items[0::2], items[1::2]))
+
+def parse_nested(tclstring:str) -> Union[tuple, str]:
+    """split tcl list recursively, elements which are lists of more than one element are split too
+
+    same as tkinter split: a string which is not a list of more than one element is returned as it is
+
+    Args:
+        tclstring (str): tcl list
+
+    Returns:
+        tuple or str: nested tuples of str, or str
+    """
+    try:
+        items = parse_list(tclstring)
+    except ValueError:
+        return tclstring
+
+    if len(items) == 0:
+        return ''
+    if len(items) == 1:
+        return items[0]
+
+    return tuple(parse_nested(item) for item in items)
+
+def parse_flat(tclstring:str) -> list:
+    """split tcl list recursively, and return the words in a flat list
+
+    Args:
+        tclstring (str): tcl list
+
+    Returns:
+        list: words
+    """
+    def flatten(nested):
+        if type(nested) == str:
+            return [ nested ] if nested != '' else [ ]
+
+        ret = [ ]
+        for item in nested:
+            ret.extend(flatten(item))
+        return ret
+
+    return flatten(parse_nested(tclstring))
@@ -1,18 +1,25 @@
-import tkinter as tk
+import mmap
+import os
 import subprocess
-import random
+import secrets
+import struct
 import warnings
 import string
 import tempfile
+import re
+import time
+import threading
+import queue
+from concurrent.futures import Future
 
-_tcl = tk.Tk(useTk = 0)
+from .tcllist import parse_list, parse_nested, parse_flat
 
-tclstring_to_list = _tcl.tk.splitlist
+# parsed in python, the tkinter interpreter is bound to the thread creating it, replies are parsed in dispatcher and worker threads
+tclstring_to_list = parse_list
 
-tclstring_to_nested_list = _tcl.tk.split
+tclstring_to_nested_list = parse_nested
 
-def tclstring_to_flat_list(tclstring):
-    return tclstring.replace('{', ' ').replace('}', ' ').split()
+tclstring_to_flat_list = parse_flat
 
 def list_to_tclstring(in_list):
     cleaned_up_list = []
@@ -39,6 +46,154 @@ def nested_list_to_tclstring(nested_list):
             items.append('{' + nested_list_to_tclstring(item) + '}')
     return ' '.join(items)
 
+_tclstring_special = re.compile(r'[\s\\\[\]{}$";]')
+_tclstring_escapes = { '\n': '\\n', '\t': '\\t', '\r': '\\r', '\f': '\\f', '\v': '\\v' }
+
+def quote_tclstring(value):
+    """quote value as a single tcl word, whatever characters it contains"""
+    value = str(value)
+
+    if value == '':
+        return '{}'
+
+    if not _tclstring_special.search(value):
+        return value
+
+    return _tclstring_special.sub(lambda m: _tclstring_escapes.get(m.group(0), '\\' + m.group(0)), value)
+
+def quote_tcllist(in_list):
+    """convert list to a tcl list, every entry is quoted as a single tcl word"""
+    return ' '.join([ quote_tclstring(entry) for entry in in_list ])
+
+def _to_str(output):
+    """output as str, memoryview of the bulk channel is decoded"""
+    return str(output, 'utf-8') if isinstance(output, memoryview) else output
+
+def list_to_tclword(in_list):
+    """convert list to a tcl list which can be used as a single tcl word"""
+    return quote_tclstring(quote_tcllist(in_list))
+
+
+# tcl event loop: stdin is read by a file event handler, one complete command per handler call,
+# so after and file events, like background jobs, run between commands sent by python
+_EVENT_LOOP_SCRIPT = b'''
+namespace eval ::tclwrapper::loop {
+    variable command ""
+    variable forever
+}
+proc ::tclwrapper::loop::read { } {
+    variable command
+    fileevent stdin readable { }
+    while { [ gets stdin line ] >= 0 } {
+        append command $line \\n
+        if { [ info complete $command ] } {
+            set script $command
+            set command ""
+            catch { uplevel #0 $script }
+            break
+        }
+    }
+    if { [ eof stdin ] } {
+        exit
+    }
+    fileevent stdin readable ::tclwrapper::loop::read
+}
+fconfigure stdin -blocking 0
+fileevent stdin readable ::tclwrapper::loop::read
+vwait ::tclwrapper::loop::forever
+'''
+
+# bytes before the payload area of the bulk channel file, python writes the total bytes it has consumed there
+_BULK_HEADER = 16
+
+# tcl side of the bulk channel: payload is written at the cursor, or at the start of the payload area
+# if it doesn't fit before the end, unless bytes not consumed by python yet would be overwritten
+_BULK_SCRIPT = '''
+namespace eval ::tclwrapper::bulk {
+    variable channel [ open %s r+ ]
+    variable size %d
+    variable cursor 0
+    variable written 0
+    fconfigure $channel -translation binary
+}
+proc ::tclwrapper::bulk::put { data } {
+    variable channel
+    variable size
+    variable cursor
+    variable written
+
+    set data [ encoding convertto utf-8 $data ]
+    set length [ string length $data ]
+
+    seek $channel 0
+    binary scan [ read $channel 8 ] w consumed
+    set skipped [ expr { $cursor + $length > $size ? $size - $cursor : 0 } ]
+    if { $written - $consumed + $skipped + $length > $size } {
+        error "bulk channel is full"
+    }
+    if { $skipped } {
+        set cursor 0
+        incr written $skipped
+    }
+
+    set offset [ expr { %d + $cursor } ]
+    seek $channel $offset
+    puts -nonewline $channel $data
+    flush $channel
+
+    incr cursor $length
+    incr written $length
+    return "$offset $length $written"
+}
+'''
+
+class BulkChannel:
+    """Memory-mapped file shared with tcl for bulk payloads.
+
+    tcl writes the payload into the file, and replies only its offset and length
+    through the pipe, python reads it through a memoryview of the memory map.
+
+    The payload area is a ring of size bytes. tcl only overwrites payloads python
+    has consumed, a payload which doesn't fit is replied through the pipe as usual.
+    """
+
+    def __init__(self, size = 16 * 1024 * 1024, directory = None):
+        """Create the file in directory, /dev/shm if it exists, or the temp directory."""
+        if directory is None:
+            directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+        fd, self.path = tempfile.mkstemp(prefix = 'tclwrapper-bulk-', dir = directory)
+        try:
+            os.ftruncate(fd, _BULK_HEADER + size)
+            self._map = mmap.mmap(fd, _BULK_HEADER + size)
+        finally:
+            os.close(fd)
+        self.size = size
+
+    def script(self):
+        """Tcl script defining ::tclwrapper::bulk::put on this file."""
+        return _BULK_SCRIPT % (quote_tclstring(self.path.replace('\\', '/')), self.size, _BULK_HEADER)
+
+    def view(self, offset, length, written):
+        """Read-only zero-copy view of the payload at offset, and mark the payload consumed.
+
+        The view is valid until size more bytes are written to the channel.
+        """
+        struct.pack_into('<q', self._map, 0, written)
+        return memoryview(self._map)[offset:offset + length].toreadonly()
+
+    def close(self):
+        """Close the memory map and remove the file."""
+        try:
+            self._map.close()
+        except BufferError:
+            # views are still used, the map is closed when they are released
+            pass
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
 
 class TCLWrapperException(Exception):
     """Base class for TCLWrapper exceptions."""
@@ -89,9 +244,27 @@ class TCLWrapper:
 
     reserved_variable_name = 'reservedtcloutputvar'
 
-    def __init__(self, tcl_exe = 'tclsh', *tcl_exe_args):
-        """Creates a TCLWrapper for the specified tcl executable."""
+    def __init__(self, tcl_exe = 'tclsh', *tcl_exe_args, threadsafe = False, trace = None):
+        """Creates a TCLWrapper for the specified tcl executable.
+
+        If threadsafe is set to true, a dispatcher thread reads the replies,
+        so eval and submit can be called from many threads sharing one tcl process.
+
+        If trace is set to a TraceRecorder, every command, its reply or error
+        and timing are recorded.
+
+        If tcl_timing is set to true, the execution time of each command is measured
+        inside tcl by clock microseconds, and saved in last_tcl_time.
+        """
         self._process = None
+        self._dispatcher = None
+        self.threadsafe = threadsafe
+        self.trace = trace
+        self.tcl_timing = False
+        self.bulk = None
+        self.bulk_threshold = None
+        self.event_loop = False
+        self._local = threading.local()
         self.last_stderr = None
         self.tcl_exe = tcl_exe
         self.tcl_exe_args = tcl_exe_args
@@ -110,6 +283,7 @@ class TCLWrapper:
             stdin = subprocess.PIPE,
             stdout = self._tempfile_in,
             stderr = subprocess.PIPE)
+
         # DON'T NEED IN WINDOWS PLATFORM
         # set stdout and stderr nonblocking to avoid possible deadlock
         # def set_as_nonblocking(fd):
@@ -119,18 +293,40 @@ class TCLWrapper:
         # set_as_nonblocking(self._process.stdout)
         # set_as_nonblocking(self._process.stderr)
 
+        if self.threadsafe:
+            self._pending = queue.Queue()
+            self._write_lock = threading.Lock()
+            self._dispatcher = threading.Thread(target = self._dispatch, name = 'TCLWrapperDispatcher', daemon = True)
+            self._dispatcher.start()
+
     def stop(self):
         """Stop the tcl background process."""
         if not self._process:
             raise ('no tcl instance running.')
         
+        # stop dispatcher, requests not answered yet are failed
+        dispatcher = self._dispatcher
+        if dispatcher is not None:
+            with self._write_lock:
+                self._dispatcher = None
+                self._pending.put(None)
+
         # calling exit from eval would cause an exception,
         # so just write it to stdin directly
         self._process.stdin.write(b'exit\n')
         self._process.kill()
+
+        if dispatcher is not None:
+            dispatcher.join()
+            self._fail_pending(TCLWrapperInstanceError('tcl instance stopped.'))
+
         del self._process
         self._process = None
 
+        if self.bulk is not None:
+            self.bulk.close()
+            self.bulk = None
+
         # close file to let popen write stdout in
         if self._tempfile_in != None:
             self._tempfile_in.close()
@@ -160,20 +356,159 @@ class TCLWrapper:
         If the to_list argument is set to true, eval parses tcl lists and
         returns them as python lists of strings instead of a single string.
         For more complex output parsing, see the functions defined in tclutil.
+
+        In threadsafe mode, eval may be called from many threads at the same
+        time, the command is handed to the dispatcher and eval waits for its
+        own reply.
+        """
+
+        stdout = self._eval(command, self.bulk_threshold, False)
+
+        if to_list:
+            stdout = tclstring_to_list(stdout)
+        return stdout
+
+    def _eval(self, command, threshold, raw):
+        """Execute command, output longer than threshold is read from the bulk channel, as memoryview if raw."""
+
+        if not self._process:
+            raise TCLWrapperInstanceError('no tcl instance running.')
+
+        if self.threadsafe:
+            future = self._submit(command, threshold, raw)
+            stdout = future.result()
+            self._local.tcl_time = getattr(future, 'tcl_time', None)
+        else:
+            start = time.time()
+            begin = time.perf_counter()
+            try:
+                keys = self._gen_keys()
+                self._write(self._frame(command, keys, threshold))
+                stdout, self._local.tcl_time = self._split_timing(keys, self._parse_reply(command, keys, *self._read_reply(command, keys)))
+                stdout = self._split_bulk(keys, stdout, raw)
+            except TCLWrapperError as e:
+                if self.trace is not None:
+                    self.trace.record(command, start, time.perf_counter() - begin, error = e.error_message)
+                raise e
+            if self.trace is not None:
+                self.trace.record(command, start, time.perf_counter() - begin, reply = _to_str(stdout))
+
+        return stdout
+
+    def submit(self, command):
+        """Send a command to tcl without waiting for its reply.
+
+        In threadsafe mode the command is written to tcl right away, so
+        commands submitted back to back are pipelined, and the dispatcher
+        resolves the returned future when the reply arrives.
+        Otherwise the command is run synchronously and a resolved future is returned.
+
+        Returns:
+            concurrent.futures.Future: future of the output string
         """
 
+        return self._submit(command, self.bulk_threshold, False)
+
+    def _submit(self, command, threshold, raw):
+        """Send command, output longer than threshold is read from the bulk channel, as memoryview if raw."""
+
         if not self._process:
             raise TCLWrapperInstanceError('no tcl instance running.')
 
-        # unique strings for identifying where output from commands start and finish
-        key_string_length = 16
-        def gen_unique_string(length = key_string_length):
-            return ''.join([ random.choice(string.ascii_letters + string.digits) for x in range(length) ]).encode('ascii')
-        stdout_start_key = gen_unique_string()
-        stdout_done_key = gen_unique_string()
-        stderr_start_key = gen_unique_string()
-        stderr_delimiter_key = gen_unique_string()
-        stderr_done_key = gen_unique_string()
+        future = Future()
+
+        if not self.threadsafe:
+            try:
+                future.set_result(self._eval(command, threshold, raw))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        keys = self._gen_keys()
+        frame = self._frame(command, keys, threshold)
+
+        if self.trace is not None:
+            self._trace_future(command, future)
+
+        # queue order must be the same as the write order,
+        # the lock only covers writing, not waiting for the reply
+        with self._write_lock:
+            if self._dispatcher is None:
+                raise TCLWrapperInstanceError('no tcl instance running.')
+            self._pending.put((future, command, keys, raw))
+            self._write(frame)
+
+        return future
+
+    def _write(self, frame):
+        """Write a framed command to tcl, a closed pipe means tcl is gone."""
+        try:
+            self._process.stdin.write(frame)
+            self._process.stdin.flush()
+        except OSError as e:
+            raise TCLWrapperInstanceError('tcl process exited: %s' % e)
+
+    def _trace_future(self, command, future):
+        """Record command when its future is resolved."""
+        start = time.time()
+        begin = time.perf_counter()
+
+        def record(future):
+            error = future.exception()
+            if error is None:
+                self.trace.record(command, start, time.perf_counter() - begin, reply = _to_str(future.result()))
+            elif isinstance(error, TCLWrapperError):
+                self.trace.record(command, start, time.perf_counter() - begin, error = error.error_message)
+
+        future.add_done_callback(record)
+
+    def _dispatch(self):
+        """Dispatcher loop, read replies in order and route them to the waiting futures."""
+
+        while True:
+            request = self._pending.get()
+            if request is None:
+                break
+
+            future, command, keys, raw = request
+            try:
+                stdout, future.tcl_time = self._split_timing(keys, self._parse_reply(command, keys, *self._read_reply(command, keys)))
+                stdout = self._split_bulk(keys, stdout, raw)
+                future.set_result(stdout)
+            except TCLWrapperInstanceError as e:
+                # tcl is gone, nothing will answer the pending requests
+                future.set_exception(e)
+                self._fail_pending(e)
+                break
+            except Exception as e:
+                future.set_exception(e)
+
+    def _fail_pending(self, error):
+        """Fail all requests waiting for the dispatcher."""
+        while True:
+            try:
+                request = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request[0].set_exception(error)
+
+    def _gen_keys(self):
+        """Generate unique strings for identifying where output from commands start and finish.
+
+        Returns:
+            tuple: stdout_start_key, stdout_done_key, stderr_start_key, stderr_delimiter_key, stderr_done_key
+        """
+        return tuple(secrets.token_hex(8).encode('ascii') for i in range(5))
+
+    def _frame(self, command, keys, threshold = None):
+        """Wrap command with the keys, return the bytes to write to tcl stdin.
+
+        If the bulk channel is opened and threshold is set, output longer than threshold
+        characters is written to the bulk channel.
+        """
+
+        stdout_start_key, stdout_done_key, stderr_start_key, stderr_delimiter_key, stderr_done_key = keys
 
         main_tcl_code = '\n'.join(['if { [ catch {',
                 command,
@@ -185,16 +520,126 @@ class TCLWrapper:
                 '    puts -nonewline stdout $' + TCLWrapper.reserved_variable_name,
                 '}\n'])
 
-        self._process.stdin.write(b'puts -nonewline stdout "' + stdout_start_key + b'"\n')
-        self._process.stdin.write(b'puts -nonewline stderr "' + stderr_start_key + b'"\n')
-        self._process.stdin.write(bytearray(main_tcl_code, 'utf-8'))
-        self._process.stdin.write(b'puts -nonewline stdout "' + stdout_done_key + b'"\n')
-        self._process.stdin.write(b'puts -nonewline stderr "' + stderr_done_key + b'"\n')
-        self._process.stdin.write(b'flush stdout\nflush stderr\n')
-        self._process.stdin.flush()
+        if self.bulk is not None and threshold is not None:
+            # large output is written to the bulk channel, stdout only carries the marker, offset, length and total written,
+            # if the channel is full, it's written to stdout
+            name = TCLWrapper.reserved_variable_name
+            main_tcl_code = main_tcl_code.replace(
+                '    puts -nonewline stdout $' + name,
+                '    if { [ string length $%s ] > %d && ![ catch { ::tclwrapper::bulk::put $%s } %s_bulk ] } {\n' % (name, threshold, name, name) +
+                '        puts -nonewline stdout %s$%s_bulk\n' % (stderr_start_key.decode('ascii'), name) +
+                '    } else {\n'
+                '        puts -nonewline stdout $' + name + '\n'
+                '    }')
+
+        if self.tcl_timing:
+            # execution time is appended to stdout after the delimiter key
+            main_tcl_code = ''.join(['set %s_t0 [ clock microseconds ]\n' % TCLWrapper.reserved_variable_name,
+                main_tcl_code,
+                'puts -nonewline stdout %s[ expr { [ clock microseconds ] - $%s_t0 } ]\n' % (stderr_delimiter_key.decode('ascii'), TCLWrapper.reserved_variable_name)])
+
+        return b''.join([
+            b'puts -nonewline stdout "' + stdout_start_key + b'"\n',
+            b'puts -nonewline stderr "' + stderr_start_key + b'"\n',
+            bytearray(main_tcl_code, 'utf-8'),
+            b'puts -nonewline stdout "' + stdout_done_key + b'"\n',
+            b'puts -nonewline stderr "' + stderr_done_key + b'"\n',
+            b'flush stdout\nflush stderr\n'])
+
+    def _split_timing(self, keys, stdout):
+        """Split the execution time appended by a timing frame from the output string.
+
+        Returns:
+            tuple: output string, seconds or None if the command is not timed
+        """
+        delimiter = keys[3].decode('ascii')
+        if delimiter not in stdout:
+            return stdout, None
+
+        stdout, microseconds = stdout.rsplit(delimiter, 1)
+        return stdout, int(microseconds) / 1000000.0
+
+    def _split_bulk(self, keys, stdout, raw = False):
+        """Read the output from the bulk channel if the reply carries its offset and length.
+
+        Returns:
+            str, or memoryview of utf-8 bytes if raw is true
+        """
+        marker = keys[2].decode('ascii')
+        if self.bulk is None or not stdout.startswith(marker):
+            return memoryview(stdout.encode('utf-8')) if raw else stdout
+
+        offset, length, written = stdout[len(marker):].split()
+        view = self.bulk.view(int(offset), int(length), int(written))
+        if raw:
+            return view
+        try:
+            return str(view, 'utf-8')
+        finally:
+            view.release()
+
+    def open_bulk(self, size = 16 * 1024 * 1024, threshold = 65536, directory = None):
+        """Open the bulk channel, a memory-mapped file shared with tcl, in /dev/shm if it exists.
+
+        Output longer than threshold characters is written to the file instead of stdout,
+        set threshold to None to use the channel by eval_bulk only.
+        """
+        if self.bulk is not None:
+            raise TCLWrapperInstanceError('bulk channel already opened.')
+
+        bulk = BulkChannel(size, directory)
+        try:
+            self.eval(bulk.script())
+        except Exception as e:
+            bulk.close()
+            raise e
+        self.bulk = bulk
+        self.bulk_threshold = threshold
+
+    def start_event_loop(self):
+        """Run the tcl event loop, commands are read from stdin by a file event handler.
+
+        after and file event scripts run between commands, so long work split by
+        after, vwait or coroutines doesn't block the commands sent meanwhile.
+        """
+        if not self._process:
+            raise TCLWrapperInstanceError('no tcl instance running.')
+        if self.event_loop:
+            return
+
+        # not framed, vwait never returns, the commands written after it are read by the handler
+        if self.threadsafe:
+            with self._write_lock:
+                self._write(_EVENT_LOOP_SCRIPT)
+        else:
+            self._write(_EVENT_LOOP_SCRIPT)
+        self.event_loop = True
+
+    def eval_bulk(self, command):
+        """Execute command in tcl and return its output as a memoryview of utf-8 bytes.
+
+        With the bulk channel, the view is not copied out of the memory map,
+        it's valid until bulk.size more bytes are written to the channel.
+        """
+        return self._eval(command, -1, True)
+
+    @property
+    def last_tcl_time(self):
+        """Execution time in tcl of the last command eval-ed by this thread, None if it's not timed."""
+        return getattr(self._local, 'tcl_time', None)
 
-        stdout = b''
-        stderr = b''
+    def _read_reply(self, command, keys):
+        """Read stdout and stderr of one command until the done keys.
+
+        Returns:
+            tuple: stdout bytes, stderr bytes
+        """
+
+        stdout_start_key, stdout_done_key, stderr_start_key, stderr_delimiter_key, stderr_done_key = keys
+
+        # bytearray, appending to bytes one byte at a time is quadratic for large replies
+        stdout = bytearray()
+        stderr = bytearray()
 
         fetching_stdout = True
         fetching_stderr = True
@@ -226,6 +671,13 @@ class TCLWrapper:
             print('stderr = ' + repr(stderr.decode('utf-8')))
             raise e
 
+        return bytes(stdout), bytes(stderr)
+
+    def _parse_reply(self, command, keys, stdout, stderr):
+        """Strip the keys from the reply, return the output string or raise the tcl error."""
+
+        stdout_start_key, stdout_done_key, stderr_start_key, stderr_delimiter_key, stderr_done_key = keys
+
         # remove start keys and done keys
         stdout_start_key_loc = stdout.find(stdout_start_key)
         stderr_start_key_loc = stderr.find(stderr_start_key)
@@ -250,8 +702,4 @@ class TCLWrapper:
             if stderr:
                 warnings.warn('tcl command "%s" generated stderr message %s' % (command, repr(stderr)), stacklevel = 2)
         self.last_stderr = stderr
-        if to_list:
-            stdout = tclstring_to_list(stdout)
         return stdout
-
-
@@ -0,0 +1,346 @@
+'''
+In-memory time series of polled counters
+'''
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NoReturn, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value) -> float:
+    """convert counter value to float, nan if it's not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class Series:
+    """ring buffer of (timestamp, value) samples of one counter
+
+    buffers are allocated once with capacity samples, when it's full the oldest sample is overwritten.
+    if numpy is installed, buffers are float64 arrays and queries are vectorized, otherwise lists
+    """
+
+    __slots__ = ('capacity', 'count', '_times', '_values')
+
+    def __init__(self, capacity:int) -> NoReturn:
+        """init function
+
+        Args:
+            capacity (int): max samples kept
+        """
+        assert type(capacity) == int and capacity > 1, 'capacity should be int type and greater than 1'
+
+        self.capacity = capacity
+        # samples written since created, position of the next sample is count % capacity
+        self.count = 0
+
+        if np != None:
+            self._times = np.full(capacity, np.nan)
+            self._values = np.full(capacity, np.nan)
+        else:
+            self._times = [ math.nan ] * capacity
+            self._values = [ math.nan ] * capacity
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        """bytes of buffers"""
+        return self._times.nbytes + self._values.nbytes if np != None else 16 * self.capacity
+
+    def append(self, timestamp:float, value:float) -> NoReturn:
+        """add sample, timestamps should not go backwards
+
+        Args:
+            timestamp (float): seconds since epoch
+            value (float): counter value
+        """
+        if self.count > 0:
+            assert timestamp >= self._times[(self.count - 1) % self.capacity], 'timestamp should not be earlier than the last sample'
+
+        position = self.count % self.capacity
+        self._times[position] = timestamp
+        self._values[position] = value
+        self.count = self.count + 1
+
+    def samples(self, start:Optional[float]=None, end:Optional[float]=None, last:Optional[float]=None) -> tuple:
+        """samples in time order, within [start, end]
+
+        Args:
+            start (float, optional): seconds since epoch. Defaults to None, from the oldest sample
+            end (float, optional): seconds since epoch. Defaults to None, to the newest sample
+            last (float, optional): seconds before the newest sample, instead of start. Defaults to None
+
+        Returns:
+            tuple: (timestamps, values)
+        """
+        size = len(self)
+        if self.count <= self.capacity:
+            times, values = self._times[:size], self._values[:size]
+        else:
+            position = self.count % self.capacity
+            if np != None:
+                times = np.concatenate((self._times[position:], self._times[:position]))
+                values = np.concatenate((self._values[position:], self._values[:position]))
+            else:
+                times = self._times[position:] + self._times[:position]
+                values = self._values[position:] + self._values[:position]
+
+        if size == 0:
+            return times, values
+
+        if last != None:
+            start = times[-1] - last
+
+        if np != None:
+            begin = 0 if start == None else int(np.searchsorted(times, start, side='left'))
+            stop = size if end == None else int(np.searchsorted(times, end, side='right'))
+        else:
+            begin = 0 if start == None else next((i for i, t in enumerate(times) if t >= start), size)
+            stop = size if end == None else next((i for i, t in enumerate(times) if t > end), size)
+
+        return times[begin:stop], values[begin:stop]
+
+
+class TimeSeriesStore:
+    """time series of counters polled from the session, by (handle, counter)
+
+    every series is a ring buffer of capacity samples, allocated when the counter is first seen,
+    and at most max_series series are kept, the least recently updated one is dropped, so memory is bounded
+    by capacity * max_series * 16 bytes however long it runs.
+
+    queries take a window: start and end in seconds since epoch, or last seconds before the newest sample
+
+    Example:
+        store = api.enable_timeseries(capacity=86400)
+        api.stc_sample(['generatorportresults1', 'generatorportresults2'], ['TotalFrameCount', 'TotalFrameRate'])
+        ...
+        store.rate('generatorportresults1', 'TotalFrameCount', last=60)
+        store.percentile('generatorportresults1', 'TotalFrameRate', 99)
+    """
+
+    def __init__(self, capacity:int=3600, max_series:Optional[int]=None) -> NoReturn:
+        """init function
+
+        Args:
+            capacity (int, optional): samples kept per series. Defaults to 3600
+            max_series (int, optional): series kept. Defaults to None, no limit
+        """
+        assert type(capacity) == int and capacity > 1, 'capacity should be int type and greater than 1'
+        assert max_series == None or (type(max_series) == int and max_series > 0), 'max_series should be None or positive int'
+
+        self.capacity = capacity
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, key:tuple) -> bool:
+        return key in self._series
+
+    def keys(self) -> list:
+        """(handle, counter) of series"""
+        with self._lock:
+            return list(self._series.keys())
+
+    @property
+    def nbytes(self) -> int:
+        """bytes of all buffers"""
+        with self._lock:
+            return sum([ series.nbytes for series in self._series.values() ])
+
+    def clear(self) -> NoReturn:
+        """drop all series"""
+        with self._lock:
+            self._series.clear()
+
+    def _append(self, handle:str, counter:str, value, timestamp:float) -> NoReturn:
+        """add sample, lock is held"""
+        key = (handle, counter)
+        series = self._series.get(key)
+        if series == None:
+            series = self._series[key] = Series(self.capacity)
+            if self.max_series != None and len(self._series) > self.max_series:
+                dropped, _ = self._series.popitem(last=False)
+                logger.debug('drop series %s %s' % dropped)
+        else:
+            self._series.move_to_end(key)
+
+        series.append(timestamp, _to_float(value))
+
+    def add(self, handle:str, counter:str, value:Union[str, float], timestamp:Optional[float]=None) -> NoReturn:
+        """add sample of one counter
+
+        Args:
+            handle (str): handle, port or stream
+            counter (str): counter name
+            value (str or float): value, nan if it's not a number
+            timestamp (float, optional): seconds since epoch. Defaults to None, now
+        """
+        timestamp = timestamp if timestamp != None else time.time_ns() / 1e9
+        with self._lock:
+            self._append(handle, counter, value, timestamp)
+
+    def add_many(self, handle:str, values:dict, timestamp:Optional[float]=None) -> NoReturn:
+        """add samples of counters of one handle, for example, dotdict returned by stc_get
+
+        Args:
+            handle (str): handle
+            values (dict): counter -> value
+            timestamp (float, optional): seconds since epoch. Defaults to None, now
+        """
+        timestamp = timestamp if timestamp != None else time.time_ns() / 1e9
+        with self._lock:
+            for counter, value in values.items():
+                self._append(handle, counter, value, timestamp)
+
+    def add_table(self, table) -> NoReturn:
+        """add rows of StatsTable, handle is stream, or port for port counters, counter is direction.counter
+
+        Args:
+            table (StatsTable): statistics polled by StatsPoller
+        """
+        with self._lock:
+            for port, stream, direction, counter, value in zip(table.port, table.stream, table.direction, table.counter, table.value):
+                self._append(stream or port, '%s.%s' % (direction, counter) if direction else counter, value, table.timestamp)
+
+    def series(self, handle:str, counter:str, start:Optional[float]=None, end:Optional[float]=None, last:Optional[float]=None) -> tuple:
+        """samples of counter in window
+
+        Args:
+            handle (str): handle
+            counter (str): counter name
+            start (float, optional): seconds since epoch. Defaults to None, from the oldest sample
+            end (float, optional): seconds since epoch. Defaults to None, to the newest sample
+            last (float, optional): seconds before the newest sample, instead of start. Defaults to None
+
+        Raises:
+            KeyError: if counter of handle is never added, raise KeyError
+
+        Returns:
+            tuple: (timestamps, values), in time order
+        """
+        with self._lock:
+            series = self._series[(handle, counter)]
+            times, values = series.samples(start, end, last)
+            # copy, so the result doesn't change when samples are added later
+            return (times.copy(), values.copy()) if np != None else (list(times), list(values))
+
+    def delta(self, handle:str, counter:str, **window) -> float:
+        """change of counter in window, nan if less than 2 samples
+
+        Args:
+            handle (str): handle
+            counter (str): counter name
+            window (optional): start, end or last, see series
+
+        Returns:
+            float: newest value - oldest value
+        """
+        times, values = self.series(handle, counter, **window)
+        return values[-1] - values[0] if len(values) > 1 else math.nan
+
+    def rate(self, handle:str, counter:str, **window) -> float:
+        """average per second rate of counter in window, nan if less than 2 samples
+
+        Args:
+            handle (str): handle
+            counter (str): counter name
+            window (optional): start, end or last, see series
+
+        Returns:
+            float: delta / seconds
+        """
+        times, values = self.series(handle, counter, **window)
+        if len(values) < 2 or times[-1] == times[0]:
+            return math.nan
+        return (values[-1] - values[0]) / (times[-1] - times[0])
+
+    def rates(self, handle:str, counter:str, **window) -> tuple:
+        """per second rate of counter between each two samples in window
+
+        a counter cleared in window has a negative rate at the sample it's cleared
+
+        Args:
+            handle (str): handle
+            counter (str): counter name
+            window (optional): start, end or last, see series
+
+        Returns:
+            tuple: (timestamps of the later samples, rates)
+        """
+        times, values = self.series(handle, counter, **window)
+        if np != None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return times[1:], np.diff(values) / np.diff(times)
+
+        rates = [ (values[i] - values[i - 1]) / (times[i] - times[i - 1]) if times[i] != times[i - 1] else math.nan for i in range(1, len(values)) ]
+        return times[1:], rates
+
+    def min(self, handle:str, counter:str, **window) -> float:
+        """min value of counter in window, nan values are ignored, nan if no sample"""
+        values = self._numbers(handle, counter, window)
+        if len(values) == 0:
+            return math.nan
+        return float(values.min()) if np != None else min(values)
+
+    def max(self, handle:str, counter:str, **window) -> float:
+        """max value of counter in window, nan values are ignored, nan if no sample"""
+        values = self._numbers(handle, counter, window)
+        if len(values) == 0:
+            return math.nan
+        return float(values.max()) if np != None else max(values)
+
+    def mean(self, handle:str, counter:str, **window) -> float:
+        """mean value of counter in window, nan values are ignored, nan if no sample"""
+        values = self._numbers(handle, counter, window)
+        if len(values) == 0:
+            return math.nan
+        return float(values.mean()) if np != None else sum(values) / len(values)
+
+    def percentile(self, handle:str, counter:str, q:float, **window) -> float:
+        """percentile of counter values in window, linear interpolation like numpy, nan values are ignored
+
+        Args:
+            handle (str): handle
+            counter (str): counter name
+            q (float): percentile, 0 - 100
+            window (optional): start, end or last, see series
+
+        Returns:
+            float: percentile, nan if no sample
+        """
+        assert 0 <= q <= 100, 'q should be between 0 and 100'
+
+        values = self._numbers(handle, counter, window)
+        if len(values) == 0:
+            return math.nan
+        if np != None:
+            return float(np.percentile(values, q))
+
+        values = sorted(values)
+        position = (len(values) - 1) * q / 100
+        low = int(position)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (position - low)
+
+    def _numbers(self, handle:str, counter:str, window:dict):
+        """values in window, without nan"""
+        times, values = self.series(handle, counter, **window)
+        if np != None:
+            return values[~np.isnan(values)]
+        return [ value for value in values if not math.isnan(value) ]
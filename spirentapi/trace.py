@@ -0,0 +1,190 @@
+'''
+Session trace capture and offline replay
+'''
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, NoReturn, Optional
+
+from .tclwrapper import TCLWrapperError, TCLWrapperInstanceError, tclstring_to_list
+
+logger = logging.getLogger(__name__)
+
+
+def read_trace(path:str) -> Iterator[dict]:
+    """read records from trace file
+
+    every record is a dict:
+        c: command
+        r: reply, if command succeeded
+        e: error message, if command failed
+        t: start time, seconds since epoch
+        d: duration in seconds
+
+    Args:
+        path (str): trace file path
+
+    Returns:
+        Iterator[dict]: records in the order they are recorded
+    """
+    assert type(path) == str, 'path should be str type'
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line != '':
+                yield json.loads(line)
+
+
+class TraceRecorder:
+    """record every command sent to tclsh, its reply or error and timing to an append-only trace file
+
+    one record per line, so a trace can be appended by many sessions and read while it's written
+
+    Example:
+        api = SpirentAPI(trace='session.trace')
+    """
+
+    def __init__(self, path:str) -> NoReturn:
+        """init function
+
+        Args:
+            path (str): trace file path, records are appended to it
+        """
+        assert type(path) == str, 'path should be str type'
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, command:str, start:float, duration:float, reply:Optional[str]=None, error:Optional[str]=None) -> NoReturn:
+        """append a record
+
+        Args:
+            command (str): command sent to tclsh
+            start (float): start time, seconds since epoch
+            duration (float): duration in seconds
+            reply (str, optional): reply of command
+            error (str, optional): error message if command failed
+        """
+        record = { 'c': command, 't': round(start, 6), 'd': round(duration, 6) }
+        if error != None:
+            record['e'] = error
+        else:
+            record['r'] = reply
+
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+        with self._lock:
+            if self._file != None:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self) -> NoReturn:
+        """close trace file
+        """
+        with self._lock:
+            if self._file != None:
+                self._file.close()
+                self._file = None
+
+
+class TraceReplayer:
+    """serve the replies recorded in a trace file, instead of running a tclsh
+
+    it has the same eval/submit interface as TCLWrapper, so it can be used as SpirentAPI backend:
+
+        api = SpirentAPI(tclsh=TraceReplayer('session.trace'))
+
+    replies of the same command are served in the order they are recorded
+    """
+
+    def __init__(self, path:str, timing:bool=False) -> NoReturn:
+        """init function
+
+        Args:
+            path (str): trace file path
+            timing (bool, optional): if True, wait the recorded duration before replying. Defaults to False
+        """
+        assert type(path) == str, 'path should be str type'
+
+        self.path = path
+        self.timing = timing
+        self.threadsafe = False
+        self.last_stderr = None
+        self._replies = None
+        self._lock = threading.Lock()
+
+    def start(self) -> NoReturn:
+        """load trace file
+        """
+        if self._replies != None:
+            raise TCLWrapperInstanceError('trace already loaded.')
+
+        self._replies = { }
+        for record in read_trace(self.path):
+            self._replies.setdefault(record['c'], deque()).append(record)
+
+        logger.info('%d commands loaded from %s' % (sum([ len(v) for v in self._replies.values() ]), self.path))
+
+    def stop(self) -> NoReturn:
+        """release loaded trace
+        """
+        if self._replies == None:
+            raise TCLWrapperInstanceError('no trace loaded.')
+
+        self._replies = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def eval(self, command:str, to_list:bool=False):
+        """reply command with the recorded reply
+
+        Raises:
+            TCLWrapperError: if command failed when it's recorded
+            TCLWrapperInstanceError: if command is not in the trace, or all its replies are served
+
+        Returns:
+            str or tuple: recorded reply
+        """
+        if self._replies == None:
+            raise TCLWrapperInstanceError('no trace loaded.')
+
+        with self._lock:
+            records = self._replies.get(command)
+            if not records:
+                raise TCLWrapperInstanceError('command not found in trace: %s' % command)
+            record = records.popleft()
+
+        if self.timing:
+            time.sleep(record['d'])
+
+        if 'e' in record:
+            raise TCLWrapperError(command, record['e'])
+
+        self.last_stderr = ''
+        stdout = record['r']
+        if to_list:
+            stdout = tclstring_to_list(stdout)
+        return stdout
+
+    def submit(self, command:str) -> Future:
+        """reply command with a resolved future
+
+        Returns:
+            concurrent.futures.Future: future of recorded reply
+        """
+        future = Future()
+        try:
+            future.set_result(self.eval(command))
+        except Exception as e:
+            future.set_exception(e)
+        return future
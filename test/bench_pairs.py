@@ -0,0 +1,45 @@
+'''
+benchmark resolve_pairs against the regular expression parse of stc::get replies it replaced
+
+python test/bench_pairs.py
+'''
+import re
+import timeit
+
+from spirentapi.apiwrapper import resolve_pairs
+
+# parse before 1.4.7, values with nested braces are not matched
+pair_re = re.compile(r'\s?-([\w\d\-\.]+)\s((\{[^{}]+\})|([\S]+))\s?')
+
+def regex_pairs(data:str) -> dict:
+    ret = { }
+    for key, val, _, _ in pair_re.findall(data):
+        if val.startswith('{') and val.endswith('}'):
+            val = val[1:-1].strip()
+        ret[key] = val
+    return ret
+
+def replies() -> dict:
+    return {
+        'stc::get, 100 attributes': ' '.join([ '-Attr%d {value %d}' % (i, i) for i in range(100) ]),
+        'stc::get, 10k attributes': ' '.join([ '-Attr%d {value %d}' % (i, i) for i in range(10000) ]),
+        'plain values, 10k': ' '.join([ '-Attr%d %d' % (i, i) for i in range(10000) ]),
+        'empty values, 10k': ' '.join([ '-Attr%d {}' % i for i in range(10000) ]),
+    }
+
+def main():
+    print('%-28s %12s %12s' % ('reply', 'regex', 'resolve'))
+    for name, reply in replies().items():
+
+        number = 10
+        theirs = timeit.timeit(lambda: regex_pairs(reply), number=number) / number * 1000
+        ours = timeit.timeit(lambda: resolve_pairs(reply), number=number) / number * 1000
+
+        # same result where the regex parse is correct
+        if 'empty' not in name:
+            assert regex_pairs(reply) == dict(resolve_pairs(reply)), name
+
+        print('%-28s %10.2fms %10.2fms' % (name, theirs, ours))
+
+if __name__ == '__main__':
+    main()
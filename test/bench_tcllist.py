@@ -0,0 +1,38 @@
+'''
+benchmark parse_list against tkinter splitlist
+
+python test/bench_tcllist.py
+'''
+import timeit
+
+from spirentapi.tcllist import parse_list
+
+def replies() -> dict:
+    return {
+        'plain, 100k words': ' '.join([ 'port%d' % i for i in range(100000) ]),
+        'stc::get, 10k attributes': ' '.join([ '-Attr%d {value %d}' % (i, i) for i in range(10000) ]),
+        'nested, 10k elements': ' '.join([ '{a%d {b "c d" {e\\ f}}}' % i for i in range(10000) ]),
+        'escaped, 10k elements': ' '.join([ '"x\\ty\\u00e9 %d"' % i for i in range(10000) ]),
+    }
+
+def main():
+    try:
+        import tkinter
+        splitlist = tkinter.Tcl().splitlist
+    except Exception:
+        splitlist = None
+
+    print('%-28s %12s %12s' % ('reply', 'parse_list', 'splitlist'))
+    for name, reply in replies().items():
+
+        number = 10
+        ours = timeit.timeit(lambda: parse_list(reply), number=number) / number * 1000
+        theirs = timeit.timeit(lambda: splitlist(reply), number=number) / number * 1000 if splitlist != None else float('nan')
+
+        if splitlist != None:
+            assert parse_list(reply) == tuple(splitlist(reply)), name
+
+        print('%-28s %10.2fms %10.2fms' % (name, ours, theirs))
+
+if __name__ == '__main__':
+    main()
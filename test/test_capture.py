@@ -0,0 +1,64 @@
+import struct
+import pytest
+from spirentapi import PcapFile
+
+def udp_frame(src_ip, dst_ip, src_port, dst_port, vlan=None):
+    ethernet = b'\x00\x10\x94\x00\x00\x02' + b'\x00\x10\x94\x00\x00\x01'
+    if vlan != None:
+        ethernet = ethernet + struct.pack('!HH', 0x8100, vlan)
+    ethernet = ethernet + struct.pack('!H', 0x0800)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 28, 0, 0, 64, 17, 0, bytes(map(int, src_ip.split('.'))), bytes(map(int, dst_ip.split('.'))))
+    udp = struct.pack('!HHHH', src_port, dst_port, 8, 0)
+    return ethernet + ip + udp
+
+def write_pcap(path, frames):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+        for i, frame in enumerate(frames):
+            f.write(struct.pack('<IIII', 100 + i, 500000, len(frame), len(frame)))
+            f.write(frame)
+
+def test_index(tmp_path):
+    path = str(tmp_path / 'port1.pcap')
+    write_pcap(path, [ udp_frame('10.0.0.1', '10.0.0.2', 1024, 4789), udp_frame('10.0.0.2', '10.0.0.1', 4789, 1024, vlan=100) ])
+
+    with PcapFile(path) as pcap:
+        assert len(pcap) == 2
+        assert list(pcap.index['vlan']) == [-1, 100]
+        assert list(pcap.index['proto']) == [17, 17]
+        assert pcap.select(dst_ip='10.0.0.1') == [1]
+        assert pcap[0].timestamp == 100.5
+
+        frame, = pcap.frames(src_port=1024)
+        assert frame.number == 0
+        assert len(frame.data) == frame.caplen
+
+def test_stream_without_index(tmp_path):
+    path = str(tmp_path / 'port1.pcap')
+    write_pcap(path, [ udp_frame('10.0.0.1', '10.0.0.2', 1024, 4789) ] * 3)
+
+    pcap = PcapFile(path)
+    assert [ frame.number for frame in pcap.frames(start=101, dst_port=4789) ] == [1, 2]
+    assert pcap._index == None
+    pcap.close()
+
+def test_index_growing(tmp_path):
+    np = pytest.importorskip('numpy')
+
+    path = str(tmp_path / 'port1.pcap')
+    write_pcap(path, [ udp_frame('10.0.0.1', '10.0.0.%d' % i, 1024, i) for i in range(100) ])
+
+    with PcapFile(path) as pcap:
+        # arrays grow past the estimated capacity, rows are copied in chunks
+        index, count = pcap._build_arrays(chunk=7)
+        assert count == 100
+        assert list(index['dst_port']) == list(range(100))
+        assert index['timestamp'].dtype == np.float64
+        assert all([ list(index[name]) == list(pcap.index[name]) for name in index ])
+
+def test_not_pcap(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    open(path, 'w').write('not a capture file, just some text')
+
+    with pytest.raises(ValueError):
+        PcapFile(path)
@@ -0,0 +1,99 @@
+import shutil
+import pytest
+from spirentapi import SpirentAPI, ConfigCache, ResultView
+
+pytestmark = pytest.mark.skipif(shutil.which('tclsh') == None, reason='tclsh is not installed')
+
+@pytest.fixture
+def api():
+    api = SpirentAPI(emulator=True)
+    yield api
+    api.close()
+
+@pytest.fixture
+def xml(api, tmp_path):
+    project = api.stc_create('Project')
+    api.stc_create('Port', under=project, Name='port')
+    path = str(tmp_path / 'topology.xml')
+    api.stc_perform('SaveAsXml', config=project, FileName=path)
+    return path
+
+def test_load(api, xml):
+    cache = ConfigCache(api=api)
+
+    assert cache.load(xml) == True
+    assert cache.loaded != None
+
+    # same content is already loaded
+    assert cache.load(xml) == False
+
+    cache.invalidate()
+    assert cache.loaded == None
+    assert cache.load(xml) == True
+
+def test_load_after_change(api, xml):
+    cache = ConfigCache(api=api)
+    assert cache.load(xml) == True
+
+    # configuration is changed in place, it's loaded again
+    api.stc_config('port1', Name='changed')
+    assert cache.loaded == None
+    assert cache.load(xml) == True
+    assert api.stc_get('port1', [ 'Name' ]) == 'port'
+
+    # reading and saving don't change it
+    api.stc_get('port1', [ 'Name' ])
+    api.stc_perform('SaveAsXml', config='project1', FileName=xml + '.saved')
+    assert cache.load(xml) == False
+
+def test_load_after_perform(api, xml):
+    cache = ConfigCache(api=api)
+    assert cache.load(xml) == True
+
+    # objects built by perform change the configuration
+    ret = api.stc_perform('DeviceCreate', ParentList='project1', DeviceCount=2)
+    assert len(ret.ReturnList.split()) == 2
+    assert cache.loaded == None
+    assert cache.load(xml) == True
+    assert api.stc_get('project1', [ 'children-EmulatedDevice' ]) == None
+
+    # running traffic and reading results don't change it
+    api.stc_perform('GeneratorStart')
+    api.stc_perform('GetObjectsCommand', ClassName='Port')
+    assert cache.load(xml) == False
+
+def test_result_view(api):
+    cache = ConfigCache(api=api)
+    views = [ ]
+
+    def builder(api):
+        project = api.stc_create('Project')
+        api.stc_create('Port', under=project, Name='port')
+        views.append(ResultView([ 'Port.Name' ], source=project, api=api))
+        views[0].create()
+
+    assert cache.build({ 'view': True }, builder) == True
+
+    # reading pages doesn't change the configuration
+    assert [ row['Port.Name'] for row in views[0] ] == [ 'port' ]
+    assert cache.build({ 'view': True }, builder) == False
+    views[0].close()
+
+def test_build(api, tmp_path):
+    cache = ConfigCache(str(tmp_path / 'cache'), api=api)
+    built = [ ]
+
+    def builder(api):
+        built.append(True)
+        project = api.stc_create('Project')
+        api.stc_create('Port', under=project)
+
+    assert cache.build({ 'ports': 1 }, builder) == True
+    assert cache.build({ 'ports': 1 }, builder) == False
+    assert len(built) == 1
+
+    # restored from image, builder isn't called
+    cache.invalidate()
+    assert cache.build({ 'ports': 1 }, builder) == True
+    assert len(built) == 1
+    assert api.stc_get('project1', [ 'children-port' ]) == 'port1'
@@ -0,0 +1,368 @@
+import shutil
+import time
+import pytest
+from spirentapi import *
+
+pytestmark = pytest.mark.skipif(shutil.which('tclsh') == None, reason='tclsh is not installed')
+
+@pytest.fixture
+def api():
+    api = SpirentAPI(emulator=True)
+    yield api
+    api.close()
+
+def test_stc(api):
+    project = api.stc_create('Project')
+    assert project == 'project1'
+
+    port = api.stc_create('Port', under=project, location='//10.0.0.1/1/1')
+    assert api.stc_get(port, ['location']) == '//10.0.0.1/1/1'
+    assert api.stc_get(project, ['children-port']) == port
+
+    api.stc_config(port, Name='uplink')
+    assert api.stc_get(port, ['Name', 'location']) == { 'Name': 'uplink', 'location': '//10.0.0.1/1/1' }
+
+    api.stc_delete(port)
+    assert not api.stc_get(project, ['children'])
+
+    with pytest.raises(TCLWrapperError):
+        api.stc_get(port)
+
+def test_sth(api):
+    ret = api.sth_connect(device='10.0.0.1', port_list='1/1 1/2', break_locks=1)
+    assert ret.port_handles == ['port1', 'port2']
+
+    stream = api.sth_traffic_config(mode='create', port_handle='port1', rate_pps=10000).stream_id
+    api.sth_traffic_control(action='run', port_handle='all')
+    time.sleep(0.1)
+    api.sth_traffic_control(action='stop', port_handle='all')
+
+    stats = api.sth_traffic_stats(port_handle='port1', mode='all')
+    assert int(stats.port1.aggregate.tx.total_pkts) > 0
+    assert stats.port1.stream[stream].rx.total_pkts == stats.port1.aggregate.rx.total_pkts
+
+    assert api.sth_cleanup_session().status == '1'
+
+def test_latency(api):
+    api.emulator_config(latency={ 'stc::get': 0.01 })
+
+    start = time.time()
+    api.stc_get('system1')
+    assert time.time() - start >= 0.01
+
+    # other commands are not delayed
+    api.stc_create('Project')
+    api.stc_get('project1')
+    assert api.eval('array get ::stcemu::delayed') == 'stc::get 20000'
+
+def test_sample(api):
+    store = api.enable_timeseries(capacity=10)
+    project = api.stc_create('Project')
+    port = api.stc_create('Port', under=project)
+    api.stc_create('StreamBlock', under=port, FrameRate=1000)
+    result = api.stc_get(api.stc_subscribe(project, 'StreamBlock', 'RxStreamSummaryResults'), ['ResultHandleList'])
+
+    for i in range(3):
+        samples = api.stc_sample([ result ], ['FrameCount', 'FrameRate'])
+        time.sleep(0.1)
+
+    assert samples[result].FrameRate == '1000'
+    times, counts = store.series(result, 'FrameCount')
+    assert len(times) == 3
+    assert list(counts) == sorted(counts) and counts[0] < counts[-1]
+    # frames are counted at 1000 frames per second by the emulator clock, samples are timed in python
+    assert 100 < store.rate(result, 'FrameCount') < 10000
+
+def test_create_session(api):
+    tenant = api.create_session('tenant')
+    try:
+        tenant.eval('set x 1')
+        with pytest.raises(TCLWrapperError):
+            api.eval('set x')
+
+        port = tenant.stc_create('Port', under=api.stc_create('Project'))
+        assert api.stc_get(port, ['parent']) == 'project1'
+        assert tenant.sth_traffic_config(mode='create', port_handle=port).status == '1'
+        assert 'tenant' in api.eval('interp slaves')
+    finally:
+        tenant.close()
+
+    assert api.eval('interp slaves') == ''
+
+def test_bulk(api):
+    project = api.stc_create('Project')
+    api.stc_create_many('Port', 500, under=project)
+    children = api.stc_get(project, ['children'])
+
+    api.enable_bulk(size=64 * 1024, threshold=1024)
+    assert api.stc_get(project, ['children']) == children
+
+    view = api.eval_bulk('stc::get %s -children' % project)
+    assert bytes(view).decode() == children
+    view.release()
+
+    # larger than the channel, replied through the pipe
+    assert len(api.eval('string repeat x %d' % (128 * 1024))) == 128 * 1024
+
+def test_result_view(api):
+    project = api.stc_create('Project')
+    ports = [ api.stc_create('Port', under=project, Name='Port %d' % i) for i in range(2) ]
+    for i in range(7):
+        stream = api.stc_create('StreamBlock', under=ports[i % 2], Name='stream%d' % i)
+        api.stc_config(stream, DroppedFrameCount=i * 3 % 7, TxFrameCount=100)
+
+    with ResultView([ 'StreamBlock.Name', 'StreamBlock.DroppedFrameCount' ], where=[ 'StreamBlock.DroppedFrameCount > 0' ],
+                    sort_by=[ 'StreamBlock.DroppedFrameCount DESC' ], page_size=2, api=api) as view:
+        assert [ row['StreamBlock.Name'] for row in view.page(0) ] == [ 'stream2', 'stream4' ]
+        assert [ row['StreamBlock.DroppedFrameCount'] for row in view ] == [ '6', '5', '4', '3', '2', '1' ]
+        assert len(list(view.rows(limit=3))) == 3
+        assert api.eval('lindex [ stc::get %s -WhereConditions ] 0' % view.query) == 'StreamBlock.DroppedFrameCount > 0'
+        assert api.stc_get(view.handle, [ 'parent' ]) == project
+
+    # view of a port is created under the project of the session
+    with ResultView([ 'StreamBlock.Name' ], source=ports[1], api=api) as view:
+        assert api.stc_get(view.handle, [ 'parent' ]) == project
+        assert [ row['StreamBlock.Name'] for row in view ] == [ 'stream1', 'stream3', 'stream5' ]
+
+    with ResultView([ 'Port.Name', 'StreamBlock.TxFrameCount' ], group_by=[ 'Port.Name' ], api=api) as view:
+        assert view.page(0) == [ { 'Port.Name': 'Port 0', 'StreamBlock.TxFrameCount': '400' },
+                                 { 'Port.Name': 'Port 1', 'StreamBlock.TxFrameCount': '300' } ]
+
+    assert api.stc_get(project, [ 'children-DynamicResultView' ]) == None
+
+def test_job(api):
+    project = api.stc_create('Project')
+
+    job = api.start_job([ 'set ::step 1',
+                          '::spirentapi::job_progress 0.5 half ; while { ![ info exists ::go ] } { ::spirentapi::job_sleep 0.01 }',
+                          'set ::step 2' ], name='steps')
+    assert job.status == 'running'
+
+    # session is free while the job sleeps, the job waits until it's told to go on by the session
+    assert api.stc_get(project, [ 'children' ]) == None
+    assert job.status == 'running'
+    api.eval('set ::go 1')
+
+    assert job.wait(timeout=10) == '2'
+    status = job.poll()
+    assert status.status == 'done' and status.progress == 1.0 and status.done == 3 and status.message == 'half'
+
+    with pytest.raises(TCLWrapperError):
+        api.start_job('error failed').wait(timeout=10)
+
+    job = api.stc_sleep(10, background=True)
+    assert job.cancel() == True
+    assert job.status == 'cancelled'
+
+    assert api.stc_waitUntilComplete(background=True).wait(timeout=10) == 'PASSED'
+
+def test_stcobject_handle(tmp_path):
+    path = str(tmp_path / 'session.trace')
+    api = SpirentAPI(emulator=True, trace=path, standby=True)
+    previous = SpirentAPI._instance
+    SpirentAPI.instance = api
+    try:
+        project = STCObject.create('Project')
+        port = STCObject.create('Port', under=project)
+
+        # handle is checked once when it's wrapped, not on every access
+        count = len(list(read_trace(path)))
+        assert str(port) == port.handle == 'port1'
+        assert '%s' % project == 'project1'
+        assert len(list(read_trace(path))) == count
+        assert port.valid
+
+        # objects of the failed tclsh are released
+        api.failover()
+        with pytest.raises(AssertionError):
+            port.handle
+        assert STCObject('system1') is not None
+    finally:
+        SpirentAPI.instance = previous
+        api.close()
+
+def test_standby(tmp_path):
+    path = str(tmp_path / 'session.trace')
+    api = SpirentAPI(emulator=True, standby=True, trace=path)
+    try:
+        api.stc_connect('10.0.0.1')
+        api.stc_reserve('10.0.0.1/1/1')
+        project = api.stc_create('Project')
+        api.stc_config(project, Name='kept')
+
+        old = api._tclsh
+        api.failover()
+        assert api._tclsh is not old
+
+        # connections and reservations are replayed
+        assert api.eval('set ::stcemu::chassis') == '10.0.0.1'
+        assert api.eval('set ::stcemu::reserved') == '10.0.0.1/1/1'
+
+        # objects created and changed after them are not rebuilt
+        with pytest.raises(TCLWrapperError):
+            api.stc_get(project, [ 'Name' ])
+
+        # bootstrap of every tclsh, including the spares, is recorded
+        api._spare_thread.join()
+        assert len([ record for record in read_trace(path) if record['c'] == 'package require SpirentTestCenter' ]) == 3
+
+        api.stc_release('10.0.0.1/1/1')
+        api.stc_disconnect('10.0.0.1')
+        assert api._journal == [ ]
+    finally:
+        api.close()
+
+def test_threadsafe():
+    import threading
+
+    with SpirentAPI(emulator=True, threadsafe=True) as api:
+        project = api.stc_create('Project')
+
+        errors = [ ]
+        def worker():
+            try:
+                for i in range(20):
+                    assert api.stc_get(project, ['Name']) == 'Project 1'
+            except Exception as e:
+                errors.append(e)
+
+        threads = [ threading.Thread(target=worker) for i in range(4) ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == [ ]
+        assert api.eval(['set a 1', 'set b 2']) == ['1', '2']
+
+def test_create_many(api):
+    previous = SpirentAPI._instance
+    SpirentAPI.instance = api
+    try:
+        project = api.stc_create('Project')
+        portObjects = STCObject.create_many('port', 3, under=project, Name=['p1', 'p2', 'p 3'])
+        assert len(portObjects) == 3
+        assert [ portObject.name for portObject in portObjects ] == ['p1', 'p2', 'p 3']
+        assert portObjects[0].parent.handle == project
+    finally:
+        SpirentAPI.instance = previous
+
+def test_wait_until(api):
+    project = api.stc_create('Project')
+
+    ret = api.wait_until([ project ], 'Name', 'Project 1', timeout=5, interval=0.1)
+    assert ret[project].met == True
+    assert ret[project].value == 'Project 1'
+
+    ret = api.wait_until(project, 'Name', '$value eq "other"', timeout=0.3, interval=0.1)
+    assert ret[project].met == False
+    assert ret[project].time == None
+
+def test_reconcile(api):
+    project = api.stc_create('Project')
+    spec = [ { 'type': 'Port', 'Name': 'reconcile port', 'children': [ { 'type': 'StreamBlock', 'Name': 'reconcile s1' } ] } ]
+
+    plan = api.reconcile(spec, under=project)
+    assert len(plan.creates) == 2
+
+    plan = api.reconcile(spec, under=project)
+    assert len(plan) == 0
+
+    spec[0]['children'][0]['Name'] = 'reconcile s2'
+    plan = api.reconcile(spec, under=project, delete=True, dry_run=True)
+    assert len(plan.creates) == 1
+    assert len(plan.deletes) == 1
+
+def test_stc_query(api):
+    import re
+
+    api.stc_create('Project')
+    projects = api.stc_query('system1', object_type='Project', depth=1, attributes=['Name'])
+    assert projects[0].handle == 'project1'
+    assert projects[0].Name == 'Project 1'
+
+    assert api.stc_query('system1', object_type='Project', where={'Name': re.compile('^NoSuchName$')}) == [ ]
+
+    port = api.stc_create('Port', under='project1')
+    api.stc_create('StreamBlock', under=port, Name='video 1')
+    api.stc_create('StreamBlock', under=port, Name='voice 1')
+    streams = api.stc_query('project1', object_type='StreamBlock', where={'Name': re.compile('^video')}, attributes=['Name'])
+    assert streams == [ { 'handle': 'streamblock1', 'Name': 'video 1' } ]
+    assert api.stc_query('project1', object_type='Port') == [ { 'handle': port } ]
+
+    # flags are passed as regexp switches
+    assert api.stc_query('project1', object_type='StreamBlock', where={'Name': re.compile('^VIDEO')}) == [ ]
+    assert api.stc_query('project1', object_type='StreamBlock', where={'Name': re.compile('^VIDEO', re.I)}) == [ { 'handle': 'streamblock1' } ]
+    with pytest.raises(AssertionError):
+        api.stc_query('project1', where={'Name': re.compile('^video', re.A)})
+
+def test_sth_lazy(api):
+    with api.sth_connect(device='10.0.0.1', port_list='1/1', break_locks=1, lazy=True) as conn_ret:
+        assert conn_ret.status == '1'
+        assert conn_ret.to_dict()['status'] == '1'
+
+    assert api.sth_cleanup_session().status == '1'
+
+def test_sth_ip_keys(api):
+    # port_handle is keyed by chassis ip, TclX forbids '.' in keys, so it's nested per octet by both parsers
+    expected = { '10': { '0': { '0': { '1': { '1/1': 'port1', '1/2': 'port2' } } } } }
+
+    eager = api.sth_connect(device='10.0.0.1', port_list='1/1 1/2', break_locks=1)
+    assert eager.port_handle == expected
+
+    # same connection in a new session, so the ports are named the same
+    with SpirentAPI(emulator=True) as other:
+        with other.sth_connect(device='10.0.0.1', port_list='1/1 1/2', break_locks=1, lazy=True) as lazy:
+            assert lazy.port_handle['10']['0']['0']['1']['1/1'] == 'port1'
+            assert lazy.to_dict()['port_handle'] == expected
+
+def test_capture(api, tmp_path):
+    port = api.stc_create('Port', under=api.stc_create('Project'))
+    capture = Capture(port, api=api)
+    assert capture.handle == api.stc_get(port, [ 'children-capture' ])
+
+    capture.start()
+    assert api.stc_get(capture.handle, [ 'Status' ]) == 'RUNNING'
+    capture.stop()
+    assert api.stc_get(capture.handle, [ 'Status' ]) == 'IDLE'
+
+    # spaces in path are kept
+    path = tmp_path / 'saved captures' / 'port 1.pcap'
+    path.parent.mkdir()
+    with capture.save(str(path)) as pcap:
+        assert pcap.path == str(path)
+        assert len(pcap) == 0
+    assert path.exists()
+
+    with pytest.raises(AssertionError):
+        capture.save(str(tmp_path / 'port$1.pcap'))
+
+def test_stats_poller(api):
+    api.sth_connect(device='10.0.0.1', port_list='1/1 1/2', break_locks=1)
+    stream = api.sth_traffic_config(mode='create', port_handle='port1', rate_pps=10000).stream_id
+    api.sth_traffic_control(action='run', port_handle='all')
+
+    store = api.enable_timeseries(capacity=10)
+    poller = StatsPoller('traffic_stats', api=api, port_handle='port1', mode='all')
+
+    first = poller.poll()
+    assert first.rate == None
+    time.sleep(0.05)
+    table = poller.poll()
+
+    # one row per counter, flattened in tclsh
+    rows = { (port, stream_, direction, counter): value for port, stream_, direction, counter, value in zip(table.port, table.stream, table.direction, table.counter, table.value) }
+    assert rows[('port1', '', 'tx', 'total_pkt_rate')] == 10000
+    assert rows[('port1', stream, 'rx', 'total_pkts')] > 0
+    assert len(table.rate) == len(table)
+    assert table.timestamp > first.timestamp
+
+    # frames and timestamps are both counted by the tclsh clock
+    for key, rate in zip(table.keys(), table.rate):
+        if key[3] == 'total_pkts':
+            assert 5000 < rate < 20000
+
+    # polls are added to the time series store of the session
+    assert len(store.series(stream, 'rx.total_pkts')[0]) == 2
+
+    api.sth_traffic_control(action='stop', port_handle='all')
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+import pytest
+from spirentapi import PortLeaseScheduler, SessionPool
+
+def test_lease(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path))
+
+    assert scheduler.try_acquire(['10.0.0.1/1/1', '10.0.0.1/1/2'], owner='a')
+    assert not scheduler.try_acquire(['10.0.0.1/1/2', '10.0.0.1/1/3'], owner='b')
+
+    # all or none
+    assert scheduler.holders(['10.0.0.1/1/3']) == { }
+    assert scheduler.try_acquire(['10.0.0.1/1/3'], owner='b')
+
+    # only the holder releases its lease
+    scheduler.release(['10.0.0.1/1/1', '10.0.0.1/1/2'], owner='b')
+    assert scheduler.holders(['10.0.0.1/1/1']) == { '10.0.0.1/1/1': 'a' }
+
+    scheduler.release(['10.0.0.1/1/1', '10.0.0.1/1/2'], owner='a')
+    assert scheduler.try_acquire(['10.0.0.1/1/2'], owner='b')
+
+def test_lease_wait(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path), interval=0.01)
+    scheduler.acquire(['10.0.0.1/1/1'], owner='a')
+
+    threading.Timer(0.1, scheduler.release, args=(['10.0.0.1/1/1'], 'a')).start()
+
+    start = time.time()
+    with scheduler.lease(['10.0.0.1/1/1'], owner='b', timeout=5):
+        assert time.time() - start >= 0.1
+        assert scheduler.holders(['10.0.0.1/1/1']) == { '10.0.0.1/1/1': 'b' }
+
+    with pytest.raises(TimeoutError):
+        scheduler.acquire(['10.0.0.1/1/2'], owner='a')
+        scheduler.acquire(['10.0.0.1/1/2'], owner='b', timeout=0.05)
+
+def test_lease_expired(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path), ttl=-1)
+
+    assert scheduler.try_acquire(['10.0.0.1/1/1'], owner='dead')
+    assert scheduler.try_acquire(['10.0.0.1/1/1'], owner='b')
+
+    # worker whose lease was broken doesn't release the new holder's lease
+    scheduler.release(['10.0.0.1/1/1'], owner='dead')
+    assert scheduler.holders(['10.0.0.1/1/1']) == { '10.0.0.1/1/1': 'b' }
+
+def test_lease_dead_owner(tmp_path):
+    import subprocess
+    import sys
+
+    process = subprocess.Popen([ sys.executable, '-c', 'pass' ])
+    process.wait()
+
+    scheduler = PortLeaseScheduler(str(tmp_path))
+    assert scheduler.try_acquire(['10.0.0.1/1/1'], owner='a')
+
+    # lease of a process which is not running is broken before it expires
+    with open(scheduler._path('10.0.0.1/1/1')) as f:
+        lease = json.load(f)
+    lease.update(owner='dead', pid=process.pid)
+    with open(scheduler._path('10.0.0.1/1/1'), 'w') as f:
+        json.dump(lease, f)
+
+    assert scheduler.try_acquire(['10.0.0.1/1/1'], owner='b')
+    assert scheduler.holders(['10.0.0.1/1/1']) == { '10.0.0.1/1/1': 'b' }
+
+def test_lease_renew(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path), ttl=100)
+    assert scheduler.try_acquire(['10.0.0.1/1/1'], owner='a')
+
+    with open(scheduler._path('10.0.0.1/1/1')) as f:
+        expires = json.load(f)['expires']
+    time.sleep(0.01)
+    assert scheduler.renew(['10.0.0.1/1/1'], owner='a')
+    with open(scheduler._path('10.0.0.1/1/1')) as f:
+        assert json.load(f)['expires'] > expires
+
+    # only the holder renews its lease
+    assert not scheduler.renew(['10.0.0.1/1/1', '10.0.0.1/1/2'], owner='b')
+
+def test_lease_heartbeat(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path), ttl=1)
+
+    # lease outlives ttl while the with block runs
+    with scheduler.lease(['10.0.0.1/1/1'], owner='a'):
+        time.sleep(2)
+        assert not scheduler.try_acquire(['10.0.0.1/1/1'], owner='b')
+
+    assert scheduler.holders(['10.0.0.1/1/1']) == { }
+
+def test_lease_break_race(tmp_path):
+    scheduler = PortLeaseScheduler(str(tmp_path))
+    with open(scheduler._path('10.0.0.1/1/1'), 'w') as f:
+        json.dump({ 'port': '10.0.0.1/1/1', 'owner': 'dead', 'pid': 0, 'expires': 0 }, f)
+
+    # workers see the expired lease at the same time, only one of them takes the port
+    barrier = threading.Barrier(8)
+    taken = [ ]
+
+    def take(i):
+        barrier.wait()
+        if scheduler.try_acquire(['10.0.0.1/1/1'], owner='worker%d' % i):
+            taken.append(i)
+
+    threads = [ threading.Thread(target=take, args=(i, )) for i in range(8) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(taken) == 1
+    assert scheduler.holders(['10.0.0.1/1/1']) == { '10.0.0.1/1/1': 'worker%d' % taken[0] }
+
+def test_session_pool():
+    pool = SessionPool(2, factory=object)
+
+    first = pool.acquire()
+    with pool.session() as second:
+        assert second is not first
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.01)
+
+    pool.release(first)
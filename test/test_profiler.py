@@ -0,0 +1,58 @@
+import pytest
+from spirentapi import *
+
+def test_phases():
+    profiler = Profiler()
+
+    with profiler.phase('stc::get'):
+        with profiler.phase('io'):
+            profiler.add('tcl', 0.002)
+
+    summary = profiler.summary()
+    assert summary['stc::get']['calls'] == 1
+    assert summary['stc::get']['tcl'] == 0.002
+    assert 'stc::get;io;tcl 2000' in profiler.folded().splitlines()
+
+def test_profile_api(tmp_path):
+    path = str(tmp_path / 'session.trace')
+
+    recorder = TraceRecorder(path)
+    recorder.record('stc::get system1 ', 0.0, 0.001, reply='-Name a -Version 1.0')
+    recorder.close()
+
+    replayer = TraceReplayer(path)
+    api = SpirentAPI(tclsh=replayer)
+    profiler = api.enable_profiler()
+
+    # profiler doesn't make the replayer wait the recorded durations
+    assert replayer.timing == False
+
+    assert api.stc_get('system1') == { 'Name': 'a', 'Version': '1.0' }
+
+    summary = profiler.summary()
+    assert list(summary.keys()) == ['stc::get']
+    assert summary['stc::get']['calls'] == 1
+    assert summary['stc::get']['io'] > 0
+    assert 'stc::get' in profiler.report()
+
+    assert api.disable_profiler() is profiler
+    assert api.profiler == None
+
+def test_profile_replay_timing(tmp_path):
+    path = str(tmp_path / 'session.trace')
+
+    recorder = TraceRecorder(path)
+    recorder.record('stc::get system1 -Name', 0.0, 0.01, reply='a')
+    recorder.record('stc::get system1 -Name', 0.0, 0.01, reply='a')
+    recorder.close()
+
+    # timing of the replayer set by user is kept
+    replayer = TraceReplayer(path, timing=True)
+    api = SpirentAPI(tclsh=replayer)
+    profiler = api.enable_profiler()
+    assert api.stc_get('system1', ['Name']) == 'a'
+    assert profiler.summary()['stc::get']['io'] >= 0.01
+
+    api.disable_profiler()
+    assert replayer.timing == True
+    assert api.stc_get('system1', ['Name']) == 'a'
@@ -0,0 +1,52 @@
+import shutil
+import pytest
+
+pytest_plugins = 'pytester'
+
+def test_stc_ports(pytester, tmp_path):
+    pytester.makepyfile('''
+        import pytest
+
+        @pytest.mark.stc_ports('10.0.0.1/1/1', '10.0.0.1/1/2')
+        def test_leased(request, stc_ports, stc_lease_scheduler):
+            assert stc_ports == [ '10.0.0.1/1/1', '10.0.0.1/1/2' ]
+            assert stc_lease_scheduler.holders(stc_ports) == { port: 'master ' + request.node.nodeid for port in stc_ports }
+
+        def test_released(stc_lease_scheduler):
+            assert stc_lease_scheduler.holders([ '10.0.0.1/1/1', '10.0.0.1/1/2' ]) == { }
+    ''')
+    result = pytester.runpytest('-p', 'spirentapi.pytest_plugin', '--strict-markers', '--stc-lease-dir', str(tmp_path))
+    result.assert_outcomes(passed=2)
+
+def test_stc_ports_timeout(pytester, tmp_path):
+    from spirentapi import PortLeaseScheduler
+    PortLeaseScheduler(str(tmp_path)).acquire([ '10.0.0.1/1/1' ], owner='other')
+
+    pytester.makepyfile('''
+        import pytest
+
+        @pytest.mark.stc_ports('10.0.0.1/1/1')
+        def test_busy(stc_ports):
+            pass
+    ''')
+    result = pytester.runpytest('-p', 'spirentapi.pytest_plugin', '--stc-lease-dir', str(tmp_path), '--stc-lease-timeout', '0.1')
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines([ '*TimeoutError*held by*other*' ])
+
+@pytest.mark.skipif(shutil.which('tclsh') == None, reason='tclsh is not installed')
+def test_stc_api(pytester):
+    pytester.makepyfile('''
+        from spirentapi import SpirentAPI
+
+        def test_first(stc_api, stc_pool):
+            assert SpirentAPI.instance is stc_api
+            assert stc_api in stc_pool.sessions
+            stc_api.stc_create('Project')
+
+        def test_second(stc_api, stc_pool):
+            # session started once, and shared by tests
+            assert len(stc_pool.sessions) == 1
+            assert stc_api.stc_get('system1', [ 'children-project' ]) == 'project1'
+    ''')
+    result = pytester.runpytest('-p', 'spirentapi.pytest_plugin', '--stc-emulator')
+    result.assert_outcomes(passed=2)
@@ -0,0 +1,91 @@
+import pytest
+from spirentapi import ResultFile, ResultDatabase
+
+def test_read(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('StreamBlock,FrameCount,FrameRate,Name\nstreamblock1,10,1.5,"a, b"\nstreamblock2,20,2.5,c\n')
+
+    columns = ResultFile(str(path)).read()
+
+    assert list(columns.keys()) == ['StreamBlock', 'FrameCount', 'FrameRate', 'Name']
+    assert list(columns['FrameCount']) == [10, 20]
+    assert list(columns['FrameRate']) == [1.5, 2.5]
+    assert list(columns['Name']) == ['a, b', 'c']
+
+def test_read_bad_rows(tmp_path, caplog):
+    path = tmp_path / 'rx.csv'
+    path.write_text('Port,FrameCount\nport1,1\nport2\nport3,3,x\nport4,4\n')
+
+    columns = ResultFile(str(path)).read()
+
+    assert list(columns['Port']) == ['port1', 'port4']
+    assert '2 rows are skipped' in caplog.text
+
+def test_follow(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('Port,FrameCount\nport1,1\nport2,')
+
+    f = ResultFile(str(path))
+    rows = f.follow(interval=0.01, timeout=0.05)
+
+    assert list(next(rows)['FrameCount']) == [1]
+
+    # the incomplete line is read when it's completed
+    with open(str(path), 'a') as out:
+        out.write('2\nport3,3\n')
+
+    assert list(next(rows)['Port']) == ['port2', 'port3']
+
+    with pytest.raises(StopIteration):
+        next(rows)
+
+def test_read_large_counters(tmp_path):
+    np = pytest.importorskip('numpy')
+
+    path = tmp_path / 'rx.csv'
+    path.write_text('Port,OctetCount,Rate\nport1,18446744073709551615,1\nport2,1,2.5e20\n')
+
+    columns = ResultFile(str(path)).read()
+
+    assert columns['OctetCount'].dtype == np.uint64
+    assert int(columns['OctetCount'][0]) == 18446744073709551615
+    assert list(columns['Rate']) == [1.0, 2.5e20]
+
+def test_read_quoted_new_line(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('Name,FrameCount\n"line 1\nline 2",1\nb,2\n')
+
+    columns = ResultFile(str(path)).read()
+
+    assert list(columns['Name']) == ['line 1\nline 2', 'b']
+    assert list(columns['FrameCount']) == [1, 2]
+
+def test_database(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'results.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE RxEotStreamResults (Name TEXT, FrameCount INTEGER, Rate REAL)')
+    connection.executemany('INSERT INTO RxEotStreamResults VALUES (?, ?, ?)', [ ('s1', 10, 1.5), ('s2', 20, 2.5) ])
+    connection.commit()
+
+    db = ResultDatabase(path)
+    assert db.tables() == ['RxEotStreamResults']
+
+    columns = db.read('RxEotStreamResults')
+    assert list(columns.keys()) == ['Name', 'FrameCount', 'Rate']
+    assert list(columns['FrameCount']) == [10, 20]
+    assert list(db.read('RxEotStreamResults', columns=['Rate'])['Rate']) == [1.5, 2.5]
+
+    # only rows inserted after the last read
+    connection.execute("INSERT INTO RxEotStreamResults VALUES ('s3', 30, 3.5)")
+    connection.commit()
+    connection.close()
+
+    rows = db.follow('RxEotStreamResults', interval=0.01, timeout=0.05)
+    assert list(next(rows)['Name']) == ['s3']
+    with pytest.raises(StopIteration):
+        next(rows)
+
+    with pytest.raises(AssertionError):
+        db.read('NoSuchTable')
@@ -0,0 +1,55 @@
+import shutil
+import pytest
+from spirentapi import *
+from spirentapi.cli import main
+
+emulator = pytest.mark.skipif(shutil.which('tclsh') == None, reason='tclsh is not installed')
+
+STEPS = '''
+{
+    "variables": { "chassis": "10.0.0.1" },
+    "steps": [
+        { "stc": "create project", "set": "project" },
+        { "stc": "create port", "args": { "under": "$project", "location": "//$chassis/1/1" }, "set": "port" },
+        { "tcl": "stc::get $port -location", "name": "location" },
+        { "sleep": 0 },
+        { "sth": "traffic_config", "args": { "mode": "bogus" } },
+        { "tcl": "stc::delete $project" }
+    ]
+}
+'''
+
+def test_steps():
+    steps = Scenario(STEPS).steps()
+
+    assert [ step.name for step in steps ] == ['stc::create project', 'stc::create port', 'location', 'sleep', 'sth::traffic_config', 'stc::delete $project']
+    assert steps[1].script == 'set ::port [ stc::create port -under $project -location //$chassis/1/1 ]'
+    assert steps[3].sleep == 0
+    assert steps[4].check and not steps[0].check
+
+@emulator
+def test_run():
+    api = SpirentAPI(threadsafe=True, emulator=True)
+    try:
+        results = Scenario(STEPS).run(api, batch_size=1)
+        assert [ result.ok for result in results ] == [True, True, True, True, False]
+        assert results[2].result == '//10.0.0.1/1/1'
+
+        results = Scenario(STEPS).run(api, variables={ 'chassis': '10.0.0.2' }, stop_on_error=False)
+        assert results[2].result == '//10.0.0.2/1/1' and len(results) == 6
+
+        results = Scenario('set x [ stc::create project ]\n# comment\nproc f { } {\n    return 1\n}\nf').run(api)
+        assert [ result.result for result in results ] == ['project3', '', '1']
+    finally:
+        api.close()
+
+@emulator
+def test_cli(tmp_path, capsys):
+    path = tmp_path / 'scenario.tcl'
+    path.write_text('stc::create project\nstc::get system1 -children\n')
+
+    assert main([ str(path), '--emulator', '--repeat', '3', '--parallel-sessions', '2' ]) == 0
+    assert '12 steps' in capsys.readouterr().out
+
+    path.write_text('stc::get nothing1\n')
+    assert main([ str(path), '--emulator' ]) == 1
@@ -82,4 +82,91 @@ def test_singleton():
     api = SpirentAPI.instance
     api.x = 1
     api2 = SpirentAPI.instance
-    assert api2.x == 1
\ No newline at end of file
+    assert api2.x == 1
+
+def test_threadsafe():
+    import threading
+
+    api = SpirentAPI(threadsafe=True)
+
+    errors = [ ]
+    def worker():
+        try:
+            for i in range(20):
+                assert api.stc_get('system1', ['Name']) != None
+        except Exception as e:
+            errors.append(e)
+
+    threads = [ threading.Thread(target=worker) for i in range(4) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == [ ]
+
+    assert api.eval(['set a 1', 'set b 2']) == ['1', '2']
+
+    del api
+
+def test_wait_until():
+    api = SpirentAPI()
+
+    ret = api.wait_until(['system1'], 'Active', 'true', timeout=5, interval=1)
+    assert ret['system1'].met == True
+    assert ret['system1'].value == 'true'
+
+    ret = api.wait_until('system1', 'Active', '$value eq "false"', timeout=1, interval=1)
+    assert ret['system1'].met == False
+    assert ret['system1'].time == None
+
+def test_reconcile():
+    api = SpirentAPI()
+
+    spec = [ { 'type': 'Port', 'Name': 'reconcile port', 'children': [ { 'type': 'StreamBlock', 'Name': 'reconcile s1' } ] } ]
+
+    plan = api.reconcile(spec, under='project1')
+    assert len(plan.creates) == 2
+
+    plan = api.reconcile(spec, under='project1')
+    assert len(plan) == 0
+
+    spec[0]['children'][0]['Name'] = 'reconcile s2'
+    plan = api.reconcile(spec, under='project1', delete=True, dry_run=True)
+    assert len(plan.creates) == 1
+    assert len(plan.deletes) == 1
+
+def test_stc_query():
+    import re
+
+    api = SpirentAPI()
+
+    ports = api.stc_query('system1', object_type='Project', depth=1, attributes=['Name'])
+    assert ports[0].handle == 'project1'
+    assert 'Name' in ports[0]
+
+    assert api.stc_query('system1', object_type='Project', where={'Name': re.compile('^NoSuchName$')}) == [ ]
+
+def test_sth_lazy():
+    api = SpirentAPI()
+
+    with api.sth_connect(device='10.182.32.138', port_list='1/1', break_locks=1, lazy=True) as conn_ret:
+        assert conn_ret.status == '1'
+        assert conn_ret.to_dict()['status'] == '1'
+    
+    api.sth_cleanup_session()
+
+def test_standby():
+    api = SpirentAPI(standby=True)
+
+    api.stc_connect('10.182.32.138')
+    api.stc_reserve('10.182.32.138/1/1')
+
+    old = api._tclsh
+    api.failover()
+    assert api._tclsh is not old
+    assert api.stc_get('project1', ['Name']) != None
+
+    api.stc_release('10.182.32.138/1/1')
+    api.stc_disconnect('10.182.32.138')
+    assert api._journal == [ ]
@@ -0,0 +1,19 @@
+import math
+import pytest
+from spirentapi import StatsTable
+
+def test_rate():
+    previous = StatsTable(['port1', 'port1'], ['', 'sb1'], ['rx', 'rx'], ['total_pkts', 'total_pkts'], ['100', '10'], 10.0)
+    table = StatsTable(['port1', 'port1'], ['', 'sb1'], ['rx', 'rx'], ['total_pkts', 'total_pkts'], ['300', '30'], 12.0)
+
+    table.compute_rate(previous)
+    assert list(table.rate) == [100.0, 10.0]
+
+def test_rate_new_row():
+    previous = StatsTable(['port1'], [''], ['rx'], ['total_pkts'], ['100'], 10.0)
+    table = StatsTable(['port1', 'port1'], ['sb1', ''], ['rx', 'rx'], ['total_pkts', 'total_pkts'], ['30', 'N/A'], 11.0)
+
+    table.compute_rate(previous)
+    assert math.isnan(table.rate[0])
+    assert math.isnan(table.rate[1])
+    assert math.isnan(table.value[1])
@@ -55,4 +55,19 @@ def test_attributes():
 def test_children():
     systemObject = STCObject('system1')
     rprObject = STCObject('resultproviderregistry1')
-    print([ child.handle for child in rprObject.children])
\ No newline at end of file
+    print([ child.handle for child in rprObject.children])
+
+def test_identity():
+    systemObject = STCObject('system1')
+    assert STCObject('system1') is systemObject
+
+    projectObject = STCObject('project1')
+    assert projectObject.parent is systemObject
+    assert projectObject in systemObject.children
+
+
+def test_create_many():
+    portObjects = STCObject.create_many('port', 3, under='project1', Name=['p1', 'p2', 'p 3'])
+    assert len(portObjects) == 3
+    assert [ portObject.name for portObject in portObjects ] == ['p1', 'p2', 'p 3']
+    assert portObjects[0].parent.handle == 'project1'
@@ -0,0 +1,63 @@
+import threading
+import pytest
+from spirentapi.tcllist import parse_list, parse_dict, parse_nested, parse_flat
+from spirentapi.apiwrapper import resolve_pairs
+
+def test_parse_list():
+    assert parse_list('') == ()
+    assert parse_list(' a  b\tc\n') == ('a', 'b', 'c')
+    assert parse_list('-Name {a {b}} -children {} -Version 1.0') == ('-Name', 'a {b}', '-children', '', '-Version', '1.0')
+    assert parse_list('"a b" c\\ d') == ('a b', 'c d')
+    assert parse_list('{a\\}b} "a\\"b" a{b') == ('a\\}b', 'a"b', 'a{b')
+    assert parse_list('"\\x41\\u00e9\\101\\n"') == ('AéA\n', )
+    assert parse_list('a\\\n   b') == ('a b', )
+
+@pytest.mark.parametrize('tclstring', [ '{a', '"a', '{a}b', '"a"b' ])
+def test_parse_list_error(tclstring):
+    with pytest.raises(ValueError):
+        parse_list(tclstring)
+
+def test_parse_dict():
+    assert parse_dict('-a 1 -b {2 3}') == { '-a': '1', '-b': '2 3' }
+
+    with pytest.raises(ValueError):
+        parse_dict('a 1 b')
+
+def test_parse_nested():
+    assert parse_nested('a {b c} {d {e f}}') == ('a', ('b', 'c'), ('d', ('e', 'f')))
+    assert parse_nested('{a b}') == 'a b'
+    assert parse_nested('{a') == '{a'
+    assert parse_flat('a {b c} {d {e f}} {}') == ['a', 'b', 'c', 'd', 'e', 'f']
+
+def test_resolve_pairs():
+    # quoting
+    assert resolve_pairs('-Name "a b" -Path c\\ d -Rate 1.0') == { 'Name': 'a b', 'Path': 'c d', 'Rate': '1.0' }
+    # nested braces are kept as they are
+    assert resolve_pairs('-Name {a {b {c d}}} -Filter {{x} {y z}}') == { 'Name': 'a {b {c d}}', 'Filter': '{x} {y z}' }
+    # empty values, and values of several lines
+    assert resolve_pairs('-children {} -Name "" -Desc {line 1\n\nline 3}') == { 'children': '', 'Name': '', 'Desc': 'line 1\n\nline 3' }
+    # names without '-', list already split, name without value
+    assert resolve_pairs(('Name', ' a ', '-Active', 'true', '-Odd')) == { 'Name': 'a', 'Active': 'true' }
+    assert resolve_pairs('') == { }
+
+def test_threads():
+    tclstring = ' '.join([ '-attr%d {value %d {nested %d}}' % (i, i, i) for i in range(1000) ])
+    expected = parse_list(tclstring)
+    results = [ ]
+
+    threads = [ threading.Thread(target=lambda: results.append(parse_list(tclstring) == expected)) for i in range(8) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [ True ] * 8
+
+def test_tclstring_to_list_splitlist():
+    tkinter = pytest.importorskip('tkinter')
+    from spirentapi.tclwrapper import tclstring_to_list
+
+    # same elements as the tcl C parser
+    splitlist = tkinter.Tcl().splitlist
+    for reply in [ ' '.join([ '-Attr%d {value %d}' % (i, i) for i in range(1000) ]), '{a {b "c d"}} e\\ f "g\\th"' ]:
+        assert tclstring_to_list(reply) == tuple(splitlist(reply))
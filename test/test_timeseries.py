@@ -0,0 +1,47 @@
+import math
+import pytest
+from spirentapi import TimeSeriesStore, StatsTable
+
+def test_window():
+    store = TimeSeriesStore(capacity=100)
+    for i in range(10):
+        store.add('port1', 'TotalFrameCount', str(i * 1000), timestamp=100.0 + i)
+
+    assert store.delta('port1', 'TotalFrameCount') == 9000
+    assert store.rate('port1', 'TotalFrameCount') == 1000
+    assert store.rate('port1', 'TotalFrameCount', last=2) == 1000
+    assert list(store.series('port1', 'TotalFrameCount', start=103, end=105)[1]) == [3000, 4000, 5000]
+    assert list(store.rates('port1', 'TotalFrameCount', last=3)[1]) == [1000, 1000, 1000]
+    assert store.min('port1', 'TotalFrameCount', start=105) == 5000
+    assert store.max('port1', 'TotalFrameCount', end=105) == 5000
+    assert store.percentile('port1', 'TotalFrameCount', 50) == 4500
+    assert math.isnan(store.rate('port1', 'TotalFrameCount', start=200))
+
+def test_ring():
+    store = TimeSeriesStore(capacity=4)
+    for i in range(10):
+        store.add('port1', 'rate', i, timestamp=float(i))
+
+    times, values = store.series('port1', 'rate')
+    assert list(times) == [6.0, 7.0, 8.0, 9.0]
+    assert list(values) == [6.0, 7.0, 8.0, 9.0]
+    assert store.mean('port1', 'rate') == 7.5
+
+def test_bounded():
+    store = TimeSeriesStore(capacity=10, max_series=2)
+    store.add('port1', 'a', 1, timestamp=1.0)
+    store.add('port2', 'a', 1, timestamp=1.0)
+    store.add('port1', 'a', 2, timestamp=2.0)
+    store.add('port3', 'a', 1, timestamp=2.0)
+
+    assert store.keys() == [('port1', 'a'), ('port3', 'a')]
+    assert store.nbytes == 2 * 10 * 16
+    with pytest.raises(KeyError):
+        store.series('port2', 'a')
+
+def test_add_table():
+    store = TimeSeriesStore()
+    store.add_table(StatsTable(['port1', 'port1'], ['', 'streamblock1'], ['rx', 'tx'], ['total_pkts', 'total_pkts'], ['100', 'N/A'], 10.0))
+
+    assert store.keys() == [('port1', 'rx.total_pkts'), ('streamblock1', 'tx.total_pkts')]
+    assert math.isnan(store.max('streamblock1', 'tx.total_pkts'))
@@ -0,0 +1,36 @@
+import pytest
+from spirentapi import *
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'session.trace')
+
+    recorder = TraceRecorder(path)
+    recorder.record('stc::get system1 ', 0.0, 0.001, reply='-Name {a {b}} -children {} -Version 1.0')
+    recorder.record('stc::get sys ', 0.0, 0.001, error='invalid handle')
+    recorder.close()
+
+    assert [ record['c'] for record in read_trace(path) ] == ['stc::get system1 ', 'stc::get sys ']
+
+    api = SpirentAPI(tclsh=TraceReplayer(path))
+
+    assert api.stc_get('system1') == { 'Name': 'a {b}', 'children': '', 'Version': '1.0' }
+
+    try:
+        api.stc_get('sys')
+    except TCLWrapperError as e:
+        assert e.error_message == 'invalid handle'
+    else:
+        assert False
+
+def test_replay_missing_command(tmp_path):
+    path = str(tmp_path / 'empty.trace')
+    TraceRecorder(path).close()
+
+    api = SpirentAPI(tclsh=TraceReplayer(path))
+
+    try:
+        api.eval('stc::apply')
+    except TCLWrapperInstanceError as e:
+        return
+
+    assert False